@@ -0,0 +1,175 @@
+"""
+Sampled betweenness for /query/centrality?method=betweenness&approx=true.
+
+Brandes' dependency accumulation (native_analytics.betweenness) is run
+from k pivots drawn uniformly without replacement from the N candidate
+nodes, and the sums are scaled by N / k, an unbiased estimate of the
+exact (raw, directed) scores.
+
+Sample size: with X_s(v) = delta_s(v) / (N - 1) in [0, 1], Hoeffding's
+bound plus a union bound over the N nodes gives, with probability at
+least 1 - delta, |estimate - exact| <= epsilon * N * (N - 1) for every
+node at once when k >= ln(2N / delta) / (2 epsilon^2). sample_size() and
+epsilon_for() convert between the two; the bound is reported with every
+answer.
+
+Pivots come from a seeded generator and are summed in a fixed order, so
+the same (graph, samples, seed) always gives the same top-k. Large runs
+are split over a spawn process pool; the adjacency (CSR arrays) is put
+in shared memory once per call and the workers map it instead of
+receiving a pickled copy per chunk.
+"""
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+import native_analytics
+
+def sample_size(n: int, epsilon: float, delta: float = 0.1) -> int:
+    """Pivots needed for an additive error of epsilon (normalised) on all n nodes with probability 1 - delta."""
+    if n <= 0:
+        return 0
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+def epsilon_for(n: int, samples: int, delta: float = 0.1) -> float:
+    """The normalised error bound that `samples` pivots guarantee (0 when every node is a pivot)."""
+    if samples >= n or n <= 0:
+        return 0.0
+    return math.sqrt(math.log(2 * n / delta) / (2 * max(samples, 1)))
+
+# ---------- Shared adjacency ----------
+class SharedCSR:
+    """A csr_matrix's arrays copied into named shared memory; `spec` is what workers need to map them."""
+
+    def __init__(self, A: sp.csr_matrix):
+        self._blocks: List[SharedMemory] = []
+        arrays = {}
+        for key in ("indptr", "indices", "data"):
+            arr = getattr(A, key)
+            block = SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[:] = arr
+            self._blocks.append(block)
+            arrays[key] = (block.name, arr.shape, arr.dtype.str)
+        self.spec = {"shape": A.shape, "arrays": arrays}
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedCSR":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _attach(spec: Dict[str, Any]) -> Tuple[sp.csr_matrix, List[SharedMemory]]:
+    blocks, arrays = [], {}
+    for key, (name, shape, dtype) in spec["arrays"].items():
+        # Spawned workers share the parent's resource tracker, so attaching does not claim the segment
+        block = SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    A = sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=spec["shape"], copy=False)
+    return A, blocks
+
+def _pivot_chunk(spec: Dict[str, Any], pivots: np.ndarray) -> np.ndarray:
+    """Worker: dependency sums from `pivots` over the shared adjacency."""
+    A, blocks = _attach(spec)
+    try:
+        return native_analytics.betweenness(A, sources=pivots)
+    finally:
+        del A
+        for block in blocks:
+            block.close()
+
+# ---------- Runner ----------
+class ApproxBetweenness:
+    def __init__(self, workers: int = 1, min_parallel_pivots: int = 256):
+        self.workers = max(1, workers)
+        # Below this many pivots the pool's dispatch costs more than it saves
+        self.min_parallel_pivots = min_parallel_pivots
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.parallel_runs = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def start(self) -> None:
+        """Spawn the worker processes now instead of on the first parallel run."""
+        if self.workers > 1:
+            pool = self._get_pool()
+            for f in [pool.submit(abs, 0) for _ in range(self.workers)]:
+                f.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def pivots(self, candidates: np.ndarray, samples: int, seed: int) -> np.ndarray:
+        if samples >= len(candidates):
+            return np.asarray(candidates, dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        return np.sort(rng.choice(np.asarray(candidates, dtype=np.int64), size=samples, replace=False))
+
+    def compute(
+        self,
+        A: sp.csr_matrix,
+        candidates: np.ndarray,
+        samples: Optional[int] = None,
+        epsilon: Optional[float] = None,
+        delta: float = 0.1,
+        seed: int = 0,
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Estimated scores over A's nodes (pivots drawn from `candidates`) and
+        the run's parameters: samples, epsilon, delta, seed, error_bound (raw
+        score units), workers, exact.
+        """
+        n = len(candidates)
+        if samples is None:
+            samples = sample_size(n, epsilon if epsilon is not None else 0.05, delta)
+        samples = max(1, min(int(samples), n)) if n else 0
+        pivots = self.pivots(candidates, samples, seed)
+        parallel = self.workers > 1 and len(pivots) >= self.min_parallel_pivots
+        if parallel:
+            chunks = [c for c in np.array_split(pivots, self.workers * 4) if len(c)]
+            with SharedCSR(A) as shared:
+                futures = [self._get_pool().submit(_pivot_chunk, shared.spec, c) for c in chunks]
+                partial = [f.result() for f in futures]
+            # Summed in chunk order: the same pivots always give bit-identical scores
+            sums = np.sum(partial, axis=0) if partial else np.zeros(A.shape[0])
+        else:
+            sums = native_analytics.betweenness(A, sources=pivots) if len(pivots) else np.zeros(A.shape[0])
+        scores = sums * (n / len(pivots)) if len(pivots) else sums
+        eps = epsilon_for(n, len(pivots), delta)
+        self.runs += 1
+        self.parallel_runs += int(parallel)
+        return scores, {
+            "samples": int(len(pivots)),
+            "candidates": int(n),
+            "epsilon": eps,
+            "delta": delta,
+            "seed": seed,
+            "error_bound": eps * n * max(n - 1, 0),
+            "workers": self.workers if parallel else 1,
+            "exact": len(pivots) >= n,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "min_parallel_pivots": self.min_parallel_pivots,
+                "runs": self.runs, "parallel_runs": self.parallel_runs}
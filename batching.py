@@ -0,0 +1,119 @@
+"""
+Chunked UNWIND writes.
+
+Rows are grouped into fixed-size batches and each batch is sent as a
+single `UNWIND $rows AS row ...` query inside a managed write
+transaction (session.execute_write). The driver retries a transaction
+on transient errors such as deadlocks or leader switches.
+"""
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_BATCH_SIZE = 5000
+
+def chunked(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+class BatchStats:
+    """Counters for one write phase (e.g. one relationship type)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.counters: Dict[str, int] = {}
+        # (rows, seconds) of every batch, for per-batch throughput
+        self.history: List[Tuple[int, float]] = []
+        self.failed_batches = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def add(self, rows: int, seconds: float, counters: Dict[str, int]) -> None:
+        self.rows += rows
+        self.batches += 1
+        self.seconds += seconds
+        self.history.append((rows, seconds))
+        for k, v in counters.items():
+            if v:
+                self.counters[k] = self.counters.get(k, 0) + v
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phase": self.name,
+            "rows": self.rows,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 4),
+            "rows_per_sec": round(self.rows_per_sec, 1),
+            "counters": dict(self.counters),
+            "failed_batches": self.failed_batches,
+            "per_batch": [
+                {"rows": rows, "seconds": round(sec, 4), "rows_per_sec": round(rows / sec, 1) if sec > 0 else 0.0}
+                for rows, sec in self.history
+            ],
+        }
+
+def _counters(summary) -> Dict[str, int]:
+    c = summary.counters
+    return {
+        "nodes_created": c.nodes_created,
+        "nodes_deleted": c.nodes_deleted,
+        "relationships_created": c.relationships_created,
+        "relationships_deleted": c.relationships_deleted,
+        "properties_set": c.properties_set,
+    }
+
+def write_batches(
+    driver,
+    cypher: str,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    name: str = "write",
+    on_batch: Optional[Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], None]] = None,
+    on_error: Optional[Callable[[List[Dict[str, Any]], Exception], None]] = None,
+    in_tx: Optional[Callable[[Any], Any]] = None,
+    on_commit: Optional[Callable[[Any], None]] = None,
+) -> BatchStats:
+    """
+    Run `cypher` (which must read `$rows`) once per chunk of `rows`.
+
+    `on_batch(chunk, records)` receives each chunk with the records the
+    query returned for it, e.g. for per-item status reporting. Without
+    `on_error` a failed batch (after the driver's retries) aborts the run;
+    with it, `on_error(chunk, exc)` is called and the next batch goes on.
+    `in_tx(tx)` runs at the end of every batch transaction (e.g. the graph
+    version bump) and `on_commit` gets its value once that batch committed.
+    """
+    stats = BatchStats(name)
+
+    def work(tx, chunk):
+        result = tx.run(cypher, rows=chunk)
+        records = [r.data() for r in result]
+        summary = result.consume()
+        return records, summary, in_tx(tx) if in_tx is not None else None
+
+    with driver.session() as session:
+        for chunk in chunked(rows, batch_size):
+            started = time.perf_counter()
+            try:
+                records, summary, extra = session.execute_write(work, chunk)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                stats.failed_batches += 1
+                on_error(chunk, e)
+                continue
+            stats.add(len(chunk), time.perf_counter() - started, _counters(summary))
+            if on_commit is not None:
+                on_commit(extra)
+            if on_batch is not None:
+                on_batch(chunk, records)
+    return stats
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Load test: sync handlers (main:app) vs async handlers (main_async:app)
+Usage:
+    python bench_async.py                                  # starts both apps with uvicorn, 128 clients
+    python bench_async.py --concurrency 100 200 400 --requests 4000
+    python bench_async.py --sync-url http://localhost:8000 --async-url http://localhost:8001
+
+Needs a running Neo4j with the Tam Quoc data (python full_data_loader.py).
+Each client loops over a fixed mix of read endpoints; the report gives
+requests/sec and p50/p95/p99 latency per app and concurrency level.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+# Read mix sent by every client, in rotation
+ENDPOINTS = [
+    ("/characters", {"limit": 50}),
+    ("/search", {"name": "Lưu"}),
+    ("/query/subgraph", {"name": "Lưu Bị", "maxDepth": 2}),
+    ("/query/shortest_path", {"from_name": "Lưu Bị", "to_name": "Tào Tháo"}),
+    ("/query/multi_hop", {"name": "Gia Cát Lượng", "hops": 2}),
+    ("/visual/neighbors", {"name": "Tào Tháo", "depth": 1}),
+    ("/query/centrality", {"method": "degree", "limit": 10}),
+]
+
+def _start_server(module, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError(f"{module}:app did not become healthy on port {port}")
+
+async def _run(url, concurrency, total):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                path, params = ENDPOINTS[i % len(ENDPOINTS)]
+                started = time.perf_counter()
+                try:
+                    resp = await client.get(path, params=params)
+                    if resp.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": np.percentile(ms, 50),
+        "p95": np.percentile(ms, 95),
+        "p99": np.percentile(ms, 99),
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[128])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sync-url")
+    parser.add_argument("--async-url")
+    args = parser.parse_args()
+
+    procs = []
+    try:
+        targets = []
+        for label, module, port, url in (("sync", "main", 8101, args.sync_url), ("async", "main_async", 8102, args.async_url)):
+            if url is None:
+                proc, url = _start_server(module, port)
+                procs.append(proc)
+            targets.append((label, url))
+
+        print("⚡ Sync vs async handler benchmark")
+        print("=" * 72)
+        print(f"{'app':<7}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+        for concurrency in args.concurrency:
+            for label, url in targets:
+                # Warm up connection pools and caches before timing
+                asyncio.run(_run(url, min(concurrency, 16), len(ENDPOINTS) * 4))
+                r = asyncio.run(_run(url, concurrency, args.requests))
+                print(f"{label:<7}{concurrency:>8}{r['rps']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['errors']:>9}")
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
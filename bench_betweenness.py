@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Sampled vs exact betweenness (approx_betweenness.py), no Neo4j needed
+Usage:
+    python bench_betweenness.py                                  # 2*10^3 and 2*10^4 edges
+    python bench_betweenness.py --edges 100000 --samples 128 512 --workers 4
+    python bench_betweenness.py --epsilons 0.1 0.05              # size samples from an error bound
+
+For every synthetic graph (synthetic_graph.generate) the exact scores come
+from native_analytics.betweenness over all pivots, the same computation
+/query/centrality?method=betweenness&engine=native runs. Each sample size
+is then timed in-process and over --workers processes (shared-memory
+adjacency), and compared with the exact scores:
+
+- speedup:   exact seconds / sampled seconds
+- max err:   largest |estimate - exact| / (N (N - 1)), next to the
+             epsilon bound the sample size guarantees with prob. 1 - delta
+- top-k:     share of the exact top --limit found in the sampled top --limit
+- spearman:  rank correlation over all Character nodes
+- seeds:     top-k overlap between seed 0 and seed 1 (how much the ranking
+             moves with the pivot draw; the same seed always repeats exactly)
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from scipy.stats import spearmanr
+
+import native_analytics
+from approx_betweenness import ApproxBetweenness, sample_size
+from graph_backend import CSRGraph
+from synthetic_graph import generate
+
+def _top(scores, idx, k):
+    return set(idx[np.argsort(-scores[idx], kind="stable")][:k].tolist())
+
+def _run(edges, args, runners):
+    g = CSRGraph(*generate(edges))
+    mask = g.label_mask("Character")
+    idx = np.nonzero(mask)[0]
+    n = len(idx)
+    A = native_analytics.adjacency(g, mask)
+    print(f"\n{edges:,} edges / {n:,} Characters")
+
+    started = time.perf_counter()
+    exact = native_analytics.betweenness(A)
+    exact_s = time.perf_counter() - started
+    print(f"   exact: {exact_s:.2f}s")
+    exact_top = _top(exact, idx, args.limit)
+    norm = max(n * (n - 1), 1)
+
+    sizes = list(args.samples) + [sample_size(n, eps, args.delta) for eps in args.epsilons]
+    print(f"   {'samples':>8}{'workers':>9}{'seconds':>10}{'speedup':>9}{'max err':>10}{'bound':>9}{'top-k':>8}{'spearman':>10}{'seeds':>8}")
+    for samples in sizes:
+        for runner in runners:
+            started = time.perf_counter()
+            scores, info = runner.compute(A, idx, samples=samples, delta=args.delta, seed=0)
+            seconds = time.perf_counter() - started
+            other, _ = runner.compute(A, idx, samples=samples, delta=args.delta, seed=1)
+            err = float(np.abs(scores[idx] - exact[idx]).max()) / norm
+            top = _top(scores, idx, args.limit)
+            rho = spearmanr(scores[idx], exact[idx]).correlation
+            print(f"   {info['samples']:>8}{info['workers']:>9}{seconds:>10.2f}{exact_s / seconds:>8.1f}x{err:>10.4f}"
+                  f"{info['epsilon']:>9.3f}{len(top & exact_top) / args.limit:>8.0%}{rho:>10.3f}"
+                  f"{len(top & _top(other, idx, args.limit)) / args.limit:>8.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, nargs="*", default=[2_000, 20_000])
+    parser.add_argument("--samples", type=int, nargs="*", default=[64, 256, 1024])
+    parser.add_argument("--epsilons", type=float, nargs="*", default=[])
+    parser.add_argument("--delta", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--limit", type=int, default=20, help="k of the top-k comparison")
+    args = parser.parse_args()
+
+    print("🏁 Sampled betweenness vs exact (in-process, synthetic graphs)")
+    print("=" * 92)
+    runners = [ApproxBetweenness(workers=1)]
+    if args.workers > 1:
+        runners.append(ApproxBetweenness(workers=args.workers, min_parallel_pivots=1))
+        # Process start-up is paid once per server, not per request
+        runners[-1].start()
+    try:
+        for edges in args.edges:
+            _run(edges, args, runners)
+    finally:
+        for runner in runners:
+            runner.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark suite: main.py in-process, no Neo4j needed
+Usage:
+    python bench_endpoints.py                               # 10^2, 10^4, 10^6 edges
+    python bench_endpoints.py --scales 100 10000 --requests 200 --concurrency 16
+    python bench_endpoints.py --save-baseline               # record bench_baseline.json
+    python bench_endpoints.py --baseline bench_baseline.json --tolerance 0.3
+
+Every scale runs in its own subprocess with GRAPH_BACKEND=memory and
+GRAPH_SNAPSHOT_SOURCE=synthetic (synthetic_graph.generate), and drives the
+app through httpx.ASGITransport - no sockets, no server. Per endpoint the
+report gives p50/p95/p99 latency, throughput at --concurrency and the
+peak traced allocation of one request (tracemalloc, NumPy included).
+An endpoint stops early after --budget seconds of requests.
+The response cache is off unless --cache is given, so the numbers are
+for computing the answer, not for serving it from memory.
+
+Routes that only talk to Neo4j (CRUD, bulk writes, Cypher-only queries)
+are listed as not covered. With --baseline, an endpoint whose p95 or
+peak memory is more than --tolerance above the baseline (and above a
+small absolute floor) fails the run with exit code 1. Baselines are
+machine specific: record them on the machine that compares against them.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Regressions smaller than these are noise whatever the ratio
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KB = 256.0
+
+LORD = "Thục Hán #0"
+RIVAL = "Tào Ngụy #1"
+
+# (name, path, params, max_edges): cases above max_edges are skipped at that scale
+CASES = [
+    ("search", "/search", {"name": "thuc han 12", "limit": 10}, None),
+    ("search.short", "/search", {"name": "ta", "limit": 10}, None),
+    ("multi_hop", "/query/multi_hop", {"name": LORD, "hops": 2, "limit": 500}, None),
+    ("multi_hop.range", "/query/multi_hop", {"name": LORD, "min_hops": 1, "max_hops": 3, "limit": 500}, None),
+    ("multi_hop.ndjson", "/query/multi_hop", {"name": LORD, "hops": 2, "limit": 500, "stream": "ndjson"}, None),
+    ("filter_relation", "/query/filter_relation", {"name": LORD, "rel_type": "SERVES_AS_GENERAL", "limit": 500}, None),
+    ("subgraph", "/query/subgraph", {"name": LORD, "maxDepth": 2}, None),
+    ("subgraph.budget", "/query/subgraph", {"name": LORD, "maxDepth": 6, "max_nodes": 500, "max_edges": 2000}, None),
+    ("visual", "/query/visual", {"name": LORD, "maxDepth": 1}, None),
+    ("visual.columnar", "/query/visual", {"name": LORD, "maxDepth": 1, "format": "columnar"}, None),
+    ("visual.layout", "/query/visual", {"name": LORD, "maxDepth": 1, "layout": "true"}, None),
+    ("neighbors", "/visual/neighbors", {"id": 0, "depth": 2, "limit": 50}, None),
+    ("neighbors.offset", "/visual/neighbors", {"id": 0, "depth": 2, "offset": 50, "limit": 50}, None),
+    ("neighbors.cursor", "/visual/neighbors", {"cursor": None, "limit": 50}, None),
+    ("shortest_path", "/query/shortest_path", {"from_name": LORD, "to_name": RIVAL}, None),
+    ("shortest_path.k3", "/query/shortest_path", {"from_name": LORD, "to_name": RIVAL, "k": 3}, 100_000),
+    ("centrality.pagerank", "/query/centrality", {"method": "pagerank", "engine": "native"}, None),
+    ("centrality.eigenvector", "/query/centrality", {"method": "eigenvector", "engine": "native"}, None),
+    # Exact all-pairs algorithms: seconds per call from 10^4 edges on
+    ("centrality.betweenness", "/query/centrality", {"method": "betweenness", "engine": "native"}, 1_000),
+    ("centrality.closeness", "/query/centrality", {"method": "closeness", "engine": "native"}, 1_000),
+    ("centrality.betweenness.approx", "/query/centrality",
+     {"method": "betweenness", "engine": "native", "approx": "true", "samples": 64}, 100_000),
+    # First request runs Louvain, the rest page through the cached partition
+    ("communities", "/query/communities", {"engine": "native", "limit": 20}, 100_000),
+    ("cache.stats", "/cache/stats", {}, None),
+    ("layout.stats", "/layout/stats", {}, None),
+    ("search.stats", "/search/stats", {}, None),
+]
+
+# ---------- Worker: one scale, one process ----------
+async def _prepare(client, name, params):
+    if name == "neighbors.cursor":
+        # Page 2 of the neighbourhood, through the cursor the first page hands out
+        first = (await client.get("/visual/neighbors", params={"id": 0, "depth": 2, "limit": params["limit"]})).json()
+        params = {**params, "cursor": first.get("page", {}).get("next_cursor")}
+        if not params["cursor"]:
+            return None
+    return params
+
+async def _measure(client, path, params, requests, concurrency, budget):
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+    deadline = time.perf_counter() + budget
+
+    async def worker():
+        nonlocal errors
+        for _ in counter:
+            if time.perf_counter() > deadline:
+                break
+            started = time.perf_counter()
+            resp = await client.get(path, params=params)
+            latencies.append(time.perf_counter() - started)
+            if resp.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    await client.get(path, params=params)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "p99": float(np.percentile(ms, 99)),
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "peak_kb": peak / 1024,
+        "errors": errors,
+    }
+
+async def _worker(edges, requests, concurrency, budget):
+    import httpx
+    import main
+    from fastapi.routing import APIRoute
+
+    # httpx logs every request at INFO once the loader has configured logging
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    g = main._snapshots.get()
+    out = {"edges": edges, "nodes": g.n, "snapshot_seconds": time.perf_counter() - started, "endpoints": {}}
+    covered = set()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600.0) as client:
+        for name, path, params, max_edges in CASES:
+            if max_edges is not None and edges > max_edges:
+                out["endpoints"][name] = {"skipped": f"only up to {max_edges:,} edges"}
+                continue
+            params = await _prepare(client, name, params)
+            if params is None:
+                out["endpoints"][name] = {"skipped": "no second page at this scale"}
+                continue
+            # Warm-up: lazy indexes, first snapshot use, layout caches
+            warm = await client.get(path, params=params)
+            if warm.status_code != 200:
+                out["endpoints"][name] = {"skipped": f"HTTP {warm.status_code}: {warm.text[:120]}"}
+                continue
+            out["endpoints"][name] = await _measure(client, path, params, requests, concurrency, budget)
+            covered.add(path)
+    out["not_covered"] = sorted(
+        f"{m} {r.path}" for r in main.app.routes if isinstance(r, APIRoute) for m in r.methods
+        if not (m == "GET" and r.path in covered)
+    )
+    return out
+
+# ---------- Driver ----------
+def _run_scale(edges, args):
+    env = dict(os.environ, GRAPH_BACKEND="memory", GRAPH_SNAPSHOT_SOURCE="synthetic", SYNTHETIC_EDGES=str(edges))
+    if not args.cache:
+        env["RESPONSE_CACHE_SIZE"] = "0"
+    cmd = [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--worker", str(edges),
+           "--requests", str(args.requests), "--concurrency", str(args.concurrency), "--budget", str(args.budget)]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(f"worker for {edges:,} edges failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def _compare(results, baseline, tolerance):
+    failures = []
+    for scale, res in results.items():
+        for name, cur in res["endpoints"].items():
+            base = baseline.get(scale, {}).get("endpoints", {}).get(name)
+            if not base or "skipped" in cur or "skipped" in base:
+                continue
+            if cur["p95"] > base["p95"] * (1 + tolerance) and cur["p95"] - base["p95"] > MIN_LATENCY_DELTA_MS:
+                failures.append(f"{scale} edges {name}: p95 {base['p95']:.2f} -> {cur['p95']:.2f} ms")
+            if cur["peak_kb"] > base["peak_kb"] * (1 + tolerance) and cur["peak_kb"] - base["peak_kb"] > MIN_MEMORY_DELTA_KB:
+                failures.append(f"{scale} edges {name}: peak {base['peak_kb']:.0f} -> {cur['peak_kb']:.0f} KB")
+            if cur["errors"]:
+                failures.append(f"{scale} edges {name}: {cur['errors']} non-200 responses")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="*", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--budget", type=float, default=20.0, help="max seconds of requests per endpoint")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(asyncio.run(_worker(args.worker, args.requests, args.concurrency, args.budget))))
+        return
+
+    print("🏁 Endpoint benchmark (in-process, synthetic graphs)")
+    print("=" * 92)
+    results = {}
+    for edges in args.scales:
+        res = _run_scale(edges, args)
+        results[str(edges)] = res
+        print(f"\n{res['edges']:,} edges / {res['nodes']:,} nodes (snapshot {res['snapshot_seconds']:.2f}s), "
+              f"{args.requests} requests x {args.concurrency} clients")
+        print(f"   {'endpoint':<26}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'peak KB':>12}{'errors':>8}")
+        for name, r in res["endpoints"].items():
+            if "skipped" in r:
+                print(f"   {name:<26}{'skipped: ' + r['skipped']:>66}")
+                continue
+            print(f"   {name:<26}{r['requests']:>6}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['p99']:>10.2f}{r['rps']:>10.1f}"
+                  f"{r['peak_kb']:>12.0f}{r['errors']:>8}")
+    print(f"\n⚠️  Not covered (need Neo4j): {', '.join(results[str(args.scales[-1])]['not_covered'])}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            failures = _compare(results, json.load(f), args.tolerance)
+        if failures:
+            print(f"\n❌ {len(failures)} regression(s) against {args.baseline}:")
+            for line in failures:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
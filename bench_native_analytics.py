@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the in-process centrality engine (native_analytics.py)
+Usage:
+    python bench_native_analytics.py                       # 1e5 and 1e6 edges
+    python bench_native_analytics.py --edges 100000 --pivots 512
+    python bench_native_analytics.py --compare-gds         # check scores vs GDS on the live database
+
+Betweenness and closeness are O(V*E); above --exact-limit nodes they are
+timed on a pivot sample and the full runtime is extrapolated linearly.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import native_analytics
+from graph_backend import CSRGraph
+from synthetic_graph import generate
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - started
+
+def bench(num_edges, pivots, exact_limit):
+    print(f"\n📐 Synthetic graph with {num_edges:,} edges")
+    (nodes, edges), t_gen = _timed(generate, num_edges)
+    g, t_csr = _timed(CSRGraph, nodes, edges)
+    A, t_adj = _timed(native_analytics.adjacency, g)
+    print(f"   nodes={g.n:,} edges={g.m:,}  generate={t_gen:.2f}s csr={t_csr:.2f}s adjacency={t_adj:.3f}s")
+
+    _, t = _timed(native_analytics.pagerank, A)
+    print(f"   pagerank     {t * 1000:10.1f} ms")
+    _, t = _timed(native_analytics.eigenvector, A)
+    print(f"   eigenvector  {t * 1000:10.1f} ms")
+
+    if g.n <= exact_limit:
+        _, t = _timed(native_analytics.betweenness, A)
+        print(f"   betweenness  {t * 1000:10.1f} ms (exact)")
+        _, t = _timed(native_analytics.closeness, A)
+        print(f"   closeness    {t * 1000:10.1f} ms (exact)")
+    else:
+        sample = np.random.default_rng(0).choice(g.n, size=min(pivots, g.n), replace=False)
+        _, t = _timed(native_analytics.betweenness, A, sources=sample)
+        print(f"   betweenness  {t * 1000:10.1f} ms for {len(sample)} pivots "
+              f"(~{t * g.n / len(sample):.0f}s extrapolated exact)")
+        batch = native_analytics.default_batch_size(g.n)
+        _, t = _timed(native_analytics._batched_bfs, A, sample[:batch])
+        print(f"   closeness    {t * 1000:10.1f} ms per BFS batch of {min(batch, len(sample))} "
+              f"(~{t * g.n / min(batch, len(sample)):.0f}s extrapolated exact)")
+
+def compare_gds():
+    """Run each method natively and through GDS on the live database and report the max score gap."""
+    from neo4j import GraphDatabase
+    from graph_backend import load_snapshot_from_neo4j
+
+    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "changeit"))
+    try:
+        g = load_snapshot_from_neo4j(driver)
+        print(f"\n🔬 Comparing against GDS ({g.n} nodes, {g.m} relationships)")
+        with driver.session() as s:
+            s.run("CALL gds.graph.drop('bench_compare', false) YIELD graphName RETURN graphName").consume()
+            s.run("CALL gds.graph.project('bench_compare', 'Character', '*')").consume()
+            try:
+                for method, proc in (
+                    ("pagerank", "gds.pageRank.stream"),
+                    ("betweenness", "gds.betweenness.stream"),
+                    ("closeness", "gds.closeness.stream"),
+                    ("eigenvector", "gds.eigenvector.stream"),
+                ):
+                    gds_scores = {
+                        r["id"]: r["score"]
+                        for r in s.run(f"CALL {proc}('bench_compare') YIELD nodeId, score "
+                                       "RETURN id(gds.util.asNode(nodeId)) AS id, score")
+                    }
+                    scores, _ = native_analytics.compute(g, method)
+                    gap = max(abs(scores[g.index_for_id(i)] - v) for i, v in gds_scores.items())
+                    status = "✅" if gap <= native_analytics.GDS_TOLERANCE else "❌"
+                    print(f"   {status} {method:<12} max |native - gds| = {gap:.3e}")
+            finally:
+                s.run("CALL gds.graph.drop('bench_compare', false) YIELD graphName RETURN graphName").consume()
+    finally:
+        driver.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, nargs="*", default=[100_000, 1_000_000])
+    parser.add_argument("--pivots", type=int, default=256)
+    parser.add_argument("--exact-limit", type=int, default=5_000)
+    parser.add_argument("--compare-gds", action="store_true")
+    args = parser.parse_args()
+
+    print("⚡ Native centrality benchmark")
+    print("=" * 50)
+    for m in args.edges:
+        bench(m, args.pivots, args.exact_limit)
+    if args.compare_gds:
+        compare_gds()
+
+if __name__ == "__main__":
+    main()
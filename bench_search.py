@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+/search latency: NameIndex vs a CONTAINS-style scan, as the name count grows
+Usage:
+    python bench_search.py                          # 10k, 100k, 500k names
+    python bench_search.py --sizes 1000 1000000 --queries 500
+
+Names are random Vietnamese-style "<surname> <given> <given>" strings. The
+scan baseline does what `WHERE c.name CONTAINS $name` does without an
+index: test every name (it only finds exact-accent substrings). Queries
+are typed without diacritics, the way users type them.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from name_search import NameIndex, fold
+
+SURNAMES = ["Lưu", "Tào", "Tôn", "Gia Cát", "Triệu", "Quan", "Trương", "Mã", "Hạ Hầu", "Tư Mã",
+            "Chu", "Lục", "Hoàng", "Ngụy", "Khương", "Đặng", "Điển", "Viên", "Lữ", "Đổng"]
+GIVEN = ["Bị", "Vũ", "Phi", "Vân", "Lượng", "Tháo", "Quyền", "Sách", "Du", "Tốn", "Siêu", "Trung",
+         "Duy", "Ý", "Uyên", "Đôn", "Ngải", "Thuyền", "Bố", "Trác", "Thiệu", "Thuật", "Hưu", "Đức"]
+
+def _names(n, rng):
+    return [f"{rng.choice(SURNAMES)} {rng.choice(GIVEN)} {rng.choice(GIVEN)}" for _ in range(n)]
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return statistics.mean(samples) * 1000, pick(0.5), pick(0.99)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    print("🔎 Name search benchmark")
+    print("=" * 78)
+    print(f"   {'names':>9}{'build s':>10}{'index mean/p50/p99 ms':>28}{'scan mean/p50/p99 ms':>28}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        names = _names(size, rng)
+        index = NameIndex(lambda: enumerate(names), max_age=0)
+        started = time.perf_counter()
+        index.rebuild()
+        build = time.perf_counter() - started
+
+        queries = [fold(rng.choice(names)) for _ in range(args.queries)]
+        # Partial input as typed in the search box: first word plus part of the next
+        queries = [q[:rng.randint(2, len(q))] for q in queries]
+        idx_t, scan_t = [], []
+        for q in queries:
+            started = time.perf_counter()
+            index.search(q, args.limit)
+            idx_t.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            [n for n in names if q in n][:args.limit]
+            scan_t.append(time.perf_counter() - started)
+        i, s = _percentiles(idx_t), _percentiles(scan_t)
+        print(f"   {size:>9,}{build:>10.2f}{'%.2f / %.2f / %.2f' % i:>28}{'%.2f / %.2f / %.2f' % s:>28}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Payload size and serialization time of the /visual/neighbors wire formats
+Usage:
+    python bench_wire_format.py                        # neighborhoods of 500 .. 20k nodes
+    python bench_wire_format.py --edges 1000000 --limits 1000 50000
+
+Neighborhoods come from the in-memory backend over a synthetic graph.
+"json" is timed the way FastAPI renders a dict (jsonable_encoder +
+json.dumps); the compact formats are timed through wire_format.encode.
+"""
+
+import argparse
+import gzip
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+import wire_format
+from graph_backend import CSRGraph, GraphSnapshotStore, InMemoryGraphBackend
+from synthetic_graph import FACTIONS, generate
+
+def _timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - started)
+    return out, best
+
+def _fastapi_json(graph):
+    return json.dumps(jsonable_encoder(graph), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, default=200_000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--limits", type=int, nargs="*", default=[500, 5_000, 20_000])
+    args = parser.parse_args()
+
+    nodes, edges = generate(args.edges)
+    g = CSRGraph(nodes, edges)
+    backend = InMemoryGraphBackend(GraphSnapshotStore(lambda: g))
+    lord = f"{FACTIONS[0]} #0"
+
+    print("📦 Wire format benchmark")
+    print("=" * 78)
+    print(f"graph: {g.n:,} nodes, {g.m:,} edges; neighborhood of '{lord}' at depth {args.depth}")
+    formats = [f for f in ("columnar", "msgpack") if f in wire_format.available_formats()]
+    for limit in args.limits:
+        graph = backend.neighbors(None, lord, args.depth, 0, limit)
+        print(f"\n{len(graph['nodes']):,} nodes / {len(graph['edges']):,} edges")
+        print(f"   {'format':<10}{'bytes':>12}{'gzip':>12}{'encode ms':>12}{'size vs json':>14}")
+        base, t = _timed(lambda: _fastapi_json(graph))
+        rows = [("json", base, t)]
+        for fmt in formats:
+            body, t = _timed(lambda: wire_format.encode(graph, fmt))
+            rows.append((fmt, body, t))
+        for fmt, body, t in rows:
+            print(f"   {fmt:<10}{len(body):>12,}{len(gzip.compress(body, 6)):>12,}{t * 1000:>12.2f}"
+                  f"{len(body) / len(base):>13.0%}")
+
+if __name__ == "__main__":
+    main()
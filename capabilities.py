@@ -0,0 +1,131 @@
+"""
+Server capability registry.
+
+Probes the Neo4j server once (procedures, functions, GDS/APOC versions,
+server version and edition) and caches the answer for `ttl` seconds, so
+endpoints can pick a query plan up front instead of running SHOW
+PROCEDURES per request or trying an APOC query and catching the failure.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional
+
+# Procedures the API has a dedicated plan for
+KNOWN_PROCEDURES = (
+    "apoc.path.subgraphAll",
+    "apoc.path.subgraphNodes",
+    "apoc.path.expandConfig",
+    "apoc.path.spanningTree",
+    "gds.graph.project",
+    "gds.pageRank.stream",
+    "gds.betweenness.stream",
+    "gds.closeness.stream",
+    "gds.eigenvector.stream",
+    "gds.shortestPath.yens.stream",
+    "gds.louvain.mutate",
+    "gds.graph.nodeProperty.stream",
+)
+
+@dataclass(frozen=True)
+class Capabilities:
+    procedures: FrozenSet[str] = frozenset()
+    functions: FrozenSet[str] = frozenset()
+    server_version: Optional[str] = None
+    server_edition: Optional[str] = None
+    gds_version: Optional[str] = None
+    apoc_version: Optional[str] = None
+    probed_at: float = 0.0
+    error: Optional[str] = None
+    gds: bool = field(init=False)
+    apoc: bool = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "gds", any(p.startswith("gds.") for p in self.procedures))
+        object.__setattr__(self, "apoc", any(p.startswith("apoc.") for p in self.procedures))
+
+    def has(self, name: str) -> bool:
+        return name in self.procedures or name in self.functions
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "server": {"version": self.server_version, "edition": self.server_edition},
+            "gds": {"available": self.gds, "version": self.gds_version},
+            "apoc": {"available": self.apoc, "version": self.apoc_version},
+            "procedures": {name: self.has(name) for name in KNOWN_PROCEDURES},
+            "procedure_count": len(self.procedures),
+            "function_count": len(self.functions),
+            "probed_at": self.probed_at,
+            "error": self.error,
+        }
+
+class CapabilityRegistry:
+    # A failed probe (server down at startup, ...) is retried sooner than the TTL
+    ERROR_RETRY = 10.0
+
+    def __init__(self, driver, ttl: float = 300.0):
+        self.driver = driver
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._current = Capabilities()
+        self._expires_at = 0.0
+
+    def get(self) -> Capabilities:
+        """Cached capabilities; re-probed once they are older than the TTL."""
+        caps = self._current
+        if time.time() < self._expires_at:
+            return caps
+        # One thread re-probes; the others keep serving the previous answer
+        if self._lock.acquire(blocking=False):
+            try:
+                return self._probe()
+            finally:
+                self._lock.release()
+        return caps
+
+    def refresh(self) -> Capabilities:
+        with self._lock:
+            return self._probe()
+
+    def expire(self) -> None:
+        """Force a re-probe on the next get() (e.g. after a ProcedureNotFound error)."""
+        self._expires_at = 0.0
+
+    def _probe(self) -> Capabilities:
+        try:
+            with self.driver.session() as s:
+                procedures = frozenset(r["name"] for r in s.run("SHOW PROCEDURES YIELD name RETURN name"))
+                functions = frozenset(r["name"] for r in s.run("SHOW FUNCTIONS YIELD name RETURN name"))
+                server_version = server_edition = None
+                for r in s.run("CALL dbms.components() YIELD name, versions, edition RETURN name, versions, edition"):
+                    if r["name"] == "Neo4j Kernel":
+                        server_version = (r["versions"] or [None])[0]
+                        server_edition = r["edition"]
+                gds_version = s.run("RETURN gds.version() AS v").single()["v"] if "gds.version" in functions else None
+                apoc_version = s.run("RETURN apoc.version() AS v").single()["v"] if "apoc.version" in functions else None
+            caps = Capabilities(
+                procedures=procedures,
+                functions=functions,
+                server_version=server_version,
+                server_edition=server_edition,
+                gds_version=gds_version,
+                apoc_version=apoc_version,
+                probed_at=time.time(),
+            )
+            self._expires_at = caps.probed_at + self.ttl
+        except Exception as e:
+            # Keep what we knew, but retry well before the TTL
+            prev = self._current
+            caps = Capabilities(
+                procedures=prev.procedures,
+                functions=prev.functions,
+                server_version=prev.server_version,
+                server_edition=prev.server_edition,
+                gds_version=prev.gds_version,
+                apoc_version=prev.apoc_version,
+                probed_at=time.time(),
+                error=str(e),
+            )
+            self._expires_at = caps.probed_at + min(self.ttl, self.ERROR_RETRY)
+        self._current = caps
+        return caps
@@ -0,0 +1,204 @@
+"""
+Incrementally maintained centrality behind /query/centrality.
+
+- degree: one counter per Character (relationships of any type and
+  direction, like COUNT {(n)--()}), loaded once and then moved by the
+  write endpoints through apply(); a write never triggers a rescan
+- pagerank / eigenvector (native engine): the last score vector is kept
+  with the node ids it belongs to, and after a write the power iteration
+  restarts from it (new nodes get the cold-start value), so a small delta
+  converges in a few iterations instead of max_iter
+- betweenness / closeness: recomputed, at most once per snapshot;
+  sampled_betweenness() (approx=true) is not kept here, the response cache
+  already keys it by its sampling parameters
+
+Every answer carries the graph version it reflects. apply() only follows
+a write that moves the counters to the very next version; any gap (a write
+that did not report its delta, or one racing the load) drops the counters
+and the next read reloads them, as does an age above `max_age` (writes
+made outside the API, e.g. full_data_loader.py).
+"""
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import native_analytics
+from graph_backend import CSRGraph
+from graph_version import GraphVersion
+
+WARM_METHODS = ("pagerank", "eigenvector")
+
+def degree_rows(g: CSRGraph, label: str = "Character") -> List[Tuple[int, Any, int]]:
+    """(id, name, degree) per `label` node of a snapshot: the rows the Neo4j degree loader returns."""
+    degree = np.diff(g.out_indptr) + np.diff(g.in_indptr)
+    return [(int(g.node_ids[i]), g.node_props[i].get("name"), int(degree[i])) for i in np.nonzero(g.label_mask(label))[0]]
+
+class CentralityStore:
+    def __init__(
+        self,
+        version: GraphVersion,
+        snapshot: Callable[[], CSRGraph],
+        degree_loader: Callable[[], Iterable[Tuple[Any, Any, int]]],
+        max_age: float = 600.0,
+        damping: float = 0.85,
+        max_iter: int = 20,
+        tol: float = 1e-7,
+    ):
+        self._version = version
+        self._snapshot = snapshot
+        self._degree_loader = degree_loader
+        self.max_age = max_age
+        self.damping = damping
+        self.max_iter = max_iter
+        self.tol = tol
+        self._lock = threading.Lock()
+        self._degrees: Optional[Dict[Any, int]] = None
+        self._names: Dict[Any, Any] = {}
+        self._degree_version = -1
+        self._built_at = 0.0
+        # method -> {ids, scores, mask, graph_version, iterations, warm_start}; `ids` is the
+        # snapshot's node_ids array, kept instead of the snapshot so an old one can be freed
+        self._scores: Dict[str, Dict[str, Any]] = {}
+        self.degree_loads = 0
+        self.deltas = 0
+        self.warm_starts = 0
+        self.cold_starts = 0
+
+    # ----- degree counters -----
+    def _current_degrees(self) -> Tuple[Dict[Any, int], Dict[Any, Any], int]:
+        with self._lock:
+            fresh = (
+                self._degrees is not None
+                and self._degree_version == self._version.current
+                and (not self.max_age or time.monotonic() - self._built_at < self.max_age)
+            )
+            if fresh:
+                return self._degrees, self._names, self._degree_version
+        version = self._version.current
+        rows = list(self._degree_loader())
+        degrees = {nid: d for nid, _, d in rows}
+        names = {nid: name for nid, name, _ in rows}
+        with self._lock:
+            self.degree_loads += 1
+            # A write that landed during the load may or may not be in `rows`: serve them, don't keep them
+            if self._version.current == version:
+                self._degrees, self._names, self._degree_version = degrees, names, version
+                self._built_at = time.monotonic()
+        return degrees, names, version
+
+    def degree(self, limit: int) -> Dict[str, Any]:
+        degrees, names, version = self._current_degrees()
+        with self._lock:
+            top = heapq.nlargest(max(limit, 0), degrees.items(), key=lambda kv: kv[1])
+            results = [{"name": names.get(nid), "score": d} for nid, d in top]
+        return {"method": "degree", "results": results, "engine": "counters", "graph_version": version}
+
+    def apply(self, version: int, nodes: Iterable[Tuple[Any, Any]] = (), removed: Iterable[Any] = (),
+              edges: Iterable[Tuple[Any, Any]] = ()) -> None:
+        """
+        Fold in the write that moved the graph to `version`: `nodes` are
+        (id, name) of Characters created or renamed, `removed` ids of deleted
+        Characters, `edges` (start id, end id) of relationships created.
+        """
+        with self._lock:
+            if self._degrees is None:
+                return
+            if self._degree_version != version - 1:
+                self._degrees = None
+                return
+            for nid, name in nodes:
+                self._degrees.setdefault(nid, 0)
+                self._names[nid] = name
+            for nid in removed:
+                self._degrees.pop(nid, None)
+                self._names.pop(nid, None)
+            for start, end in edges:
+                for nid in (start, end):
+                    if nid in self._degrees:
+                        self._degrees[nid] += 1
+            self._degree_version = version
+            self.deltas += 1
+
+    def invalidate(self) -> None:
+        """For writes whose delta is not tracked (bulk loads): reload the counters on the next read."""
+        with self._lock:
+            self._degrees = None
+
+    # ----- snapshot-based scores -----
+    def _warm_start(self, prev: Dict[str, Any], g: CSRGraph, method: str) -> np.ndarray:
+        """Previous scores moved onto the new snapshot's node order, by node id."""
+        old_ids, old_scores = prev["ids"], prev["scores"]
+        fill = 1.0 - self.damping if method == "pagerank" else (float(old_scores.mean()) if len(old_scores) else 0.0)
+        start = np.full(g.n, fill)
+        if g.n and len(old_ids):
+            order = np.argsort(g.node_ids, kind="stable")
+            pos = np.minimum(np.searchsorted(g.node_ids[order], old_ids), g.n - 1)
+            found = g.node_ids[order[pos]] == old_ids
+            start[order[pos[found]]] = old_scores[found]
+        return start
+
+    def scores(self, method: str) -> Tuple[CSRGraph, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """(snapshot, scores, Character mask, info) for a native method; info has graph_version, iterations, warm_start."""
+        version = self._version.current
+        g = self._snapshot()
+        with self._lock:
+            prev = self._scores.get(method)
+        if prev is not None and prev["ids"] is g.node_ids:
+            return g, prev["scores"], prev["mask"], {k: prev[k] for k in ("graph_version", "iterations", "warm_start")}
+
+        mask = g.label_mask("Character")
+        A = native_analytics.adjacency(g, mask)
+        iterations, warm = None, False
+        if method in WARM_METHODS:
+            start = None
+            if prev is not None:
+                start, warm = self._warm_start(prev, g, method), True
+            if method == "pagerank":
+                scores, iterations = native_analytics.power_pagerank(A, self.damping, self.max_iter, self.tol, start)
+            else:
+                scores, iterations = native_analytics.power_eigenvector(A, self.max_iter, self.tol, start)
+        elif method == "betweenness":
+            scores = native_analytics.betweenness(A)
+        elif method == "closeness":
+            scores = native_analytics.closeness(A)
+        else:
+            raise ValueError(f"Unknown centrality method '{method}'")
+
+        entry = {"ids": g.node_ids, "scores": scores, "mask": mask, "graph_version": version, "iterations": iterations, "warm_start": warm}
+        with self._lock:
+            self._scores[method] = entry
+            if method in WARM_METHODS:
+                if warm:
+                    self.warm_starts += 1
+                else:
+                    self.cold_starts += 1
+        return g, scores, mask, {"graph_version": version, "iterations": iterations, "warm_start": warm}
+
+    def top(self, method: str, limit: int) -> Dict[str, Any]:
+        g, scores, mask, info = self.scores(method)
+        return {"method": method, "results": native_analytics.top_scores(g, scores, limit, mask), "engine": "native", **info}
+
+    def sampled_betweenness(self, runner, limit: int, samples: Optional[int], epsilon: float, delta: float, seed: int) -> Dict[str, Any]:
+        """Pivot-sampled betweenness (approx_betweenness.ApproxBetweenness) over the Character graph."""
+        version = self._version.current
+        g = self._snapshot()
+        mask = g.label_mask("Character")
+        scores, info = runner.compute(native_analytics.adjacency(g, mask), np.nonzero(mask)[0], samples, epsilon, delta, seed)
+        return {"method": "betweenness", "results": native_analytics.top_scores(g, scores, limit, mask), "engine": "native",
+                "graph_version": version, "approx": info}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "degree_nodes": len(self._degrees) if self._degrees is not None else None,
+                "degree_version": self._degree_version if self._degrees is not None else None,
+                "degree_loads": self.degree_loads,
+                "deltas": self.deltas,
+                "warm_starts": self.warm_starts,
+                "cold_starts": self.cold_starts,
+                "scores": {m: {"graph_version": e["graph_version"], "iterations": e["iterations"], "warm_start": e["warm_start"]}
+                           for m, e in self._scores.items()},
+            }
@@ -0,0 +1,124 @@
+"""
+Community detection behind /query/communities.
+
+Louvain runs in GDS (gds.louvain.mutate on an undirected projection) when
+the server has it, otherwise in-process (native_analytics.louvain over the
+CSR snapshot). Either way the whole partition is computed once per
+(graph version, engine, parameters) and kept in a CommunityStore; the
+endpoint pages through it by community, largest first, so paging and
+repeat dashboard loads never rerun the algorithm.
+
+Every community carries its size, a faction breakdown (a community that
+holds Thục Hán and Đông Ngô members is where the two camps meet) and its
+members as {id, name, faction}.
+"""
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import native_analytics
+from graph_backend import CSRGraph
+from graph_version import GraphVersion
+
+Member = Tuple[Any, Any, Any]  # (node id, name, faction)
+
+def partition(members: Iterable[Tuple[Member, Any]]) -> List[Dict[str, Any]]:
+    """(member, community label) pairs -> communities ordered by size (ties: first member seen), ranks 0..c-1."""
+    groups: "OrderedDict[Any, List[Member]]" = OrderedDict()
+    for member, label in members:
+        groups.setdefault(label, []).append(member)
+    ordered = sorted(groups.values(), key=len, reverse=True)
+    return [
+        {
+            "community": rank,
+            "size": len(group),
+            "factions": dict(Counter(f for _, _, f in group if f is not None).most_common()),
+            "members": [{"id": nid, "name": name, "faction": faction} for nid, name, faction in group],
+        }
+        for rank, group in enumerate(ordered)
+    ]
+
+def native_partition(g: CSRGraph, resolution: float = 1.0, seed: int = 0, label: str = "Character") -> Dict[str, Any]:
+    mask = g.label_mask(label)
+    labels, q, levels = native_analytics.louvain(native_analytics.adjacency(g, mask), resolution, seed)
+    idx = np.nonzero(mask)[0]
+    members = (((int(g.node_ids[i]), g.node_props[i].get("name"), g.node_props[i].get("faction")), int(labels[i])) for i in idx)
+    return {"algorithm": "louvain", "engine": "native", "modularity": q, "levels": levels, "resolution": resolution,
+            "seed": seed, "communities": partition(members)}
+
+def page(result: Dict[str, Any], offset: int = 0, limit: int = 20, min_size: int = 1,
+         member_limit: Optional[int] = None) -> Dict[str, Any]:
+    """One page of a partition: communities [offset, offset + limit) among those with >= min_size members."""
+    eligible = [c for c in result["communities"] if c["size"] >= min_size]
+    selected = eligible[offset:offset + limit]
+    if member_limit is not None:
+        selected = [{**c, "members": c["members"][:member_limit], "members_truncated": c["size"] > member_limit}
+                    for c in selected]
+    end = offset + len(selected)
+    info = {k: v for k, v in result.items() if k != "communities"}
+    return {
+        **info,
+        "count": len(eligible),
+        "communities": selected,
+        "page": {"offset": offset, "limit": limit, "total": len(eligible), "next_offset": end if end < len(eligible) else None},
+    }
+
+class CommunityStore:
+    def __init__(self, version: GraphVersion, max_entries: int = 8):
+        self._version = version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        # (key, graph version) -> full partition
+        self._entries: "OrderedDict[Tuple[Hashable, int], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable, version: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get((key, version))
+            if entry is not None:
+                self._entries.move_to_end((key, version))
+                self.hits += 1
+            return entry
+
+    def get(self, key: Hashable, compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """(partition, cached) for `key` at the current graph version; concurrent misses on one key compute once."""
+        version = self._version.current
+        entry = self._lookup(key, version)
+        if entry is not None:
+            return entry, True
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            version = self._version.current
+            entry = self._lookup(key, version)
+            if entry is not None:
+                return entry, True
+            result = {**compute(), "graph_version": version}
+            with self._lock:
+                self.misses += 1
+                # Only keep it if no write landed while it ran
+                if self._version.current == version:
+                    for stale in [k for k in self._entries if k[1] != version]:
+                        del self._entries[stale]
+                    self._entries[(key, version)] = result
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return result, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "partitions": [{"key": list(k) if isinstance(k, tuple) else k, "graph_version": v,
+                                "engine": e["engine"], "communities": len(e["communities"]), "modularity": e["modularity"]}
+                               for (k, v), e in self._entries.items()],
+            }
@@ -0,0 +1,104 @@
+"""
+Short-lived server-side cursors for keyset paging of /visual/neighbors.
+
+The first request materialises the whole ordered neighbourhood once (node
+ids sorted by hop distance, then id) and stores it under a random token.
+Later pages hand back an opaque cursor that encodes (token, offset), so a
+page only slices the stored list and fetches `limit` nodes: O(page size)
+instead of re-running the traversal with SKIP/LIMIT. An entry expires
+after `ttl` seconds and is tied to the graph version it was built for.
+"""
+import base64
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+class CursorExpired(Exception):
+    """Unknown, expired or outdated cursor; the client should start from the first page."""
+
+class InvalidCursor(ValueError):
+    """A cursor this server could not have issued: undecodable, or an offset outside the stored list."""
+
+class NeighborhoodCursor:
+    __slots__ = ("ids", "dists", "version", "expires_at")
+
+    def __init__(self, ids: List[Any], dists: List[int], version: int, expires_at: float):
+        self.ids = ids
+        self.dists = dists
+        self.version = version
+        self.expires_at = expires_at
+
+class CursorStore:
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, NeighborhoodCursor]" = OrderedDict()
+
+    def create(self, ids: List[Any], dists: List[int], version: int) -> str:
+        token = secrets.token_urlsafe(12)
+        with self._lock:
+            self._entries[token] = NeighborhoodCursor(ids, dists, version, time.time() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token: str, version: int) -> NeighborhoodCursor:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or time.time() >= entry.expires_at:
+                self._entries.pop(token, None)
+                raise CursorExpired("cursor expired")
+            if entry.version != version:
+                del self._entries[token]
+                raise CursorExpired("graph changed since the cursor was created")
+            # Sliding expiry while the client keeps paging
+            entry.expires_at = time.time() + self.ttl
+            self._entries.move_to_end(token)
+            return entry
+
+    @staticmethod
+    def encode(token: str, offset: int) -> str:
+        return base64.urlsafe_b64encode(f"{token}:{offset}".encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode(cursor: str) -> Tuple[str, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            token, _, offset = raw.rpartition(":")
+            return token, int(offset)
+        except (ValueError, UnicodeDecodeError):
+            raise InvalidCursor("malformed cursor")
+
+    def page(self, entry: NeighborhoodCursor, token: str, offset: int, limit: int) -> Tuple[List[Any], Dict[str, Any]]:
+        """(ids of this page, page info with next_cursor)."""
+        if not 0 <= offset <= len(entry.ids):
+            raise InvalidCursor("cursor offset out of range")
+        ids = entry.ids[offset:offset + limit]
+        end = offset + len(ids)
+        info: Dict[str, Any] = {
+            "offset": offset,
+            "limit": limit,
+            "total": len(entry.ids),
+            "next_cursor": self.encode(token, end) if end < len(entry.ids) else None,
+        }
+        if ids:
+            info["hops"] = [entry.dists[offset], entry.dists[end - 1]]
+        return ids, info
+
+    def start(self, ids: List[Any], dists: List[int], version: int, limit: int) -> Tuple[List[Any], Dict[str, Any]]:
+        """Store a freshly ordered neighbourhood and return its first page."""
+        token = self.create(ids, dists, version)
+        return self.page(self.get(token, version), token, 0, limit)
+
+    def resume(self, cursor: str, version: int, limit: int) -> Tuple[List[Any], Dict[str, Any]]:
+        """The page a next_cursor points at; CursorExpired if it no longer can be served,
+        InvalidCursor if it was never a valid position."""
+        token, offset = self.decode(cursor)
+        return self.page(self.get(token, version), token, offset, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cursors": len(self._entries), "max_entries": self.max_entries, "ttl": self.ttl}
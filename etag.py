@@ -0,0 +1,86 @@
+"""
+ETag / If-None-Match for the read endpoints.
+
+Every answer of a covered GET (or HEAD) is a function of the graph
+version and the request (path, query string, Accept), so the tag is
+computed before the handler runs:
+
+    ETag: "v<graph version>-<hash of path, query and Accept>"
+
+A request whose If-None-Match lists the current tag (or is "*") gets a
+304 straight from the middleware: no handler, no Cypher, no body. Any
+other request runs normally and a 200 answer gets the tag plus
+"Cache-Control: no-cache", so browsers revalidate instead of refetching.
+If the version moved while the handler ran, the answer is sent untagged
+rather than labelled with a version it may not match.
+
+That only holds for bodies fixed by (version, request). Endpoints whose
+body also depends on server state - a fresh paging cursor, a "cached"
+flag - must stay out, by prefix or by path (`exclude_paths`): a 304
+would hand the client a stale cursor or flag.
+
+Add it inside CORSMiddleware (before it, in add_middleware order) so the
+304s carry the CORS headers too.
+"""
+import hashlib
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+def etag_for(version: Any, path: str, query: bytes, accept: bytes) -> str:
+    digest = hashlib.sha1(b"\0".join([path.encode(), query, accept])).hexdigest()[:16]
+    return f'"v{version}-{digest}"'
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # If-None-Match uses the weak comparison: W/"x" matches "x"
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == tag:
+            return True
+    return False
+
+class ETagMiddleware:
+    def __init__(
+        self,
+        app,
+        version: Callable[[], Any],
+        prefixes: Iterable[str] = (),
+        exclude_suffixes: Iterable[str] = ("/stats",),
+        exclude_paths: Iterable[str] = (),
+    ):
+        self.app = app
+        self.version = version
+        self.prefixes: Tuple[str, ...] = tuple(prefixes)
+        self.exclude_suffixes: Tuple[str, ...] = tuple(exclude_suffixes)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    def covers(self, path: str) -> bool:
+        return (path.startswith(self.prefixes) and not path.endswith(self.exclude_suffixes)
+                and path not in self.exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not self.covers(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        version = self.version()
+        tag = etag_for(version, scope["path"], scope.get("query_string", b""), headers.get(b"accept", b""))
+        if_none_match: Optional[bytes] = headers.get(b"if-none-match")
+        if if_none_match is not None and _matches(if_none_match.decode("latin-1"), tag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", tag.encode()), (b"cache-control", b"no-cache")],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_tagged(message):
+            if message["type"] == "http.response.start" and message["status"] == 200 and self.version() == version:
+                extra: List[Tuple[bytes, bytes]] = [(b"etag", tag.encode())]
+                if not any(k.lower() == b"cache-control" for k, _ in message.get("headers", [])):
+                    extra.append((b"cache-control", b"no-cache"))
+                message = {**message, "headers": list(message.get("headers", [])) + extra}
+            await send(message)
+
+        await self.app(scope, receive, send_tagged)
@@ -1,8 +1,12 @@
 # Full script to load all Tam Quoc data from three_kingdoms.js into Neo4j
 import json
+import os
 from neo4j import GraphDatabase
 import logging
 
+from batching import DEFAULT_BATCH_SIZE, write_batches
+import graph_meta
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,6 +15,9 @@ logger = logging.getLogger(__name__)
 URI = "bolt://localhost:7687"
 AUTH = ("neo4j", "changeit")  # Neo4j credentials
 
+# Rows per UNWIND transaction
+BATCH_SIZE = int(os.getenv("LOADER_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
 # Full data from three_kingdoms.js
 NODES = [
     # --- Thục Hán ---
@@ -109,9 +116,25 @@ EDGES = [
     {"from": 61, "to": 20, "label": "Từng phục vụ"},
 ]
 
+# Vietnamese relationship label -> Neo4j relationship type
+RELATIONSHIP_TYPES = {
+    "Nghĩa huynh": "SWORN_BROTHER",
+    "Chủ - tướng": "SERVES_AS_GENERAL",
+    "Quân sư": "SERVES_AS_ADVISOR",
+    "Kế thừa": "SUCCESSOR",
+    "Cha - con": "FATHER_SON",
+    "Anh - em": "SIBLINGS",
+    "Tình cảm": "ROMANTIC",
+    "Đồng minh Xích Bích": "RED_CLIFF_ALLY",
+    "Kẻ thù": "ENEMY",
+    "Từng phục vụ": "FORMERLY_SERVED"
+}
+
 class TamQuocDataLoader:
-    def __init__(self, uri, auth):
+    def __init__(self, uri, auth, batch_size=BATCH_SIZE):
         self.driver = GraphDatabase.driver(uri, auth=auth)
+        self.batch_size = batch_size
+        self.phase_stats = []
     
     def close(self):
         self.driver.close()
@@ -120,9 +143,22 @@ class TamQuocDataLoader:
         """Xóa toàn bộ database"""
         logger.info("🗑️  Clearing database...")
         with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+            # Delete in chunks so large graphs don't build one huge transaction; the
+            # GraphMeta node keeps the API's graph version counting up across reloads
+            session.run(
+                f"MATCH (n) WHERE NOT n:GraphMeta CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {int(self.batch_size)} ROWS"
+            ).consume()
         logger.info("✅ Database cleared")
     
+    def bump_graph_version(self):
+        """Tăng graph version để API bỏ cache / ETag cũ"""
+        try:
+            with self.driver.session() as session:
+                version = graph_meta.bump(session)
+            logger.info(f"🔢 Graph version is now {version}")
+        except Exception as e:
+            logger.warning(f"⚠️  Could not bump the graph version: {e}")
+
     def create_constraints(self):
         """Tạo constraints và indexes"""
         logger.info("📋 Creating constraints and indexes...")
@@ -131,93 +167,88 @@ class TamQuocDataLoader:
             session.run("CREATE CONSTRAINT character_id_unique IF NOT EXISTS FOR (c:Character) REQUIRE c.character_id IS UNIQUE")
             # Create index on faction for better performance
             session.run("CREATE INDEX faction_index IF NOT EXISTS FOR (c:Character) ON (c.faction)")
+            # Name lookups (/characters/{name}, relationship loading by name)
+            session.run("CREATE INDEX character_name IF NOT EXISTS FOR (c:Character) ON (c.name)")
+            # One version node per key (bump_graph_version MERGEs it)
+            session.run(graph_meta.CONSTRAINT_CYPHER)
         logger.info("✅ Constraints and indexes created")
     
-    def create_characters(self):
-        """Tạo tất cả nhân vật"""
+    def create_characters(self, nodes=None):
+        """Tạo tất cả nhân vật (UNWIND theo lô)"""
         logger.info("👥 Creating characters...")
+        nodes = NODES if nodes is None else nodes
         
         # Group characters by faction for better organization
         factions = {}
-        for node in NODES:
-            faction = node["group"]
-            if faction not in factions:
-                factions[faction] = []
-            factions[faction].append(node)
+        for node in nodes:
+            factions.setdefault(node["group"], []).append({
+                "character_id": node["id"],
+                "name": node["label"],
+                "faction": node["group"],
+                "color": node.get("color"),
+            })
         
-        with self.driver.session() as session:
-            for faction, characters in factions.items():
-                logger.info(f"   Creating {len(characters)} characters for {faction}...")
-                
-                for char in characters:
-                    query = """
-                    CREATE (c:Character {
-                        character_id: $character_id,
-                        name: $name,
-                        faction: $faction,
-                        color: $color
-                    })
-                    """
-                    session.run(query, 
-                               character_id=char["id"],
-                               name=char["label"],
-                               faction=char["group"],
-                               color=char["color"])
+        query = """
+        UNWIND $rows AS row
+        CREATE (c:Character {
+            character_id: row.character_id,
+            name: row.name,
+            faction: row.faction,
+            color: row.color
+        })
+        """
+        for faction, rows in factions.items():
+            stats = write_batches(self.driver, query, rows, self.batch_size, name=f"characters:{faction}")
+            self.phase_stats.append(stats)
+            logger.info(f"   Created {stats.rows} characters for {faction} "
+                        f"in {stats.batches} batch(es), {stats.rows_per_sec:,.0f} rows/s")
         
-        logger.info(f"✅ Created {len(NODES)} characters across {len(factions)} factions")
+        logger.info(f"✅ Created {len(nodes)} characters across {len(factions)} factions")
     
-    def create_relationships(self):
-        """Tạo tất cả mối quan hệ"""
+    def create_relationships(self, edges=None):
+        """Tạo tất cả mối quan hệ (UNWIND theo lô, mỗi loại quan hệ một câu lệnh)"""
         logger.info("🔗 Creating relationships...")
+        edges = EDGES if edges is None else edges
         
-        # Group relationships by type for better logging
+        # Relationship types cannot be parameters, so group rows by Neo4j type
         relationship_types = {}
-        for edge in EDGES:
-            rel_type = edge["label"]
-            if rel_type not in relationship_types:
-                relationship_types[rel_type] = []
-            relationship_types[rel_type].append(edge)
+        for edge in edges:
+            # Convert Vietnamese relationship names to valid Neo4j relationship types
+            neo4j_rel_type = self.convert_to_neo4j_relationship(edge["label"])
+            relationship_types.setdefault(neo4j_rel_type, []).append({
+                "from_id": edge["from"],
+                "to_id": edge["to"],
+                "original_type": edge["label"],
+                "description": edge["label"],
+            })
         
-        with self.driver.session() as session:
-            for rel_type, relationships in relationship_types.items():
-                logger.info(f"   Creating {len(relationships)} '{rel_type}' relationships...")
-                
-                for edge in relationships:
-                    # Convert Vietnamese relationship names to valid Neo4j relationship types
-                    neo4j_rel_type = self.convert_to_neo4j_relationship(edge["label"])
-                    
-                    query = f"""
-                    MATCH (from:Character {{character_id: $from_id}})
-                    MATCH (to:Character {{character_id: $to_id}})
-                    CREATE (from)-[r:{neo4j_rel_type} {{
-                        type: $original_type,
-                        description: $description
-                    }}]->(to)
-                    """
-                    
-                    session.run(query,
-                               from_id=edge["from"],
-                               to_id=edge["to"],
-                               original_type=edge["label"],
-                               description=edge["label"])
+        for neo4j_rel_type, rows in relationship_types.items():
+            query = f"""
+            UNWIND $rows AS row
+            MATCH (from:Character {{character_id: row.from_id}})
+            MATCH (to:Character {{character_id: row.to_id}})
+            CREATE (from)-[r:{neo4j_rel_type} {{
+                type: row.original_type,
+                description: row.description
+            }}]->(to)
+            """
+            stats = write_batches(self.driver, query, rows, self.batch_size, name=f"relationships:{neo4j_rel_type}")
+            self.phase_stats.append(stats)
+            logger.info(f"   Created {stats.counters.get('relationships_created', 0)} '{neo4j_rel_type}' relationships "
+                        f"in {stats.batches} batch(es), {stats.rows_per_sec:,.0f} rows/s")
         
-        logger.info(f"✅ Created {len(EDGES)} relationships of {len(relationship_types)} types")
+        logger.info(f"✅ Created {len(edges)} relationships of {len(relationship_types)} types")
     
     def convert_to_neo4j_relationship(self, vietnamese_label):
         """Chuyển đổi tên quan hệ tiếng Việt sang format Neo4j hợp lệ"""
-        mapping = {
-            "Nghĩa huynh": "SWORN_BROTHER",
-            "Chủ - tướng": "SERVES_AS_GENERAL",
-            "Quân sư": "SERVES_AS_ADVISOR",
-            "Kế thừa": "SUCCESSOR",
-            "Cha - con": "FATHER_SON",
-            "Anh - em": "SIBLINGS",
-            "Tình cảm": "ROMANTIC",
-            "Đồng minh Xích Bích": "RED_CLIFF_ALLY",
-            "Kẻ thù": "ENEMY",
-            "Từng phục vụ": "FORMERLY_SERVED"
-        }
-        return mapping.get(vietnamese_label, "RELATED_TO")
+        return RELATIONSHIP_TYPES.get(vietnamese_label, "RELATED_TO")
+    
+    def log_throughput(self):
+        """Log rows/sec for every write phase"""
+        logger.info("⏱️  Write throughput per phase:")
+        for stats in self.phase_stats:
+            logger.info(f"   {stats.name}: {stats.rows} rows, {stats.batches} batch(es), "
+                        f"{stats.seconds:.3f}s, {stats.rows_per_sec:,.0f} rows/s")
     
     def create_summary_stats(self):
         """Tạo thống kê tổng quan"""
@@ -283,6 +314,7 @@ class TamQuocDataLoader:
             self.create_constraints()
             self.create_characters()
             self.create_relationships()
+            self.log_throughput()
             self.create_summary_stats()
             self.verify_data_integrity()
             
@@ -294,6 +326,9 @@ class TamQuocDataLoader:
         except Exception as e:
             logger.error(f"❌ Error during data loading: {str(e)}")
             raise
+        finally:
+            # Even a partial load changed the graph
+            self.bump_graph_version()
 
 def main():
     """Main function to run the data loader"""
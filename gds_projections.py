@@ -0,0 +1,134 @@
+"""
+Persistent GDS graph projections keyed by graph version.
+
+Instead of projecting and dropping a temporary graph on every algorithm
+call, ProjectionManager keeps one named in-memory projection per spec
+alive and only rebuilds it (under a lock) once the graph version moves
+past the version it was projected from.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from graph_version import GraphVersion
+
+class ProjectionManager:
+    # key -> (node projection, relationship projection)
+    DEFAULT_SPECS = {
+        "default": ("Character", "*"),
+        # Louvain: every relationship counts once in both directions
+        "undirected": ("Character", {"ALL": {"type": "*", "orientation": "UNDIRECTED"}}),
+    }
+
+    def __init__(self, driver, version: GraphVersion, prefix: str = "tq"):
+        self.driver = driver
+        self.version = version
+        # pid keeps concurrent uvicorn workers from dropping each other's graphs
+        self.prefix = f"{prefix}_{os.getpid()}"
+        self.specs: Dict[str, Tuple[Any, Any]] = dict(self.DEFAULT_SPECS)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._built: Dict[str, Dict[str, Any]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._builds = 0
+        self._retries = 0
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str = "default") -> str:
+        """Name of a live projection for `key` at the current graph version."""
+        if key not in self.specs:
+            raise KeyError(f"Unknown projection '{key}'")
+        version = self.version.current
+        entry = self._built.get(key)
+        if entry and entry["version"] == version:
+            self._hits += 1
+            return entry["name"]
+
+        with self._key_lock(key):
+            version = self.version.current
+            entry = self._built.get(key)
+            if entry and entry["version"] == version:
+                self._hits += 1
+                return entry["name"]
+            self._misses += 1
+            if entry:
+                self._drop(entry["name"])
+            self._built[key] = self._project(key, version)
+            return self._built[key]["name"]
+
+    def run(self, key: str, fn: Callable[[str], Any]) -> Tuple[str, Any]:
+        """
+        Call fn(graph_name) against the projection for `key`.
+
+        If the projection vanished server-side (Neo4j restart, manual drop)
+        it is rebuilt once and the call retried.
+        """
+        name = self.get(key)
+        try:
+            return name, fn(name)
+        except Exception as e:
+            msg = str(e).lower()
+            if "not exist" not in msg and "not found" not in msg:
+                raise
+            self._retries += 1
+            self.invalidate(key)
+            name = self.get(key)
+            return name, fn(name)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            keys = [key] if key else list(self._built)
+            for k in keys:
+                self._built.pop(k, None)
+
+    def drop_all(self) -> None:
+        with self._lock:
+            built, self._built = self._built, {}
+        for entry in built.values():
+            self._drop(entry["name"])
+
+    def stats(self) -> Dict[str, Any]:
+        total = self._hits + self._misses
+        return {
+            "graph_version": self.version.current,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": (self._hits / total) if total else 0.0,
+            "builds": self._builds,
+            "retries": self._retries,
+            "projections": {k: dict(v) for k, v in self._built.items()},
+        }
+
+    def _project(self, key: str, version: int) -> Dict[str, Any]:
+        name = f"{self.prefix}_{key}_v{version}"
+        node_proj, rel_proj = self.specs[key]
+        started = time.perf_counter()
+        with self.driver.session() as s:
+            # Leftover from an earlier process with the same pid/version
+            s.run("CALL gds.graph.drop($name, false) YIELD graphName RETURN graphName", {"name": name}).consume()
+            rec = s.run(
+                "CALL gds.graph.project($name, $nodes, $rels) YIELD graphName, nodeCount, relationshipCount "
+                "RETURN graphName, nodeCount, relationshipCount",
+                {"name": name, "nodes": node_proj, "rels": rel_proj},
+            ).single()
+        self._builds += 1
+        return {
+            "name": name,
+            "version": version,
+            "nodeCount": rec["nodeCount"] if rec else None,
+            "relationshipCount": rec["relationshipCount"] if rec else None,
+            "build_ms": round((time.perf_counter() - started) * 1000, 2),
+            "built_at": time.time(),
+        }
+
+    def _drop(self, name: str) -> None:
+        try:
+            with self.driver.session() as s:
+                s.run("CALL gds.graph.drop($name, false) YIELD graphName RETURN graphName", {"name": name}).consume()
+        except Exception:
+            pass
@@ -0,0 +1,1155 @@
+"""
+Graph backends for the read-only /query/* endpoints.
+
+Two implementations share the GraphBackend interface:
+- Neo4jBackend: the original Cypher queries, one round trip per call
+- InMemoryGraphBackend: answers from a CSR adjacency snapshot held in RAM,
+  loaded from Neo4j or from the seed data in full_data_loader.py
+
+main_async.py awaits the same operations through AsyncNeo4jBackend (the
+Neo4jBackend queries on the async driver) or ThreadedBackend.
+"""
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+from path_search import PathSearcher, k_shortest
+
+# ---------- Record -> JSON helpers ----------
+def node_to_dict(node) -> Dict[str, Any]:
+    return {"id": node.id, "labels": list(node.labels), **dict(node)}
+
+def rel_to_dict(rel) -> Dict[str, Any]:
+    return {
+        "id": rel.id,
+        "type": rel.type,
+        "start": rel.start_node.id,
+        "end": rel.end_node.id,
+        "properties": dict(rel),
+    }
+
+@metrics.timed("convert")
+def path_record_to_graph(rec: Dict[str, Any]) -> Dict[str, Any]:
+    path = rec.get("path")
+    if path is None:
+        # Try detect in any value
+        for v in rec.values():
+            if hasattr(v, "nodes") and hasattr(v, "relationships"):
+                path = v
+                break
+    if path is None:
+        return {"nodes": [], "edges": []}
+
+    nodes = {}
+    for node in path.nodes:
+        nodes[node.id] = node_to_dict(node)
+    edges = [rel_to_dict(rel) for rel in path.relationships]
+    return {"nodes": list(nodes.values()), "edges": edges}
+
+@metrics.timed("convert")
+def records_to_nodes_edges(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    nodes = {}
+    edges = []
+    for r in records:
+        for v in r.values():
+            # Node
+            if hasattr(v, "labels") and hasattr(v, "id"):
+                nodes[v.id] = node_to_dict(v)
+            # Relationship
+            elif hasattr(v, "type") and hasattr(v, "start_node"):
+                edges.append(rel_to_dict(v))
+    return {"nodes": list(nodes.values()), "edges": edges}
+
+def to_visual_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Node dict ({id, labels, **props}) -> display format used by the frontend."""
+    return {
+        "id": node["id"],
+        "label": node.get("name") or ",".join(node.get("labels", [])),
+        "props": {k: v for k, v in node.items() if k not in ("id", "labels")},
+    }
+
+# ---------- CSR snapshot ----------
+class CSRGraph:
+    """
+    Immutable compressed-sparse-row snapshot of the graph.
+
+    Nodes are addressed by a dense index 0..n-1; `node_ids` maps back to the
+    Neo4j id. Outgoing and incoming adjacency are both kept so traversals in
+    any direction are a slice of `*_nbr` between two `*_indptr` offsets.
+    Edge types are dictionary-encoded into `edge_type` codes over `rel_types`.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+        self.node_ids = np.array([n["id"] for n in nodes], dtype=np.int64)
+        self.node_labels: List[List[str]] = [list(n.get("labels", [])) for n in nodes]
+        self.node_props: List[Dict[str, Any]] = [
+            {k: v for k, v in n.items() if k not in ("id", "labels")} for n in nodes
+        ]
+        self.n = len(nodes)
+        self.index_of: Dict[Any, int] = {nid: i for i, nid in enumerate(self.node_ids.tolist())}
+
+        # name -> indices of :Character nodes carrying that name
+        self.name_index: Dict[str, List[int]] = {}
+        for i, props in enumerate(self.node_props):
+            name = props.get("name")
+            if name is not None and "Character" in self.node_labels[i]:
+                self.name_index.setdefault(name, []).append(i)
+
+        # Drop edges whose endpoints are not part of the snapshot
+        edges = [e for e in edges if e["start"] in self.index_of and e["end"] in self.index_of]
+        self.m = len(edges)
+        self.edge_ids = np.array([e["id"] for e in edges], dtype=np.int64)
+        self.edge_props: List[Dict[str, Any]] = [dict(e.get("properties") or {}) for e in edges]
+        self.rel_types: List[str] = sorted({e["type"] for e in edges})
+        type_code = {t: c for c, t in enumerate(self.rel_types)}
+        self.edge_type = np.array([type_code[e["type"]] for e in edges], dtype=np.int32)
+        self.edge_src = np.array([self.index_of[e["start"]] for e in edges], dtype=np.int64)
+        self.edge_dst = np.array([self.index_of[e["end"]] for e in edges], dtype=np.int64)
+
+        self.out_indptr, self.out_nbr, self.out_eid = self._build(self.edge_src, self.edge_dst)
+        self.in_indptr, self.in_nbr, self.in_eid = self._build(self.edge_dst, self.edge_src)
+
+    def _build(self, rows: np.ndarray, cols: np.ndarray):
+        order = np.lexsort((cols, rows)) if self.m else np.zeros(0, dtype=np.int64)
+        counts = np.bincount(rows, minlength=self.n) if self.m else np.zeros(self.n, dtype=np.int64)
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, cols[order], order.astype(np.int64)
+
+    # ----- lookups -----
+    def nodes_named(self, name: str) -> List[int]:
+        return self.name_index.get(name, [])
+
+    def index_for_id(self, node_id: Any) -> Optional[int]:
+        return self.index_of.get(node_id)
+
+    def label_mask(self, label: str) -> np.ndarray:
+        return np.array([label in labels for labels in self.node_labels], dtype=bool)
+
+    def type_codes(self, rel_types: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        """Relationship type names -> array of codes; None means 'all types'."""
+        if not rel_types:
+            return None
+        wanted = set(rel_types)
+        return np.array([c for c, t in enumerate(self.rel_types) if t in wanted], dtype=np.int32)
+
+    def neighbors(self, i: int, direction: str = "any", type_codes: Optional[np.ndarray] = None):
+        """(neighbor indices, edge indices) of node i along `direction`."""
+        parts = []
+        if direction in ("out", "any"):
+            lo, hi = self.out_indptr[i], self.out_indptr[i + 1]
+            parts.append((self.out_nbr[lo:hi], self.out_eid[lo:hi]))
+        if direction in ("in", "any"):
+            lo, hi = self.in_indptr[i], self.in_indptr[i + 1]
+            parts.append((self.in_nbr[lo:hi], self.in_eid[lo:hi]))
+        nbrs = np.concatenate([p[0] for p in parts])
+        eids = np.concatenate([p[1] for p in parts])
+        if type_codes is not None:
+            keep = np.isin(self.edge_type[eids], type_codes)
+            nbrs, eids = nbrs[keep], eids[keep]
+        return nbrs, eids
+
+    def expand(self, frontier: np.ndarray, direction: str = "any", type_codes: Optional[np.ndarray] = None):
+        """Vectorised one-step expansion of a whole frontier: (sources, neighbors, edge indices)."""
+        srcs, nbrs, eids = [], [], []
+        for indptr, nbr, eid, on in (
+            (self.out_indptr, self.out_nbr, self.out_eid, direction in ("out", "any")),
+            (self.in_indptr, self.in_nbr, self.in_eid, direction in ("in", "any")),
+        ):
+            if not on or len(frontier) == 0:
+                continue
+            starts, ends = indptr[frontier], indptr[frontier + 1]
+            counts = ends - starts
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Gather all [start, end) ranges in one shot
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            srcs.append(np.repeat(frontier, counts))
+            nbrs.append(nbr[offsets])
+            eids.append(eid[offsets])
+        if not srcs:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        srcs, nbrs, eids = np.concatenate(srcs), np.concatenate(nbrs), np.concatenate(eids)
+        if type_codes is not None:
+            keep = np.isin(self.edge_type[eids], type_codes)
+            srcs, nbrs, eids = srcs[keep], nbrs[keep], eids[keep]
+        return srcs, nbrs, eids
+
+    def bfs_levels(self, seeds: Iterable[int], max_depth: int, direction: str = "any",
+                   type_codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Hop distance from the seed set for every node (-1 = unreached)."""
+        dist = np.full(self.n, -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(list(seeds), dtype=np.int64))
+        dist[frontier] = 0
+        depth = 0
+        while len(frontier) and depth < max_depth:
+            depth += 1
+            _, nbrs, _ = self.expand(frontier, direction, type_codes)
+            nbrs = np.unique(nbrs)
+            frontier = nbrs[dist[nbrs] < 0]
+            dist[frontier] = depth
+        return dist
+
+    def induced_edges(self, mask: np.ndarray) -> np.ndarray:
+        """Edge indices with both endpoints inside the boolean node mask."""
+        return np.nonzero(mask[self.edge_src] & mask[self.edge_dst])[0]
+
+    # ----- JSON -----
+    def node_json(self, i: int) -> Dict[str, Any]:
+        return {"id": int(self.node_ids[i]), "labels": list(self.node_labels[i]), **self.node_props[i]}
+
+    def edge_json(self, e: int) -> Dict[str, Any]:
+        return {
+            "id": int(self.edge_ids[e]),
+            "type": self.rel_types[self.edge_type[e]],
+            "start": int(self.node_ids[self.edge_src[e]]),
+            "end": int(self.node_ids[self.edge_dst[e]]),
+            "properties": dict(self.edge_props[e]),
+        }
+
+    def path_json(self, node_path: List[int], edge_path: List[int]) -> Dict[str, Any]:
+        """Same shape as path_record_to_graph for a Neo4j Path."""
+        nodes = {}
+        for i in node_path:
+            nodes[int(i)] = self.node_json(int(i))
+        return {"nodes": list(nodes.values()), "edges": [self.edge_json(int(e)) for e in edge_path]}
+
+# ---------- Snapshot loaders ----------
+def load_snapshot_from_neo4j(driver) -> CSRGraph:
+    with driver.session() as s:
+        nodes = [
+            {"id": r["id"], "labels": r["labels"], **(r["props"] or {})}
+            # The GraphMeta bookkeeping node (graph_meta.py) is not part of the graph
+            for r in s.run("MATCH (n) WHERE NOT n:GraphMeta RETURN id(n) AS id, labels(n) AS labels, properties(n) AS props")
+        ]
+        edges = [
+            {"id": r["id"], "type": r["type"], "start": r["start"], "end": r["end"], "properties": r["props"] or {}}
+            for r in s.run(
+                "MATCH (a)-[r]->(b) RETURN id(r) AS id, type(r) AS type, id(a) AS start, id(b) AS end, properties(r) AS props"
+            )
+        ]
+    return CSRGraph(nodes, edges)
+
+def load_snapshot_from_seed_data() -> CSRGraph:
+    """Build the snapshot straight from NODES/EDGES in full_data_loader.py (no Neo4j needed)."""
+    from full_data_loader import NODES, EDGES, RELATIONSHIP_TYPES
+
+    nodes = [
+        {
+            "id": n["id"],
+            "labels": ["Character"],
+            "character_id": n["id"],
+            "name": n["label"],
+            "faction": n["group"],
+            "color": n["color"],
+        }
+        for n in NODES
+    ]
+    edges = [
+        {
+            "id": i,
+            "type": RELATIONSHIP_TYPES.get(e["label"], "RELATED_TO"),
+            "start": e["from"],
+            "end": e["to"],
+            "properties": {"type": e["label"], "description": e["label"]},
+        }
+        for i, e in enumerate(EDGES)
+    ]
+    return CSRGraph(nodes, edges)
+
+class GraphSnapshotStore:
+    """Lazily (re)built CSR snapshot; writers call invalidate() after mutating the graph."""
+
+    def __init__(self, loader: Callable[[], CSRGraph]):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CSRGraph] = None
+
+    def get(self) -> CSRGraph:
+        snap = self._snapshot
+        if snap is not None:
+            return snap
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._loader()
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+# ---------- Backend interface ----------
+# Rows per {nodes, edges} batch in streamed (NDJSON) traversals
+STREAM_BATCH_SIZE = 100
+
+class SubgraphBuilder:
+    """
+    Budgeted frontier BFS for the Neo4j subgraph fallback, fed one level of
+    {src, id, rel, start} rows (every relationship of the frontier, any
+    orientation) at a time. Nodes reached along `direction` join the subgraph
+    until max_nodes; relationships between subgraph nodes are kept once each
+    until max_edges.
+    """
+
+    def __init__(self, seeds: List[int], max_depth: int, max_nodes: int, max_edges: int, direction: str):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.direction = direction
+        seeds = list(dict.fromkeys(seeds))
+        self.nodes = seeds[:max_nodes]
+        self.included = set(self.nodes)
+        self.edges: Dict[int, None] = {}
+        self.frontier = list(self.nodes)
+        self.depth = 0
+        self.truncated = len(seeds) > max_nodes
+
+    @property
+    def row_limit(self) -> int:
+        # Rows past this either overflow the edge budget or reach nodes with no room left
+        return self.max_nodes + self.max_edges + 1
+
+    def add_level(self, rows) -> None:
+        rows = list(rows)
+        if len(rows) >= self.row_limit:
+            self.truncated = True
+        fresh = []
+        if self.depth < self.max_depth:
+            for r in rows:
+                if r["id"] in self.included:
+                    continue
+                if self.direction != "any" and (r["start"] == r["src"]) != (self.direction == "out"):
+                    continue
+                if len(self.included) >= self.max_nodes:
+                    self.truncated = True
+                    break
+                self.included.add(r["id"])
+                fresh.append(r["id"])
+        self.nodes.extend(fresh)
+        self.frontier = fresh
+        if fresh:
+            self.depth += 1
+        for r in rows:
+            if r["id"] in self.included and r["rel"] not in self.edges:
+                if len(self.edges) >= self.max_edges:
+                    self.truncated = True
+                    self.frontier = []
+                    break
+                self.edges[r["rel"]] = None
+
+class GraphBackend(ABC):
+    """
+    Read-side graph operations behind the /query/* and /visual/* endpoints.
+
+    Callers pass already-validated arguments: `direction` is one of
+    out|in|any and `rel_types` are sanitised relationship type names.
+    A backend that misses one of the abstract methods fails when it is
+    constructed, not on the first request to that endpoint.
+    """
+
+    engine = "base"
+
+    @abstractmethod
+    def multi_hop(self, name: str, min_hops: int, max_hops: int, direction: str, rel_types: Optional[List[str]],
+                  limit: int) -> Dict[str, Any]:
+        """
+        Breadth-first expansion from the node(s) named `name` with a global
+        visited set: every node whose hop distance is within min_hops..max_hops,
+        closest first, as {nodes, edges, distances, truncated}. `distances` is
+        aligned with `nodes`; `edges` holds the BFS tree edge into each returned
+        node; `truncated` says more than `limit` nodes were in range.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def filter_relation(self, name: str, rel_type: str, limit: int) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def subgraph(self, name: str, max_depth: int, max_nodes: int, max_edges: int,
+                 direction: str = "any", rel_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Nodes within `max_depth` hops of the node(s) named `name` (following
+        `direction` and `rel_types`) and the relationships of those types among
+        them, each deduplicated, as {nodes, edges, depth, truncated}. The walk
+        stops adding nodes at `max_nodes` and edges at `max_edges`; `truncated`
+        says a budget cut the answer. Nodes come back closest first.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def shortest_paths(self, from_name: str, to_name: str, max_len: int, k: int,
+                       direction: str = "any", rel_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Up to `k` loopless paths of at most `max_len` hops over all namesake pairs, shortest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def neighbors(self, node_id: Optional[int], name: Optional[str], depth: int, offset: int, limit: int) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def neighbor_order(self, node_id: Optional[int], name: Optional[str], depth: int) -> Tuple[List[int], List[int]]:
+        """Every node within `depth` hops of the start node(s) as (ids, hop distances), ordered by distance then id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def neighbor_page(self, ids: List[int]) -> Dict[str, Any]:
+        """Visual {nodes, edges} for `ids` (in that order) and the relationships among them."""
+        raise NotImplementedError
+
+    def iter_multi_hop(self, name: str, min_hops: int, max_hops: int, direction: str, rel_types: Optional[List[str]],
+                       limit: int, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """multi_hop as a sequence of {nodes, edges, distances} batches, for streaming responses."""
+        yield from hop_batches(self.multi_hop(name, min_hops, max_hops, direction, rel_types, limit), batch_size)
+
+def shortest_k(paths: List[Any], k: int, length: Callable[[Any], int] = lambda p: len(p["edges"])) -> List[Any]:
+    """
+    The k shortest of `paths`. Names are not unique, so a search runs once per
+    (source, target) namesake pair; this merges the pairs' answers into one
+    top k, keeping each pair's own order among equally long paths.
+    """
+    return sorted(paths, key=length)[:max(k, 1)]
+
+def hop_batches(result: Dict[str, Any], batch_size: int) -> Iterator[Dict[str, Any]]:
+    """Split a multi_hop result into stream batches: the nodes first, then the tree edges."""
+    nodes, distances = result["nodes"], result["distances"]
+    for i in range(0, len(nodes), batch_size):
+        yield {"nodes": nodes[i:i + batch_size], "edges": [], "distances": distances[i:i + batch_size]}
+    if result["edges"]:
+        yield {"nodes": [], "edges": result["edges"], "distances": []}
+
+_SUBGRAPH_APOC = """
+MATCH (p:Character {name:$name})
+WITH collect(p) AS starts
+WHERE size(starts) > 0
+CALL apoc.path.subgraphAll(starts, {maxLevel: $maxDepth, relationshipFilter: $relFilter, limit: $limit})
+YIELD nodes, relationships
+RETURN nodes, relationships
+"""
+
+# NODE_GLOBAL + bfs: each node is reached once, along a shortest path, so
+# length(path) is its hop distance and the last relationship its tree edge
+_MULTI_HOP_APOC = """
+MATCH (p:Character {name:$name})
+WITH collect(p) AS starts
+WHERE size(starts) > 0
+CALL apoc.path.expandConfig(starts, {
+  minLevel: $minHops, maxLevel: $maxHops, relationshipFilter: $relFilter,
+  uniqueness: 'NODE_GLOBAL', bfs: true, limit: $limit
+})
+YIELD path
+RETURN last(nodes(path)) AS node, length(path) AS hops, last(relationships(path)) AS rel
+"""
+_HOP_START = "MATCH (p:Character {name:$name}) RETURN id(p) AS id"
+
+_NEIGHBOR_EDGES = "MATCH (a)-[r]-(b) WHERE id(a) IN $ids AND id(b) IN $ids RETURN id(r) AS id, type(r) AS type, id(a) AS start, id(b) AS end, r"
+# Directed, so each relationship of a cursor page comes back once
+_PAGE_EDGES = "MATCH (a)-[r]->(b) WHERE id(a) IN $ids AND id(b) IN $ids RETURN id(r) AS id, type(r) AS type, id(a) AS start, id(b) AS end, r"
+
+class _Neo4jQueries:
+    """Cypher text and result shaping shared by the sync and async Neo4j backends."""
+
+    @staticmethod
+    def _rel_filter(direction, rel_types) -> Optional[str]:
+        # apoc relationshipFilter syntax: "TYPE>" outgoing, "<TYPE" incoming, "TYPE" either way
+        left, right = {"out": ("", ">"), "in": ("<", ""), "any": ("", "")}[direction]
+        return "|".join(f"{left}{t}{right}" for t in rel_types) if rel_types else (left + right or None)
+
+    def _hop_params(self, name, min_hops, max_hops, direction, rel_types, limit) -> Dict[str, Any]:
+        return {"name": name, "minHops": min_hops, "maxHops": max_hops,
+                "relFilter": self._rel_filter(direction, rel_types), "limit": limit}
+
+    @staticmethod
+    def _hop_level_cypher(direction, rel_types) -> str:
+        arrow_l, arrow_r = {"out": ("-", "->"), "in": ("<-", "-"), "any": ("-", "-")}[direction]
+        rel_clause = ":" + "|".join(rel_types) if rel_types else ""
+        return f"MATCH (a){arrow_l}[r{rel_clause}]{arrow_r}(b) WHERE id(a) IN $frontier RETURN id(b) AS id, id(r) AS rel"
+
+    @staticmethod
+    def _hop_level(recs, dist: Dict[int, int], tree: Dict[int, int], depth: int) -> List[int]:
+        """Mark the unvisited targets of one level's rows; returns the next frontier."""
+        frontier = []
+        for r in recs:
+            if r["id"] not in dist:
+                dist[r["id"]] = depth
+                tree[r["id"]] = r["rel"]
+                frontier.append(r["id"])
+        return frontier
+
+    @staticmethod
+    def _hop_result(ids, dist, tree, node_recs, rel_recs, truncated) -> Dict[str, Any]:
+        by_id = {r["n"].id: node_to_dict(r["n"]) for r in node_recs}
+        rels = {r["r"].id: rel_to_dict(r["r"]) for r in rel_recs}
+        ids = [i for i in ids if i in by_id]
+        return {
+            "nodes": [by_id[i] for i in ids],
+            "edges": [rels[tree[i]] for i in ids if tree.get(i) in rels],
+            "distances": [dist[i] for i in ids],
+            "truncated": truncated,
+        }
+
+    @staticmethod
+    def _hop_apoc_batch(recs) -> Dict[str, Any]:
+        return {
+            "nodes": [node_to_dict(r["node"]) for r in recs],
+            "edges": [rel_to_dict(r["rel"]) for r in recs if r["rel"] is not None],
+            "distances": [r["hops"] for r in recs],
+        }
+
+    def _filter_relation_cypher(self, rel_type) -> str:
+        return f"MATCH (p:Character {{name:$name}})-[r:{rel_type}]->(other) RETURN other, r LIMIT $limit"
+
+    def _procedure_missing(self, e: Exception) -> bool:
+        """A stale capability answer: re-probe soon and let the caller fall back."""
+        if "ProcedureNotFound" in (getattr(e, "code", None) or ""):
+            self.capabilities.expire()
+            return True
+        return False
+
+    @staticmethod
+    def _subgraph_level_cypher(rel_types) -> str:
+        # Undirected on purpose: edges back into the subgraph count whatever their orientation
+        rel_clause = ":" + "|".join(rel_types) if rel_types else ""
+        return (
+            f"MATCH (a)-[r{rel_clause}]-(b) WHERE id(a) IN $frontier "
+            "RETURN id(a) AS src, id(b) AS id, id(r) AS rel, id(startNode(r)) AS start LIMIT $rowLimit"
+        )
+
+    @staticmethod
+    def _subgraph_apoc_result(first, max_nodes, max_edges) -> Dict[str, Any]:
+        if not first:
+            return {"nodes": [], "edges": [], "depth": 0, "truncated": False}
+        truncated = len(first["nodes"]) > max_nodes
+        nodes = {n.id: node_to_dict(n) for n in first["nodes"][:max_nodes]}
+        edges = [rel_to_dict(r) for r in first["relationships"] if r.start_node.id in nodes and r.end_node.id in nodes]
+        if len(edges) > max_edges:
+            edges, truncated = edges[:max_edges], True
+        return {"nodes": list(nodes.values()), "edges": edges, "depth": None, "truncated": truncated}
+
+    @staticmethod
+    def _subgraph_builder_result(b: "SubgraphBuilder", node_recs, rel_recs) -> Dict[str, Any]:
+        by_id = {r["n"].id: node_to_dict(r["n"]) for r in node_recs}
+        rels = {r["r"].id: rel_to_dict(r["r"]) for r in rel_recs}
+        return {
+            "nodes": [by_id[i] for i in b.nodes if i in by_id],
+            "edges": [rels[i] for i in b.edges if i in rels],
+            "depth": b.depth,
+            "truncated": b.truncated,
+        }
+
+    def _shortest_cypher(self, max_len, direction, rel_types) -> str:
+        # Variable-length bounds cannot be parameters, so max_len is inlined as an int
+        arrow_l, arrow_r = {"out": ("-", "->"), "in": ("<-", "-"), "any": ("-", "-")}[direction]
+        rel_clause = ":" + "|".join(rel_types) if rel_types else ""
+        return (
+            "MATCH (a:Character {name:$from}), (b:Character {name:$to}) "
+            f"MATCH p = shortestPath((a){arrow_l}[{rel_clause}*..{int(max_len)}]{arrow_r}(b)) RETURN p AS path"
+        )
+
+    def _neighbors_cypher(self, node_id):
+        where = "id(n) = $id" if node_id is not None else "n.name = $name"
+        # Collect nodes within depth
+        cy_nodes = f"""
+        MATCH (n:Character) WHERE {where}
+        CALL apoc.path.subgraphNodes(n, {{maxLevel:$depth}}) YIELD node
+        RETURN node SKIP $offset LIMIT $limit
+        """
+        # Fallback if APOC missing: basic neighborhood for depth 0/1
+        cy_basic = f"""
+        MATCH (n:Character) WHERE {where}
+        WITH n
+        OPTIONAL MATCH (n)-[r]-(m)
+        WITH collect(n) + collect(m) AS nodes
+        UNWIND nodes AS node
+        RETURN DISTINCT node SKIP $offset LIMIT $limit
+        """
+        return cy_nodes, cy_basic
+
+    def _neighbor_start_cypher(self, node_id) -> str:
+        where = "id(n) = $id" if node_id is not None else "n.name = $name"
+        return f"MATCH (n:Character) WHERE {where} RETURN id(n) AS id"
+
+    def _neighbor_order_apoc_cypher(self, node_id) -> str:
+        where = "id(n) = $id" if node_id is not None else "n.name = $name"
+        # spanningTree walks breadth-first, so each path is a shortest one
+        return f"""
+        MATCH (n:Character) WHERE {where}
+        CALL apoc.path.spanningTree(n, {{maxLevel:$depth}}) YIELD path
+        RETURN id(last(nodes(path))) AS id, min(length(path)) AS dist
+        """
+
+    @staticmethod
+    def _sorted_order(dist: Dict[int, int]) -> Tuple[List[int], List[int]]:
+        order = sorted(dist.items(), key=lambda kv: (kv[1], kv[0]))
+        return [i for i, _ in order], [d for _, d in order]
+
+    @staticmethod
+    def _page_nodes(recs, ids) -> List[Dict[str, Any]]:
+        by_id = {r["n"].id: to_visual_node(node_to_dict(r["n"])) for r in recs}
+        return [by_id[i] for i in ids if i in by_id]
+
+    @staticmethod
+    def _neighbor_edges(rels) -> List[Dict[str, Any]]:
+        return [{"id": r["id"], "type": r["type"], "source": r["start"], "target": r["end"], "props": dict(r["r"])} for r in rels]
+
+class CypherPathSearcher:
+    """
+    PathSearcher.shortest over Neo4j ids, one bounded shortestPath query per
+    call, so path_search.k_shortest can run Yen's against the database
+    without loading a snapshot: a k-path search costs at most
+    1 + (k - 1) * max_len round trips.
+    """
+
+    def __init__(self, session, direction: str = "any", rel_types: Optional[List[str]] = None):
+        self.session = session
+        self.direction = direction
+        self.rel_types = rel_types
+
+    def _cypher(self, max_len: int) -> str:
+        arrow_l, arrow_r = {"out": ("-", "->"), "in": ("<-", "-"), "any": ("-", "-")}[self.direction]
+        rel_clause = ":" + "|".join(self.rel_types) if self.rel_types else ""
+        return (
+            "MATCH (a), (b) WHERE id(a) = $s AND id(b) = $t "
+            f"MATCH p = shortestPath((a){arrow_l}[{rel_clause}*..{int(max_len)}]{arrow_r}(b)) "
+            "WHERE none(n IN nodes(p) WHERE id(n) IN $bannedNodes) AND none(r IN relationships(p) WHERE id(r) IN $bannedRels) "
+            "RETURN [n IN nodes(p) | id(n)] AS nodes, [r IN relationships(p) | id(r)] AS rels"
+        )
+
+    def shortest(self, s: int, t: int, max_len: int, banned_nodes=None, banned_edges=None):
+        if s == t:
+            return [s], []
+        banned_nodes = list(banned_nodes or ())
+        if max_len < 1 or s in banned_nodes or t in banned_nodes:
+            return None
+        params = {"s": s, "t": t, "bannedNodes": banned_nodes, "bannedRels": list(banned_edges or ())}
+        rec = self.session.run(self._cypher(max_len), params).single()
+        return (list(rec["nodes"]), list(rec["rels"])) if rec is not None else None
+
+class Neo4jBackend(_Neo4jQueries, GraphBackend):
+    """One Cypher round trip per call through the given driver."""
+
+    engine = "neo4j"
+
+    def __init__(self, driver, capabilities, projections=None):
+        self.driver = driver
+        # CapabilityRegistry: picks the APOC/GDS plan up front instead of try-and-fallback
+        self.capabilities = capabilities
+        # k-shortest paths run on GDS projections when GDS is installed
+        self.projections = projections
+
+    def multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit):
+        params = self._hop_params(name, min_hops, max_hops, direction, rel_types, limit + 1)
+        with self.driver.session() as s:
+            if self.capabilities.get().has("apoc.path.expandConfig"):
+                try:
+                    recs = list(s.run(_MULTI_HOP_APOC, params))
+                    return {**self._hop_apoc_batch(recs[:limit]), "truncated": len(recs) > limit}
+                except Exception as e:
+                    if not self._procedure_missing(e):
+                        raise
+            # Without APOC: one round trip per level, each scanning only the frontier's relationships
+            frontier = [r["id"] for r in s.run(_HOP_START, params)]
+            dist, tree = dict.fromkeys(frontier, 0), {}
+            found = list(frontier) if min_hops == 0 else []
+            level_cypher = self._hop_level_cypher(direction, rel_types)
+            depth = 0
+            while frontier and depth < max_hops and len(found) <= limit:
+                depth += 1
+                frontier = self._hop_level(s.run(level_cypher, {"frontier": frontier}), dist, tree, depth)
+                if depth >= min_hops:
+                    found.extend(frontier)
+            ids = found[:limit]
+            node_recs = list(s.run("MATCH (n) WHERE id(n) IN $ids RETURN n", {"ids": ids}))
+            rel_recs = list(s.run("MATCH ()-[r]->() WHERE id(r) IN $rels RETURN r", {"rels": [tree[i] for i in ids if i in tree]}))
+            return self._hop_result(ids, dist, tree, node_recs, rel_recs, len(found) > limit)
+
+    def iter_multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit, batch_size=STREAM_BATCH_SIZE):
+        if not self.capabilities.get().has("apoc.path.expandConfig"):
+            yield from GraphBackend.iter_multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit, batch_size)
+            return
+        with self.driver.session() as s:
+            recs = s.run(_MULTI_HOP_APOC, self._hop_params(name, min_hops, max_hops, direction, rel_types, limit))
+            batch = []
+            for r in recs:
+                batch.append(r)
+                if len(batch) >= batch_size:
+                    yield self._hop_apoc_batch(batch)
+                    batch = []
+            if batch:
+                yield self._hop_apoc_batch(batch)
+
+    def filter_relation(self, name, rel_type, limit):
+        with self.driver.session() as s:
+            recs = s.run(self._filter_relation_cypher(rel_type), {"name": name, "limit": limit})
+            return records_to_nodes_edges([dict(r) for r in recs])
+
+    def subgraph(self, name, max_depth, max_nodes, max_edges, direction="any", rel_types=None):
+        if self.capabilities.get().has("apoc.path.subgraphAll"):
+            params = {"name": name, "maxDepth": max_depth, "relFilter": self._rel_filter(direction, rel_types), "limit": max_nodes + 1}
+            try:
+                with self.driver.session() as s:
+                    return self._subgraph_apoc_result(s.run(_SUBGRAPH_APOC, params).single(), max_nodes, max_edges)
+            except Exception as e:
+                if not self._procedure_missing(e):
+                    raise
+
+        # Without APOC: one round trip per level, capped at the budgets
+        with self.driver.session() as s:
+            b = SubgraphBuilder([r["id"] for r in s.run(_HOP_START, {"name": name})], max_depth, max_nodes, max_edges, direction)
+            level_cypher = self._subgraph_level_cypher(rel_types)
+            while b.frontier:
+                b.add_level(s.run(level_cypher, {"frontier": b.frontier, "rowLimit": b.row_limit}))
+            node_recs = list(s.run("MATCH (n) WHERE id(n) IN $ids RETURN n", {"ids": b.nodes}))
+            rel_recs = list(s.run("MATCH ()-[r]->() WHERE id(r) IN $rels RETURN r", {"rels": list(b.edges)}))
+            return self._subgraph_builder_result(b, node_recs, rel_recs)
+
+    def shortest_paths(self, from_name, to_name, max_len, k, direction="any", rel_types=None):
+        if k <= 1:
+            with self.driver.session() as s:
+                recs = s.run(self._shortest_cypher(max_len, direction, rel_types), {"from": from_name, "to": to_name})
+                paths = []
+                for r in recs:
+                    p = r.get("path")
+                    if p is not None:
+                        paths.append(path_record_to_graph({"path": p}))
+            paths = shortest_k(paths, k)
+            return {"count": len(paths), "paths": paths}
+
+        # GDS Yen's runs on the natural (directed) projection, so it only
+        # answers outgoing searches; it cannot bound the length, so longer
+        # paths are dropped afterwards
+        if direction == "out" and self.projections is not None and self.capabilities.get().has("gds.shortestPath.yens.stream"):
+            query = """
+            MATCH (source:Character {name:$from}), (target:Character {name:$to})
+            CALL gds.shortestPath.yens.stream($graph, {
+              sourceNode: source,
+              targetNode: target,
+              k: $k,
+              relationshipTypes: $relTypes
+            })
+            YIELD index, path
+            RETURN index, path
+            ORDER BY index
+            """
+
+            def run(graph_name):
+                with self.driver.session() as s:
+                    params = {"from": from_name, "to": to_name, "k": k, "graph": graph_name, "relTypes": rel_types or ["*"]}
+                    return [path_record_to_graph({"path": r["path"]}) for r in s.run(query, params) if r.get("path")]
+
+            _, paths = self.projections.run("default", run)
+            paths = shortest_k([p for p in paths if len(p["edges"]) <= max_len], k)
+            return {"count": len(paths), "paths": paths, "engine": "gds.yens"}
+
+        # Everything else runs Yen's with one bounded shortestPath query per spur
+        with self.driver.session() as s:
+            searcher = CypherPathSearcher(s, direction, rel_types)
+            found = []
+            sources = [r["id"] for r in s.run(_HOP_START, {"name": from_name})]
+            targets = [r["id"] for r in s.run(_HOP_START, {"name": to_name})]
+            for a in sources:
+                for b in targets:
+                    found.extend(k_shortest(searcher, a, b, k, max_len))
+            found = shortest_k(found, k, lambda p: len(p[1]))
+            node_ids = list({i: None for nodes, _ in found for i in nodes})
+            by_id = {r["n"].id: node_to_dict(r["n"]) for r in s.run("MATCH (n) WHERE id(n) IN $ids RETURN n", {"ids": node_ids})}
+            rels = {r["r"].id: rel_to_dict(r["r"]) for r in s.run("MATCH ()-[r]->() WHERE id(r) IN $rels RETURN r",
+                                                                  {"rels": [e for _, edges in found for e in edges]})}
+        paths = [{"nodes": [by_id[i] for i in dict.fromkeys(nodes)], "edges": [rels[e] for e in edges]} for nodes, edges in found]
+        return {"count": len(paths), "paths": paths, "engine": "cypher.yens"}
+
+    def neighbors(self, node_id, name, depth, offset, limit):
+        cy_nodes, cy_basic = self._neighbors_cypher(node_id)
+        params = {"id": node_id, "name": name, "offset": offset, "limit": limit, "depth": depth}
+
+        with self.driver.session() as s:
+            recs = None
+            if self.capabilities.get().has("apoc.path.subgraphNodes"):
+                try:
+                    recs = list(s.run(cy_nodes, params))
+                except Exception as e:
+                    if not self._procedure_missing(e):
+                        raise
+            if recs is None:
+                recs = list(s.run(cy_basic, params))
+
+            nodes = [to_visual_node(node_to_dict(v["node"])) for v in recs if v.get("node")]
+            # fetch edges among returned nodes
+            node_ids = [n["id"] for n in nodes]
+            edges = self._neighbor_edges(s.run(_NEIGHBOR_EDGES, {"ids": node_ids})) if node_ids else []
+            return {"nodes": nodes, "edges": edges, "page": {"offset": offset, "limit": limit}}
+
+    def neighbor_order(self, node_id, name, depth):
+        params = {"id": node_id, "name": name, "depth": depth}
+        with self.driver.session() as s:
+            if self.capabilities.get().has("apoc.path.spanningTree"):
+                try:
+                    recs = s.run(self._neighbor_order_apoc_cypher(node_id), params)
+                    return self._sorted_order({r["id"]: r["dist"] for r in recs})
+                except Exception as e:
+                    if not self._procedure_missing(e):
+                        raise
+            # Without APOC: one round trip per level
+            frontier = [r["id"] for r in s.run(self._neighbor_start_cypher(node_id), params)]
+            dist = {i: 0 for i in frontier}
+            for d in range(1, depth + 1):
+                if not frontier:
+                    break
+                recs = s.run("MATCH (a)--(b) WHERE id(a) IN $frontier RETURN DISTINCT id(b) AS id", {"frontier": frontier})
+                frontier = [r["id"] for r in recs if r["id"] not in dist]
+                dist.update((i, d) for i in frontier)
+            return self._sorted_order(dist)
+
+    def neighbor_page(self, ids):
+        if not ids:
+            return {"nodes": [], "edges": []}
+        with self.driver.session() as s:
+            nodes = self._page_nodes(s.run("MATCH (n) WHERE id(n) IN $ids RETURN n", {"ids": ids}), ids)
+            edges = self._neighbor_edges(s.run(_PAGE_EDGES, {"ids": ids}))
+        return {"nodes": nodes, "edges": edges}
+
+class InMemoryGraphBackend(GraphBackend):
+    """
+    Answers traversals from a CSRGraph snapshot without a network hop.
+
+    Results mirror the Neo4jBackend JSON shapes. Where Cypher leaves the row
+    order unspecified, results come back in snapshot (load) order.
+    """
+
+    engine = "memory"
+
+    def __init__(self, snapshots: GraphSnapshotStore):
+        self.snapshots = snapshots
+
+    def _hop_bfs(self, g, name, min_hops, max_hops, direction, rel_types, limit):
+        """
+        Level-synchronous BFS with a global visited mask: each level expands only
+        the newly reached nodes, so the work is O(nodes + edges reached) instead
+        of one step per walk. Returns (node indices in range, capped at limit,
+        closest first), hop distance and tree edge per node, truncated flag.
+        """
+        codes = g.type_codes(rel_types)
+        dist = np.full(g.n, -1, dtype=np.int64)
+        tree = np.full(g.n, -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(g.nodes_named(name), dtype=np.int64))
+        dist[frontier] = 0
+        levels = [frontier] if min_hops == 0 else []
+        found = sum(len(lv) for lv in levels)
+        depth = 0
+        # One level past `limit` is enough to know whether the answer was cut
+        while len(frontier) and depth < max_hops and found <= limit:
+            depth += 1
+            _, nbrs, eids = g.expand(frontier, direction, codes)
+            fresh = dist[nbrs] < 0
+            frontier, first = np.unique(nbrs[fresh], return_index=True)
+            dist[frontier] = depth
+            tree[frontier] = eids[fresh][first]
+            if depth >= min_hops:
+                levels.append(frontier)
+                found += len(frontier)
+        reached = np.concatenate(levels) if levels else np.zeros(0, dtype=np.int64)
+        return reached[:limit], dist, tree, len(reached) > limit
+
+    def _hop_batch(self, g, idx, dist, tree) -> Dict[str, Any]:
+        return {
+            "nodes": [g.node_json(int(i)) for i in idx],
+            "edges": [g.edge_json(int(tree[i])) for i in idx if tree[i] >= 0],
+            "distances": dist[idx].tolist(),
+        }
+
+    def multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit):
+        g = self.snapshots.get()
+        idx, dist, tree, truncated = self._hop_bfs(g, name, min_hops, max_hops, direction, rel_types, limit)
+        return {**self._hop_batch(g, idx, dist, tree), "truncated": truncated}
+
+    def iter_multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit, batch_size=STREAM_BATCH_SIZE):
+        # Same walk as multi_hop, but node JSON is built one batch at a time
+        g = self.snapshots.get()
+        idx, dist, tree, _ = self._hop_bfs(g, name, min_hops, max_hops, direction, rel_types, limit)
+        for i in range(0, len(idx), batch_size):
+            yield self._hop_batch(g, idx[i:i + batch_size], dist, tree)
+
+    def filter_relation(self, name, rel_type, limit):
+        g = self.snapshots.get()
+        codes = g.type_codes([rel_type])
+        nodes, edges = {}, []
+        for i in g.nodes_named(name):
+            nbrs, eids = g.neighbors(i, "out", codes)
+            for j, e in zip(nbrs.tolist(), eids.tolist()):
+                if len(edges) >= limit:
+                    break
+                nodes.setdefault(j, g.node_json(j))
+                edges.append(g.edge_json(e))
+        return {"nodes": list(nodes.values()), "edges": edges}
+
+    def subgraph(self, name, max_depth, max_nodes, max_edges, direction="any", rel_types=None):
+        g = self.snapshots.get()
+        codes = g.type_codes(rel_types)
+        seeds = np.unique(np.asarray(g.nodes_named(name), dtype=np.int64))
+        truncated = len(seeds) > max_nodes
+        frontier = seeds[:max_nodes]
+        included = np.zeros(g.n, dtype=bool)
+        included[frontier] = True
+        levels, count = [frontier], len(frontier)
+        edges = np.zeros(0, dtype=np.int64)
+        depth = 0
+        # Each level expands only the nodes it just added: an edge between two
+        # subgraph nodes turns up when the later of the two is expanded
+        while len(frontier):
+            srcs, nbrs, eids = g.expand(frontier, "any", codes)
+            fresh = frontier[:0]
+            if depth < max_depth:
+                step = nbrs
+                if direction != "any":
+                    step = nbrs[(g.edge_src[eids] == srcs) == (direction == "out")]
+                fresh = np.unique(step[~included[step]])
+                if len(fresh) > max_nodes - count:
+                    fresh, truncated = fresh[:max_nodes - count], True
+                included[fresh] = True
+                count += len(fresh)
+            if len(fresh):
+                levels.append(fresh)
+                depth += 1
+            level_edges = np.unique(eids[included[nbrs]])
+            edges = np.concatenate([edges, level_edges[~np.isin(level_edges, edges)]])
+            if len(edges) > max_edges:
+                edges, truncated = edges[:max_edges], True
+                break
+            frontier = fresh
+        return {
+            "nodes": [g.node_json(int(i)) for i in np.concatenate(levels)],
+            "edges": [g.edge_json(int(e)) for e in edges],
+            "depth": depth,
+            "truncated": bool(truncated),
+        }
+
+    def shortest_paths(self, from_name, to_name, max_len, k, direction="any", rel_types=None):
+        g = self.snapshots.get()
+        searcher = PathSearcher(g, direction, g.type_codes(rel_types))
+        found = []
+        for s in g.nodes_named(from_name):
+            for t in g.nodes_named(to_name):
+                if k <= 1:
+                    path = searcher.shortest(s, t, max_len)
+                    found.extend([path] if path is not None else [])
+                else:
+                    found.extend(k_shortest(searcher, s, t, k, max_len))
+        paths = [g.path_json(nodes, edges) for nodes, edges in shortest_k(found, k, lambda p: len(p[1]))]
+        return {"count": len(paths), "paths": paths, "engine": "native.bfs" if k <= 1 else "native.yens"}
+
+    def neighbors(self, node_id, name, depth, offset, limit):
+        g = self.snapshots.get()
+        if node_id is not None:
+            i = g.index_for_id(node_id)
+            seeds = [i] if i is not None and "Character" in g.node_labels[i] else []
+        else:
+            seeds = g.nodes_named(name)
+        page = {"offset": offset, "limit": limit}
+        if not seeds:
+            return {"nodes": [], "edges": [], "page": page}
+        dist = g.bfs_levels(seeds, depth)
+        reached = np.nonzero(dist >= 0)[0]
+        # Closest first, like the level-order traversal APOC performs
+        ordered = reached[np.argsort(dist[reached], kind="stable")][offset:offset + limit]
+        mask = np.zeros(g.n, dtype=bool)
+        mask[ordered] = True
+        nodes = [to_visual_node(g.node_json(int(i))) for i in ordered]
+        edges = []
+        for e in g.induced_edges(mask):
+            ej = g.edge_json(int(e))
+            edges.append({"id": ej["id"], "type": ej["type"], "source": ej["start"], "target": ej["end"], "props": ej["properties"]})
+        return {"nodes": nodes, "edges": edges, "page": page}
+
+    def neighbor_order(self, node_id, name, depth):
+        g = self.snapshots.get()
+        if node_id is not None:
+            i = g.index_for_id(node_id)
+            seeds = [i] if i is not None and "Character" in g.node_labels[i] else []
+        else:
+            seeds = g.nodes_named(name)
+        if not seeds:
+            return [], []
+        dist = g.bfs_levels(seeds, depth)
+        reached = np.nonzero(dist >= 0)[0]
+        ids = g.node_ids[reached]
+        order = np.lexsort((ids, dist[reached]))
+        return ids[order].tolist(), dist[reached][order].tolist()
+
+    def neighbor_page(self, ids):
+        g = self.snapshots.get()
+        page = np.array([g.index_for_id(i) for i in ids if g.index_for_id(i) is not None], dtype=np.int64)
+        # Out-edges of the page rows that land inside the page: O(page degree), not O(m)
+        _, nbrs, eids = g.expand(page, "out", None)
+        edges = []
+        for e in eids[np.isin(nbrs, page)]:
+            ej = g.edge_json(int(e))
+            edges.append({"id": ej["id"], "type": ej["type"], "source": ej["start"], "target": ej["end"], "props": ej["properties"]})
+        return {"nodes": [to_visual_node(g.node_json(int(i))) for i in page], "edges": edges}
+
+# ---------- Async backends (main_async.py) ----------
+class AsyncNeo4jBackend(_Neo4jQueries):
+    """
+    The Neo4jBackend queries on a neo4j AsyncDriver, awaited on the event loop.
+
+    k > 1 shortest paths go through the wrapped sync backend in a worker
+    thread, since GDS projections and Yen's are managed synchronously.
+    """
+
+    engine = "neo4j"
+
+    def __init__(self, driver, sync_backend: Neo4jBackend):
+        self.driver = driver
+        self.sync = sync_backend
+        self.capabilities = sync_backend.capabilities
+
+    async def _fetch(self, session, cypher, params) -> List[Any]:
+        result = await session.run(cypher, params)
+        return [r async for r in result]
+
+    async def multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit):
+        params = self._hop_params(name, min_hops, max_hops, direction, rel_types, limit + 1)
+        async with self.driver.session() as s:
+            if self.capabilities.get().has("apoc.path.expandConfig"):
+                try:
+                    recs = await self._fetch(s, _MULTI_HOP_APOC, params)
+                    return {**self._hop_apoc_batch(recs[:limit]), "truncated": len(recs) > limit}
+                except Exception as e:
+                    if not self._procedure_missing(e):
+                        raise
+            frontier = [r["id"] for r in await self._fetch(s, _HOP_START, params)]
+            dist, tree = dict.fromkeys(frontier, 0), {}
+            found = list(frontier) if min_hops == 0 else []
+            level_cypher = self._hop_level_cypher(direction, rel_types)
+            depth = 0
+            while frontier and depth < max_hops and len(found) <= limit:
+                depth += 1
+                frontier = self._hop_level(await self._fetch(s, level_cypher, {"frontier": frontier}), dist, tree, depth)
+                if depth >= min_hops:
+                    found.extend(frontier)
+            ids = found[:limit]
+            node_recs = await self._fetch(s, "MATCH (n) WHERE id(n) IN $ids RETURN n", {"ids": ids})
+            rel_recs = await self._fetch(s, "MATCH ()-[r]->() WHERE id(r) IN $rels RETURN r", {"rels": [tree[i] for i in ids if i in tree]})
+            return self._hop_result(ids, dist, tree, node_recs, rel_recs, len(found) > limit)
+
+    async def iter_multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit,
+                             batch_size=STREAM_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        if not self.capabilities.get().has("apoc.path.expandConfig"):
+            for batch in hop_batches(await self.multi_hop(name, min_hops, max_hops, direction, rel_types, limit), batch_size):
+                yield batch
+            return
+        async with self.driver.session() as s:
+            result = await s.run(_MULTI_HOP_APOC, self._hop_params(name, min_hops, max_hops, direction, rel_types, limit))
+            batch = []
+            async for r in result:
+                batch.append(r)
+                if len(batch) >= batch_size:
+                    yield self._hop_apoc_batch(batch)
+                    batch = []
+            if batch:
+                yield self._hop_apoc_batch(batch)
+
+    async def filter_relation(self, name, rel_type, limit):
+        async with self.driver.session() as s:
+            recs = await self._fetch(s, self._filter_relation_cypher(rel_type), {"name": name, "limit": limit})
+        return records_to_nodes_edges([dict(r) for r in recs])
+
+    async def subgraph(self, name, max_depth, max_nodes, max_edges, direction="any", rel_types=None):
+        if self.capabilities.get().has("apoc.path.subgraphAll"):
+            params = {"name": name, "maxDepth": max_depth, "relFilter": self._rel_filter(direction, rel_types), "limit": max_nodes + 1}
+            try:
+                async with self.driver.session() as s:
+                    result = await s.run(_SUBGRAPH_APOC, params)
+                    return self._subgraph_apoc_result(await result.single(), max_nodes, max_edges)
+            except Exception as e:
+                if not self._procedure_missing(e):
+                    raise
+
+        async with self.driver.session() as s:
+            starts = await self._fetch(s, _HOP_START, {"name": name})
+            b = SubgraphBuilder([r["id"] for r in starts], max_depth, max_nodes, max_edges, direction)
+            level_cypher = self._subgraph_level_cypher(rel_types)
+            while b.frontier:
+                b.add_level(await self._fetch(s, level_cypher, {"frontier": b.frontier, "rowLimit": b.row_limit}))
+            node_recs = await self._fetch(s, "MATCH (n) WHERE id(n) IN $ids RETURN n", {"ids": b.nodes})
+            rel_recs = await self._fetch(s, "MATCH ()-[r]->() WHERE id(r) IN $rels RETURN r", {"rels": list(b.edges)})
+            return self._subgraph_builder_result(b, node_recs, rel_recs)
+
+    async def shortest_paths(self, from_name, to_name, max_len, k, direction="any", rel_types=None):
+        if k > 1:
+            return await asyncio.to_thread(self.sync.shortest_paths, from_name, to_name, max_len, k, direction, rel_types)
+        async with self.driver.session() as s:
+            recs = await self._fetch(s, self._shortest_cypher(max_len, direction, rel_types), {"from": from_name, "to": to_name})
+        paths = shortest_k([path_record_to_graph({"path": r["path"]}) for r in recs if r.get("path") is not None], k)
+        return {"count": len(paths), "paths": paths}
+
+    async def neighbors(self, node_id, name, depth, offset, limit):
+        cy_nodes, cy_basic = self._neighbors_cypher(node_id)
+        params = {"id": node_id, "name": name, "offset": offset, "limit": limit, "depth": depth}
+
+        async with self.driver.session() as s:
+            recs = None
+            if self.capabilities.get().has("apoc.path.subgraphNodes"):
+                try:
+                    recs = await self._fetch(s, cy_nodes, params)
+                except Exception as e:
+                    if not self._procedure_missing(e):
+                        raise
+            if recs is None:
+                recs = await self._fetch(s, cy_basic, params)
+
+            nodes = [to_visual_node(node_to_dict(v["node"])) for v in recs if v.get("node")]
+            node_ids = [n["id"] for n in nodes]
+            edges = self._neighbor_edges(await self._fetch(s, _NEIGHBOR_EDGES, {"ids": node_ids})) if node_ids else []
+        return {"nodes": nodes, "edges": edges, "page": {"offset": offset, "limit": limit}}
+
+    async def neighbor_order(self, node_id, name, depth):
+        params = {"id": node_id, "name": name, "depth": depth}
+        async with self.driver.session() as s:
+            if self.capabilities.get().has("apoc.path.spanningTree"):
+                try:
+                    recs = await self._fetch(s, self._neighbor_order_apoc_cypher(node_id), params)
+                    return self._sorted_order({r["id"]: r["dist"] for r in recs})
+                except Exception as e:
+                    if not self._procedure_missing(e):
+                        raise
+            frontier = [r["id"] for r in await self._fetch(s, self._neighbor_start_cypher(node_id), params)]
+            dist = {i: 0 for i in frontier}
+            for d in range(1, depth + 1):
+                if not frontier:
+                    break
+                recs = await self._fetch(s, "MATCH (a)--(b) WHERE id(a) IN $frontier RETURN DISTINCT id(b) AS id", {"frontier": frontier})
+                frontier = [r["id"] for r in recs if r["id"] not in dist]
+                dist.update((i, d) for i in frontier)
+            return self._sorted_order(dist)
+
+    async def neighbor_page(self, ids):
+        if not ids:
+            return {"nodes": [], "edges": []}
+        async with self.driver.session() as s:
+            nodes = self._page_nodes(await self._fetch(s, "MATCH (n) WHERE id(n) IN $ids RETURN n", {"ids": ids}), ids)
+            edges = self._neighbor_edges(await self._fetch(s, _PAGE_EDGES, {"ids": ids}))
+        return {"nodes": nodes, "edges": edges}
+
+class ThreadedBackend:
+    """Async facade over a sync GraphBackend; each call runs in a worker thread."""
+
+    def __init__(self, backend: GraphBackend):
+        self.backend = backend
+        self.engine = backend.engine
+
+    def iter_multi_hop(self, *args, **kwargs) -> Iterator[Dict[str, Any]]:
+        # A plain generator: StreamingResponse already iterates it in a worker thread
+        return self.backend.iter_multi_hop(*args, **kwargs)
+
+    def __getattr__(self, name):
+        fn = getattr(self.backend, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return call
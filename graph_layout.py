@@ -0,0 +1,192 @@
+"""
+Server-side force-directed layout for the visual endpoints (layout=true).
+
+fruchterman_reingold() is a NumPy-vectorised Fruchterman-Reingold:
+- up to EXACT_LIMIT nodes the repulsion is the exact all-pairs sum,
+  computed in float32 row blocks to bound memory
+- above that, nodes repel the centroids of a uniform grid of cells,
+  weighted by cell population (a one-level Barnes-Hut-style
+  approximation), so an iteration is O(n x cells) instead of O(n^2)
+
+LayoutCache keeps finished layouts per (subgraph key, graph version) and
+remembers the last position of every node it has placed. A layout for a
+new version, or for an overlapping subgraph, starts from those positions
+with a lower temperature and fewer iterations, so nodes stay roughly
+where the user last saw them.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+EXACT_LIMIT = 1000
+BLOCK_ROWS = 1024
+GRID_CELLS = 24
+LAYOUT_SIZE = 1000.0
+
+def _repel(pos: np.ndarray, others: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """sum_j weight_j * k^2 * (p_i - o_j) / |p_i - o_j|^2 for every row i (k^2 folded into weight)."""
+    # float32 halves the memory traffic of the (block x others) matrices; plenty for screen coordinates
+    x, y = pos[:, 0].astype(np.float32), pos[:, 1].astype(np.float32)
+    ox, oy = others[:, 0].astype(np.float32), others[:, 1].astype(np.float32)
+    weight = weight.astype(np.float32)
+    disp = np.empty_like(pos)
+    for start in range(0, len(pos), BLOCK_ROWS):
+        dx = x[start:start + BLOCK_ROWS, None] - ox
+        dy = y[start:start + BLOCK_ROWS, None] - oy
+        f = weight / np.maximum(dx * dx + dy * dy, np.float32(1e-6))
+        disp[start:start + BLOCK_ROWS, 0] = (dx * f).sum(axis=1)
+        disp[start:start + BLOCK_ROWS, 1] = (dy * f).sum(axis=1)
+    return disp
+
+def _repulsion_exact(pos: np.ndarray, k2: float) -> np.ndarray:
+    return _repel(pos, pos, np.full(len(pos), k2))
+
+def _repulsion_grid(pos: np.ndarray, k2: float, cells: int = GRID_CELLS) -> np.ndarray:
+    lo = pos.min(axis=0)
+    span = np.maximum(pos.max(axis=0) - lo, 1e-9)
+    cell = np.minimum(((pos - lo) / span * cells).astype(np.int64), cells - 1)
+    flat = cell[:, 0] * cells + cell[:, 1]
+    counts = np.bincount(flat, minlength=cells * cells).astype(np.float64)
+    occupied = np.nonzero(counts)[0]
+    weight = counts[occupied]
+    centroid = np.stack([
+        np.bincount(flat, weights=pos[:, 0], minlength=cells * cells)[occupied],
+        np.bincount(flat, weights=pos[:, 1], minlength=cells * cells)[occupied],
+    ], axis=1) / weight[:, None]
+    return _repel(pos, centroid, weight * k2)
+
+def fruchterman_reingold(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    init: Optional[np.ndarray] = None,
+    iterations: int = 60,
+    temperature: Optional[float] = None,
+    size: float = LAYOUT_SIZE,
+    seed: int = 0,
+) -> np.ndarray:
+    """(n, 2) positions centred on the origin; `src`/`dst` are edge endpoint indices."""
+    if n == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(seed)
+    pos = init.astype(np.float64, copy=True) if init is not None else rng.uniform(-size / 2, size / 2, (n, 2))
+    if n == 1:
+        return pos * 0.0
+    k = size / np.sqrt(n)
+    k2 = k * k
+    t0 = temperature if temperature is not None else size / 10
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+    repulsion = _repulsion_exact if n <= EXACT_LIMIT else _repulsion_grid
+    for it in range(iterations):
+        disp = repulsion(pos, k2)
+        delta = pos[src] - pos[dst]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+        pull = delta * (dist / k)[:, None]
+        np.subtract.at(disp, src, pull)
+        np.add.at(disp, dst, pull)
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        t = t0 * (1.0 - it / iterations)
+        pos += disp * (np.minimum(length, t) / length)[:, None]
+    return pos - pos.mean(axis=0)
+
+class LayoutCache:
+    def __init__(self, max_layouts: int = 256, max_positions: int = 200_000, iterations: int = 60):
+        self.max_layouts = max_layouts
+        self.max_positions = max_positions
+        self.iterations = iterations
+        self._lock = threading.Lock()
+        self._layouts: "OrderedDict[Tuple[Hashable, int], Dict[Any, Tuple[float, float]]]" = OrderedDict()
+        # Last position of every node id placed so far (any subgraph, any version)
+        self._known: "OrderedDict[Any, Tuple[float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.warm_starts = 0
+        self.iterations_run = 0
+
+    def _remember(self, positions: Dict[Any, Tuple[float, float]]) -> None:
+        for node_id, xy in positions.items():
+            self._known[node_id] = xy
+            self._known.move_to_end(node_id)
+        while len(self._known) > self.max_positions:
+            self._known.popitem(last=False)
+
+    def positions(self, key: Hashable, version: int, graph: Dict[str, Any]) -> Tuple[Dict[Any, Tuple[float, float]], Dict[str, Any]]:
+        """(node id -> (x, y), info) for a visual graph {nodes: [{id}], edges: [{source, target}]}."""
+        ids = [n["id"] for n in graph.get("nodes", [])]
+        with self._lock:
+            cached = self._layouts.get((key, version))
+            if cached is not None and all(i in cached for i in ids):
+                self._layouts.move_to_end((key, version))
+                self.hits += 1
+                return cached, {"cached": True, "warm_start": 1.0, "iterations": 0}
+            self.misses += 1
+            known = [self._known.get(i) for i in ids]
+
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        ends = [(index[e["source"]], index[e["target"]]) for e in graph.get("edges", [])
+                if e["source"] in index and e["target"] in index]
+        src = np.array([s for s, _ in ends], dtype=np.int64)
+        dst = np.array([d for _, d in ends], dtype=np.int64)
+        seed = int.from_bytes(hashlib.sha1(repr(key).encode()).digest()[:4], "little")
+
+        n = len(ids)
+        placed = np.array([xy is not None for xy in known], dtype=bool)
+        warm = float(placed.mean()) if n else 0.0
+        if warm > 0:
+            init = np.random.default_rng(seed).uniform(-LAYOUT_SIZE / 2, LAYOUT_SIZE / 2, (n, 2))
+            init[placed] = np.array([xy for xy in known if xy is not None])
+            # New nodes start next to an already placed neighbour when there is one
+            for s, d in ends:
+                if placed[s] and not placed[d]:
+                    init[d] = init[s] + np.random.default_rng(seed + d).normal(0, LAYOUT_SIZE / 50, 2)
+                elif placed[d] and not placed[s]:
+                    init[s] = init[d] + np.random.default_rng(seed + s).normal(0, LAYOUT_SIZE / 50, 2)
+            # Mostly placed: a short, cool run is enough to settle the newcomers
+            iterations = max(10, int(self.iterations * (1.0 - 0.75 * warm)))
+            pos = fruchterman_reingold(n, src, dst, init=init, iterations=iterations,
+                                       temperature=LAYOUT_SIZE / (10 + 40 * warm), seed=seed)
+            # Keep the frame of reference of the previous layout instead of re-centring
+            if placed.any():
+                pos += (init[placed] - pos[placed]).mean(axis=0)
+        else:
+            iterations = self.iterations
+            pos = fruchterman_reingold(n, src, dst, iterations=iterations, seed=seed)
+
+        result = {node_id: (round(float(x), 2), round(float(y), 2)) for node_id, (x, y) in zip(ids, pos)}
+        with self._lock:
+            self._layouts[(key, version)] = result
+            while len(self._layouts) > self.max_layouts:
+                self._layouts.popitem(last=False)
+            self._remember(result)
+            self.warm_starts += warm > 0
+            self.iterations_run += iterations
+        return result, {"cached": False, "warm_start": round(warm, 3), "iterations": iterations}
+
+    def apply(self, key: Hashable, version: int, graph: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy of `graph` with x/y on every node and a "layout" summary. How the
+        positions were reached (cache hit, warm start, iterations) goes to
+        stats() rather than the body, so a version's answer stays byte-stable.
+        """
+        positions, _ = self.positions(key, version, graph)
+        out = dict(graph)
+        out["nodes"] = [{**n, "x": positions[n["id"]][0], "y": positions[n["id"]][1]} for n in graph.get("nodes", [])]
+        out["layout"] = {"algorithm": "fruchterman_reingold", "graph_version": version}
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "layouts": len(self._layouts),
+                "known_positions": len(self._known),
+                "hits": self.hits,
+                "misses": self.misses,
+                "warm_starts": self.warm_starts,
+                "iterations_run": self.iterations_run,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
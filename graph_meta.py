@@ -0,0 +1,130 @@
+"""
+Persistent graph version on a single (:GraphMeta {key: 'graph'}) node.
+
+Write endpoints run their Cypher inside GraphMeta.write(): the writes and
+the version increment share one transaction, so the stored version moves
+exactly when a write commits (a rolled-back request leaves it alone).
+The in-process GraphVersion, which caches, GDS projections, jobs and
+ETags key on, then jumps to the committed value.
+
+The node is read at startup and every `refresh_interval` seconds, so
+writes committed by another uvicorn worker or by full_data_loader.py move
+this process's version too. If Neo4j cannot be reached at startup the
+counter stays in-process (`persistent` is False) until a read succeeds.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from graph_version import GraphVersion
+
+logger = logging.getLogger(__name__)
+
+META_LABEL = "GraphMeta"
+BUMP_CYPHER = (
+    f"MERGE (m:{META_LABEL} {{key: $key}}) "
+    "ON CREATE SET m.version = 0 "
+    "SET m.version = m.version + 1, m.updated_at = timestamp() "
+    "RETURN m.version AS version"
+)
+READ_CYPHER = f"MATCH (m:{META_LABEL} {{key: $key}}) RETURN m.version AS version"
+# Without it two first writers racing through MERGE could each create a node
+CONSTRAINT_CYPHER = f"CREATE CONSTRAINT graph_meta_key IF NOT EXISTS FOR (m:{META_LABEL}) REQUIRE m.key IS UNIQUE"
+
+def bump(tx, key: str = "graph") -> int:
+    """Increment the stored version inside `tx` (a transaction or session) and return the new value."""
+    return tx.run(BUMP_CYPHER, {"key": key}).single()["version"]
+
+class GraphWrite:
+    """What a GraphMeta.write() block gets: run() goes to the open transaction; version is set after the commit."""
+
+    def __init__(self, tx):
+        self._tx = tx
+        self.version: Optional[int] = None
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._tx.run(query, parameters, **kwargs)
+
+class GraphMeta:
+    def __init__(
+        self,
+        driver,
+        version: GraphVersion,
+        on_change: Callable[[int], None],
+        key: str = "graph",
+        refresh_interval: float = 5.0,
+        read_driver=None,
+    ):
+        self.driver = driver
+        # Background reads can use an uninstrumented driver so they stay out of the query metrics
+        self.read_driver = read_driver or driver
+        self.version = version
+        self.on_change = on_change
+        self.key = key
+        self.refresh_interval = refresh_interval
+        self.persistent = False
+        self.external_changes = 0
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def committed(self, version: int) -> None:
+        """A transaction that bumped the stored version to `version` committed."""
+        if self.version.advance(version):
+            self.on_change(self.version.current)
+
+    def bump_in(self, tx) -> int:
+        return bump(tx, self.key)
+
+    @contextmanager
+    def write(self) -> Iterator[GraphWrite]:
+        with self.driver.session() as s:
+            with s.begin_transaction() as tx:
+                w = GraphWrite(tx)
+                yield w
+                version = self.bump_in(tx)
+                tx.commit()
+        w.version = version
+        self.persistent = True
+        self.committed(version)
+
+    def refresh(self) -> Optional[int]:
+        """Read the stored version and catch up with it; None if Neo4j could not be read."""
+        try:
+            with self.read_driver.session() as s:
+                rec = s.run(READ_CYPHER, {"key": self.key}).single()
+        except Exception as e:
+            logger.debug("Graph version refresh failed: %s", e)
+            return None
+        stored = rec["version"] if rec is not None else 0
+        self.persistent = True
+        if self.version.advance(stored):
+            self.external_changes += 1
+            self.on_change(self.version.current)
+        return stored
+
+    def start(self) -> None:
+        """Load the stored version and keep following it every `refresh_interval` seconds."""
+        if self.refresh() is None:
+            logger.warning("⚠️  Could not read the stored graph version; using an in-process counter until Neo4j answers")
+        if self.refresh_interval > 0 and self._refresher is None:
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._follow, name="graph-meta-refresh", daemon=True)
+            self._refresher.start()
+
+    def _follow(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._refresher = None
+
+    def stats(self) -> Any:
+        return {
+            "version": self.version.current,
+            "persistent": self.persistent,
+            "key": self.key,
+            "refresh_interval": self.refresh_interval,
+            "external_changes": self.external_changes,
+        }
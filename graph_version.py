@@ -0,0 +1,31 @@
+"""
+Monotonic graph version counter.
+
+Every write endpoint moves it (to the value persisted by graph_meta.py,
+in the write's own transaction); caches and derived structures (GDS
+projections, snapshots, ...) key their entries by the value they were
+built from and rebuild lazily once it moves on.
+"""
+import threading
+
+class GraphVersion:
+    def __init__(self, start: int = 0):
+        self._value = start
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+    def advance(self, value: int) -> bool:
+        """Move up to `value` (a version persisted elsewhere, see graph_meta.py); False if already there or past it."""
+        with self._lock:
+            if value <= self._value:
+                return False
+            self._value = value
+            return True
@@ -0,0 +1,173 @@
+"""
+Character identifier resolution for /characters/{char_id}.
+
+The old lookups matched `c.name = $char_id OR id(c) = $char_id`: the OR
+rules out an index seek, so every call scanned :Character (and id(c) was
+compared with a string, so ids never matched). IdentifierResolver instead
+classifies the identifier and emits one index-backed MATCH per kind:
+
+    name          MATCH (c:Character {name: $value})        character_name index
+    character_id  MATCH (c:Character {character_id: $value}) character_id_unique constraint
+    id            WHERE id(c) = $value                      node id seek (the "id" the API returns)
+    element_id    WHERE elementId(c) = $value               node id seek
+
+`by=auto` picks: Neo4j 5 element ids ("4:<uuid>:12") -> element_id,
+digits -> id, anything else -> name. An all-digit name or character_id
+therefore needs an explicit by=name / by=character_id.
+
+Reads by name resolve to the oldest namesake. Writes (every=True) keep the
+old PUT/DELETE semantics and touch every node with that name.
+
+Resolved names and character_ids are kept in an LRU of element ids. A
+cached handle is tried first, guarded by the original predicate (so a
+renamed, deleted or reused node never matches), and the indexed MATCH is
+the fallback; either way a lookup is a single round trip.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+KINDS = ("auto", "name", "character_id", "id", "element_id")
+
+# Indexes the resolver's MATCH clauses rely on; created at startup
+SCHEMA_STATEMENTS = (
+    "CREATE INDEX character_name IF NOT EXISTS FOR (c:Character) ON (c.name)",
+    "CREATE CONSTRAINT character_id_unique IF NOT EXISTS FOR (c:Character) REQUIRE c.character_id IS UNIQUE",
+)
+
+_ELEMENT_ID = re.compile(r"^\d+:[0-9A-Za-z-]+:\d+$")
+
+_MATCH = {
+    # Names are not unique: resolve to the oldest node, as a handle must be one node
+    "name": "MATCH (c:Character {name: $value}) WITH c ORDER BY id(c) LIMIT 1",
+    "character_id": "MATCH (c:Character {character_id: $value})",
+    "id": "MATCH (c:Character) WHERE id(c) = $value",
+    "element_id": "MATCH (c:Character) WHERE elementId(c) = $value",
+}
+# Writes by name apply to all namesakes, as the name OR id lookup used to
+_WRITE_MATCH = {**_MATCH, "name": "MATCH (c:Character {name: $value})"}
+_CACHED_MATCH = {
+    "name": "MATCH (c:Character) WHERE elementId(c) = $eid AND c.name = $value",
+    "character_id": "MATCH (c:Character) WHERE elementId(c) = $eid AND c.character_id = $value",
+}
+
+def classify(ident: str, by: str = "auto") -> Tuple[str, Any]:
+    """(kind, query value) for a path identifier; raises ValueError for an unusable one."""
+    if by not in KINDS:
+        raise ValueError(f"by must be one of {', '.join(KINDS)}")
+    ident = ident.strip()
+    if not ident:
+        raise ValueError("empty identifier")
+    if by == "auto":
+        if _ELEMENT_ID.match(ident):
+            by = "element_id"
+        elif ident.isdigit():
+            by = "id"
+        else:
+            by = "name"
+    if by == "id":
+        if not ident.isdigit():
+            raise ValueError("id must be an integer")
+        return by, int(ident)
+    if by == "character_id" and ident.lstrip("-").isdigit():
+        return by, int(ident)
+    return by, ident
+
+class IdentifierResolver:
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._handles: "OrderedDict[Tuple[str, Any], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def plans(self, ident: str, by: str = "auto", every: bool = False) -> Tuple[Tuple[str, Any], List[Tuple[str, Dict[str, Any]]]]:
+        """
+        ((kind, value), [(match clause binding `c`, params), ...]) in the order
+        to try them; a later plan only runs when the previous one matched nothing.
+        `every` binds all namesakes instead of one handle, so the cache is skipped.
+        """
+        key = classify(ident, by)
+        kind, value = key
+        if every:
+            return key, [(_WRITE_MATCH[kind], {"value": value})]
+        plans = []
+        with self._lock:
+            eid = self._handles.get(key)
+            if eid is not None:
+                self._handles.move_to_end(key)
+                self.hits += 1
+                plans.append((_CACHED_MATCH[kind], {"eid": eid, "value": value}))
+            elif kind in _CACHED_MATCH:
+                self.misses += 1
+        plans.append((_MATCH[kind], {"value": value}))
+        return key, plans
+
+    def remember(self, key: Tuple[str, Any], eid: Optional[str]) -> None:
+        if key[0] not in _CACHED_MATCH:
+            return
+        with self._lock:
+            if eid is None:
+                self._handles.pop(key, None)
+                return
+            self._handles[key] = eid
+            self._handles.move_to_end(key)
+            while len(self._handles) > self.max_entries:
+                self._handles.popitem(last=False)
+
+    def run(self, session, ident: str, by: str, tail: str, params: Optional[Dict[str, Any]] = None,
+            every: bool = False) -> List[Any]:
+        """
+        Records of `<match> <tail>` for the resolved node (every namesake with
+        `every`). `tail` continues from the bound `c` and must return
+        `elementId(c) AS eid` (or `eid` from a WITH).
+        """
+        key, plans = self.plans(ident, by, every)
+        for match, plan_params in plans:
+            records = list(session.run(f"{match} {tail}", {**(params or {}), **plan_params}))
+            if records:
+                if not every:
+                    self.remember(key, records[0]["eid"])
+                return records
+        self.remember(key, None)
+        return []
+
+    async def run_async(self, session, ident: str, by: str, tail: str, params: Optional[Dict[str, Any]] = None,
+                        every: bool = False) -> List[Any]:
+        """run() for a neo4j AsyncSession."""
+        key, plans = self.plans(ident, by, every)
+        for match, plan_params in plans:
+            result = await session.run(f"{match} {tail}", {**(params or {}), **plan_params})
+            records = [r async for r in result]
+            if records:
+                if not every:
+                    self.remember(key, records[0]["eid"])
+                return records
+        self.remember(key, None)
+        return []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._handles),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+def ensure_schema(driver, extra: Iterable[str] = ()) -> List[str]:
+    """Create the lookup indexes/constraints plus `extra` ones (idempotent); returns the errors, if any."""
+    errors = []
+    try:
+        with driver.session() as s:
+            for stmt in (*SCHEMA_STATEMENTS, *extra):
+                try:
+                    s.run(stmt).consume()
+                except Exception as e:
+                    errors.append(f"{stmt}: {e}")
+    except Exception as e:
+        errors.append(str(e))
+    return errors
@@ -0,0 +1,295 @@
+"""
+Background jobs for analytics too slow for a request (POST /jobs/*).
+
+A job is (kind, params). submit() answers with a job id straight away and
+the work runs in a process pool (spawn), so it neither holds a server
+worker nor the GIL. At most `limits[kind]` jobs of one kind run at a time;
+the others wait in submission order.
+
+Jobs and their JSON results are stored in SQLite (`db_path`), so they can
+be fetched after the fact and survive a restart (jobs whose server process
+is gone are marked failed when the next runner opens the database). A finished job is reused for an identical
+(kind, params) submission until the graph version changes, and an
+identical job that is still queued in this process (or running on the
+current version) is joined rather than started twice.
+
+Workers get the CSR snapshot pickled along with the job and report
+progress (0..1) through a manager queue that a thread of the server
+process writes back to SQLite.
+"""
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import communities
+import native_analytics
+from graph_backend import CSRGraph, GraphSnapshotStore, InMemoryGraphBackend
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    graph_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner INTEGER NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_reuse ON jobs (kind, params, graph_version, status);
+"""
+_COLUMNS = ("id", "kind", "params", "graph_version", "status", "progress", "created_at", "started_at", "finished_at", "error")
+
+# ---------- Job kinds (run in the worker processes) ----------
+def _centrality_job(g: CSRGraph, params: Dict[str, Any], progress: Callable[[float], None]) -> Dict[str, Any]:
+    method = params["method"]
+    mask = g.label_mask("Character")
+    A = native_analytics.adjacency(g, mask)
+    if method == "degree":
+        scores = (np.diff(g.out_indptr) + np.diff(g.in_indptr)).astype(np.float64)
+    elif method == "pagerank":
+        scores = native_analytics.pagerank(A)
+    elif method == "eigenvector":
+        scores = native_analytics.eigenvector(A)
+    elif method == "betweenness":
+        scores = native_analytics.betweenness(A, progress=progress)
+    elif method == "closeness":
+        scores = native_analytics.closeness(A, progress=progress)
+    else:
+        raise ValueError(f"Unknown centrality method '{method}'")
+    return {"method": method, "results": native_analytics.top_scores(g, scores, params["limit"], mask), "engine": "native"}
+
+def _paths_job(g: CSRGraph, params: Dict[str, Any], progress: Callable[[float], None]) -> Dict[str, Any]:
+    backend = InMemoryGraphBackend(GraphSnapshotStore(lambda: g))
+    return backend.shortest_paths(params["from_name"], params["to_name"], params["max_len"], params["k"],
+                                  params["direction"], params["rel_types"])
+
+def _communities_job(g: CSRGraph, params: Dict[str, Any], progress: Callable[[float], None]) -> Dict[str, Any]:
+    result = communities.native_partition(g, params["resolution"], params["seed"])
+    return communities.page(result, 0, params["limit"], params["min_size"])
+
+JOB_KINDS: Dict[str, Callable[[CSRGraph, Dict[str, Any], Callable[[float], None]], Dict[str, Any]]] = {
+    "centrality": _centrality_job,
+    "paths": _paths_job,
+    "communities": _communities_job,
+}
+
+def _work(kind: str, params: Dict[str, Any], g: CSRGraph, progress_queue, job_id: str) -> Dict[str, Any]:
+    last = [0.0]
+
+    def progress(fraction: float) -> None:
+        # At most ~100 messages per job
+        if fraction - last[0] >= 0.01 or fraction >= 1.0:
+            last[0] = fraction
+            progress_queue.put((job_id, float(fraction)))
+
+    return JOB_KINDS[kind](g, params, progress)
+
+# ---------- Runner (server process) ----------
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    def __init__(
+        self,
+        db_path: str,
+        snapshot: Callable[[], CSRGraph],
+        version: Callable[[], Any],
+        workers: int = 2,
+        limits: Optional[Dict[str, int]] = None,
+    ):
+        self._snapshot = snapshot
+        self._version = version
+        self.workers = workers
+        self.limits = {kind: 1 for kind in JOB_KINDS}
+        self.limits.update(limits or {})
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(_SCHEMA)
+        # Queued / running jobs of a server process that is gone will never finish; other
+        # live processes (uvicorn workers, spawned job workers importing the app) keep theirs
+        owners = [pid for (pid,) in self._db.execute("SELECT DISTINCT owner FROM jobs WHERE status IN ('queued', 'running')")]
+        for pid in owners:
+            if pid != os.getpid() and not _pid_alive(pid):
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'interrupted by a server restart', finished_at = ? "
+                    "WHERE owner = ? AND status IN ('queued', 'running')",
+                    (time.time(), pid),
+                )
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+        self._running: Counter = Counter()
+        self._waiting: Dict[str, Deque[Tuple[str, Dict[str, Any]]]] = {kind: deque() for kind in JOB_KINDS}
+
+    # ----- pool -----
+    def _ensure_pool(self) -> None:
+        if self._pool is not None:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._progress = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        threading.Thread(target=self._drain_progress, args=(self._progress,), name="job-progress", daemon=True).start()
+
+    def _drain_progress(self, queue) -> None:
+        while True:
+            try:
+                item = queue.get()
+            except Exception:
+                return
+            if item is None:
+                return
+            job_id, fraction = item
+            with self._lock:
+                self._db.execute("UPDATE jobs SET progress = ? WHERE id = ? AND status = 'running'", (fraction, job_id))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, manager, progress = self._pool, self._manager, self._progress
+            self._pool = self._manager = self._progress = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if progress is not None:
+            try:
+                progress.put(None)
+            except Exception:
+                pass
+        if manager is not None:
+            manager.shutdown()
+
+    # ----- submission -----
+    def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job, or return the matching finished / in-flight one for the current graph version."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(JOB_KINDS)}")
+        key = json.dumps(params, sort_keys=True)
+        version = str(self._version())
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE kind = ? AND params = ? "
+                "AND ((status = 'queued' AND owner = ?) OR (status IN ('running', 'done') AND graph_version = ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (kind, key, os.getpid(), version),
+            ).fetchone()
+            if row is not None:
+                return {**self._job(row), "reused": True}
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, params, graph_version, status, owner, created_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, key, version, os.getpid(), time.time()),
+            )
+            self._waiting[kind].append((job_id, params))
+        self._dispatch(kind)
+        return {**self.get(job_id), "reused": False}
+
+    def _dispatch(self, kind: str) -> None:
+        while True:
+            with self._lock:
+                if not self._waiting[kind] or self._running[kind] >= self.limits.get(kind, 1):
+                    return
+                job_id, params = self._waiting[kind].popleft()
+                self._running[kind] += 1
+                self._ensure_pool()
+                pool, progress = self._pool, self._progress
+            try:
+                # The version is taken before the snapshot, so a result is never newer than its label
+                version = str(self._version())
+                g = self._snapshot()
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, graph_version = ? WHERE id = ?",
+                        (time.time(), version, job_id),
+                    )
+                future = pool.submit(_work, kind, params, g, progress, job_id)
+            except Exception as e:
+                self._finish(job_id, kind, None, e)
+                continue
+            future.add_done_callback(lambda f, job_id=job_id, kind=kind: self._on_done(job_id, kind, f))
+
+    def _on_done(self, job_id: str, kind: str, future) -> None:
+        try:
+            result, error = future.result(), None
+        except BaseException as e:
+            result, error = None, e
+        self._finish(job_id, kind, result, error)
+        self._dispatch(kind)
+
+    def _finish(self, job_id: str, kind: str, result: Optional[Dict[str, Any]], error: Optional[BaseException]) -> None:
+        with self._lock:
+            self._running[kind] -= 1
+            if error is None:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'done', progress = 1, finished_at = ?, result = ? WHERE id = ?",
+                    (time.time(), json.dumps(result, default=str, ensure_ascii=False), job_id),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                    (time.time(), f"{type(error).__name__}: {error}", job_id),
+                )
+
+    # ----- lookups -----
+    def _job(self, row) -> Dict[str, Any]:
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        if job["status"] == "done":
+            job["stale"] = job["graph_version"] != str(self._version())
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def result(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """(job, decoded result); the result is None until the job is done."""
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)}, result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None, None
+        job = self._job(row[:-1])
+        return job, json.loads(row[-1]) if row[-1] is not None else None
+
+    def list(self, limit: int = 50, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        args: List[Any] = []
+        if kind:
+            query += " WHERE kind = ?"
+            args.append(kind)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+        return [self._job(r) for r in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            return {
+                "workers": self.workers,
+                "limits": dict(self.limits),
+                "running": dict(self._running),
+                "waiting": {kind: len(q) for kind, q in self._waiting.items()},
+                "jobs": counts,
+            }
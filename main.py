@@ -1,26 +1,96 @@
 
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from neo4j import GraphDatabase
+import json
 import os
 import re
+import uuid
+
+from graph_backend import (
+    CSRGraph,
+    GraphSnapshotStore,
+    InMemoryGraphBackend,
+    Neo4jBackend,
+    load_snapshot_from_neo4j,
+    load_snapshot_from_seed_data,
+    path_record_to_graph,
+    records_to_nodes_edges,
+    to_visual_node,
+)
+from capabilities import CapabilityRegistry
+from gds_projections import ProjectionManager
+from graph_version import GraphVersion
+from response_cache import ResponseCache
+from batching import DEFAULT_BATCH_SIZE, write_batches
+import wire_format
+from graph_layout import LayoutCache
+from cursor_store import CursorExpired, CursorStore, InvalidCursor
+from name_search import NameIndex
+from identifiers import IdentifierResolver, classify, ensure_schema
+from centrality_store import CentralityStore, degree_rows
+import metrics
+from etag import ETagMiddleware
+from slow_queries import SlowQueryLog
+from jobs import JobRunner
+from graph_meta import CONSTRAINT_CYPHER as GRAPH_META_CONSTRAINT, META_LABEL, GraphMeta
+from approx_betweenness import ApproxBetweenness, sample_size
+import communities
+
+# Per-endpoint/per-phase timings at GET /metrics; METRICS_ENABLED=0 turns them off
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# Queries slower than SLOW_QUERY_MS land in GET /debug/slow_queries; SLOW_QUERY_LOG_SIZE=0 turns it off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_PROFILE_SAMPLE = float(os.getenv("SLOW_QUERY_PROFILE_SAMPLE", "0.1"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+# Parameter values in the slow-query log are redacted to type/size unless SLOW_QUERY_SHOW_PARAMS=1
+SLOW_QUERY_SHOW_PARAMS = os.getenv("SLOW_QUERY_SHOW_PARAMS", "0") == "1"
+_INSTRUMENT_DRIVERS = METRICS_ENABLED or SLOW_QUERY_LOG_SIZE > 0
 
 # ---------- App & Drivers ----------
-app = FastAPI(title="Tam Quoc API — Graph Suite")
+app = FastAPI(
+    title="Tam Quoc API — Graph Suite",
+    default_response_class=metrics.TimedJSONResponse if METRICS_ENABLED else JSONResponse,
+)
 
 # Primary app driver
-driver = GraphDatabase.driver(
+driver = metrics.instrument_driver(GraphDatabase.driver(
     uri=os.getenv("NEO4J_URI", "bolt://localhost:7687"),
     auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "changeit")),
-)
+), _INSTRUMENT_DRIVERS)
 
 # Raw driver for ad‑hoc Cypher/GDS
 _RAW_NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 _RAW_NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 _RAW_NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "changeit")
-_raw_driver = GraphDatabase.driver(_RAW_NEO4J_URI, auth=(_RAW_NEO4J_USER, _RAW_NEO4J_PASSWORD))
+_neo4j_driver = GraphDatabase.driver(_RAW_NEO4J_URI, auth=(_RAW_NEO4J_USER, _RAW_NEO4J_PASSWORD))
+_raw_driver = metrics.instrument_driver(_neo4j_driver, _INSTRUMENT_DRIVERS)
+
+# PROFILE re-runs go through the uninstrumented driver so they are not logged themselves
+_slow_queries = SlowQueryLog(
+    threshold_ms=SLOW_QUERY_MS,
+    sample_rate=SLOW_QUERY_PROFILE_SAMPLE,
+    capacity=max(1, SLOW_QUERY_LOG_SIZE),
+    profile_driver=_neo4j_driver,
+    show_params=SLOW_QUERY_SHOW_PARAMS,
+)
+if SLOW_QUERY_LOG_SIZE > 0:
+    metrics.add_query_listener(_slow_queries.observe)
+
+# ETag "v<graph version>-..." on the read endpoints; a matching If-None-Match is answered 304
+# before any Cypher runs. Added before CORS so the 304s still get the CORS headers
+ETAG_ENABLED = os.getenv("ETAG_ENABLED", "1") != "0"
+# /visual/neighbors hands out fresh paging cursors and /query/communities a "cached" flag,
+# so neither body is fixed by the version alone
+ETAG_PREFIXES = ("/characters", "/factions", "/search", "/query/", "/schema/")
+ETAG_EXCLUDE_PATHS = ("/query/communities",)
+if ETAG_ENABLED:
+    app.add_middleware(ETagMiddleware, version=lambda: _graph_version.current, prefixes=ETAG_PREFIXES,
+                       exclude_paths=ETAG_EXCLUDE_PATHS)
 
 # CORS to let your web frontend call these endpoints directly
 app.add_middleware(
@@ -30,9 +100,33 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.on_event("startup")
+def _probe_capabilities():
+    _capabilities.refresh()
+    # Indexes behind the /characters/{char_id} lookups and the GraphMeta key constraint (idempotent)
+    global _schema_errors
+    _schema_errors = ensure_schema(_raw_driver, (GRAPH_META_CONSTRAINT,))
+    # Catch up with the persisted graph version and follow writes made elsewhere
+    _graph_meta.start()
 
 @app.on_event("shutdown")
 def _shutdown_all():
+    _graph_meta.stop()
+    try:
+        _projections.drop_all()
+    except Exception:
+        pass
+    try:
+        _jobs.shutdown()
+    except Exception:
+        pass
+    try:
+        _approx_betweenness.shutdown()
+    except Exception:
+        pass
     try:
         driver.close()
     except Exception:
@@ -60,53 +154,68 @@ class RelationshipIn(BaseModel):
     properties: Optional[Dict[str, Any]] = None
 
 # ---------- Helpers ----------
-def _path_record_to_graph(rec: Dict[str, Any]) -> Dict[str, Any]:
-    path = rec.get("path")
-    if path is None:
-        # Try detect in any value
-        for v in rec.values():
-            if hasattr(v, "nodes") and hasattr(v, "relationships"):
-                path = v
-                break
-    if path is None:
-        return {"nodes": [], "edges": []}
-
-    nodes = {}
-    edges = []
-    for node in path.nodes:
-        nodes[node.id] = {"id": node.id, "labels": list(node.labels), **dict(node)}
-    for rel in path.relationships:
-        edges.append({
-            "id": rel.id,
-            "type": rel.type,
-            "start": rel.start_node.id,
-            "end": rel.end_node.id,
-            "properties": dict(rel),
-        })
-    return {"nodes": list(nodes.values()), "edges": edges}
-
-def _records_to_nodes_edges(records: List[Dict[str, Any]]) -> Dict[str, Any]:
-    nodes = {}
-    edges = []
-    for r in records:
-        for v in r.values():
-            # Node
-            if hasattr(v, "labels") and hasattr(v, "id"):
-                nodes[v.id] = {"id": v.id, "labels": list(v.labels), **dict(v)}
-            # Relationship
-            elif hasattr(v, "type") and hasattr(v, "start_node"):
-                edges.append({
-                    "id": v.id,
-                    "type": v.type,
-                    "start": v.start_node.id,
-                    "end": v.end_node.id,
-                    "properties": dict(v),
-                })
-    return {"nodes": list(nodes.values()), "edges": edges}
+_path_record_to_graph = path_record_to_graph
+_records_to_nodes_edges = records_to_nodes_edges
+
+def _visual_from_subgraph(sg: Dict[str, Any]) -> Dict[str, Any]:
+    nodes = [to_visual_node(n) for n in sg.get("nodes", [])]
+    edges = [{"id": e["id"], "source": e["start"], "target": e["end"], "type": e["type"], "props": e.get("properties", {})} for e in sg.get("edges", [])]
+    return {"nodes": nodes, "edges": edges, "truncated": sg.get("truncated", False)}
+
+def _ndjson(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, default=str, ensure_ascii=False) + "\n"
+
+def _check_stream(stream: Optional[str]) -> bool:
+    if stream is None:
+        return False
+    if stream.lower() != "ndjson":
+        raise HTTPException(status_code=400, detail="stream must be ndjson")
+    return True
+
+def _ndjson_response(items: Iterator[Dict[str, Any]], kind: str) -> StreamingResponse:
+    """
+    One NDJSON line per item ({"type": kind, ...}) as it comes off the cursor,
+    then {"type": "end", "count": n}. The status line is already sent by then,
+    so a failure mid-stream ends with {"type": "error", "detail": ...}.
+    """
+    def body():
+        count = 0
+        try:
+            for item in items:
+                count += 1
+                yield _ndjson({"type": kind, **item})
+            yield _ndjson({"type": "end", "count": count})
+        except Exception as e:
+            yield _ndjson({"type": "error", "detail": str(e), "count": count})
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+def _wire_response(request: Request, fmt: Optional[str], graph: Dict[str, Any]):
+    """Visual graph in the format asked for by ?format= or Accept (see wire_format.py)."""
+    chosen = wire_format.negotiate(request.headers.get("accept"), fmt)
+    if chosen is None:
+        raise HTTPException(status_code=406, detail=f"Supported formats: {', '.join(wire_format.available_formats())}")
+    if chosen == "json":
+        return graph
+    with metrics.phase("encode"):
+        body = wire_format.encode(graph, chosen)
+    return Response(body, media_type=wire_format.MEDIA_TYPES[chosen])
+
+def _character_doc(node) -> Dict[str, Any]:
+    """CharacterOut shape: the node's properties plus its id as a string."""
+    char_data = dict(node)
+    char_data["id"] = str(node.id)
+    return char_data
 
 def _clean_label_or_rel(s: str) -> str:
     return re.sub(r"[^A-Za-z0-9_]", "", s or "").upper()
 
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def _node_label(s: str) -> str:
+    """Node labels keep their case (`Character` must stay `Character`); "" when not a plain identifier."""
+    s = (s or "").strip()
+    return s if _IDENTIFIER.match(s) else ""
+
 def _props_to_set_fragment(props: Dict[str, Any], alias: str) -> str:
     if not props:
         return ""
@@ -115,13 +224,130 @@ def _props_to_set_fragment(props: Dict[str, Any], alias: str) -> str:
         return ""
     return " SET " + ", ".join([f"{alias}.{k} = $props.{k}" for k in keys])
 
+# Probed at startup, refreshed every CAPABILITY_TTL seconds or via /capabilities?refresh=true
+_capabilities = CapabilityRegistry(_raw_driver, ttl=float(os.getenv("CAPABILITY_TTL", "300")))
+
 def _supports_gds() -> bool:
+    return _capabilities.get().gds
+
+# ---------- Graph backend ----------
+# GRAPH_BACKEND=neo4j (default) sends every traversal to Neo4j;
+# GRAPH_BACKEND=memory answers them from an in-process CSR snapshot.
+# GRAPH_SNAPSHOT_SOURCE=neo4j|seed|synthetic picks where that snapshot is loaded from
+# (synthetic: synthetic_graph.generate with SYNTHETIC_EDGES edges, for benchmarks).
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+GRAPH_SNAPSHOT_SOURCE = os.getenv("GRAPH_SNAPSHOT_SOURCE", "neo4j").lower()
+
+def _load_snapshot():
+    if GRAPH_SNAPSHOT_SOURCE == "seed":
+        return load_snapshot_from_seed_data()
+    if GRAPH_SNAPSHOT_SOURCE == "synthetic":
+        from synthetic_graph import generate
+        return CSRGraph(*generate(int(os.getenv("SYNTHETIC_EDGES", "10000"))))
+    return load_snapshot_from_neo4j(_raw_driver)
+
+_snapshots = GraphSnapshotStore(_load_snapshot)
+
+# Bumped by every write; GDS projections are keyed by it
+_graph_version = GraphVersion()
+_projections = ProjectionManager(_raw_driver, _graph_version)
+
+if GRAPH_BACKEND == "memory":
+    _backend = InMemoryGraphBackend(_snapshots)
+else:
+    _backend = Neo4jBackend(_raw_driver, _capabilities, _projections)
+
+# Read-through cache for dashboard queries; see GET /cache/stats
+_response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+    version=lambda: _graph_version.current,
+)
+
+# Server-side positions for layout=true; cached per subgraph and graph version
+_layouts = LayoutCache(
+    max_layouts=int(os.getenv("LAYOUT_CACHE_SIZE", "256")),
+    iterations=int(os.getenv("LAYOUT_ITERATIONS", "60")),
+)
+
+# Materialised neighbourhoods behind /visual/neighbors cursors
+# Hard caps (and defaults) for the max_nodes / max_edges budgets of /query/subgraph and /query/visual
+SUBGRAPH_MAX_NODES = int(os.getenv("SUBGRAPH_MAX_NODES", "5000"))
+SUBGRAPH_MAX_EDGES = int(os.getenv("SUBGRAPH_MAX_EDGES", "20000"))
+
+_cursors = CursorStore(ttl=float(os.getenv("CURSOR_TTL", "300")))
+
+# name / character_id -> element id handles for /characters/{char_id}
+_identifiers = IdentifierResolver(max_entries=int(os.getenv("IDENTIFIER_CACHE_SIZE", "10000")))
+_schema_errors: List[str] = []
+
+def _character_lookup(s, char_id: str, by: str, tail: str, params: Optional[Dict[str, Any]] = None,
+                      every: bool = False):
     try:
-        with _raw_driver.session() as s:
-            rec = s.run("SHOW PROCEDURES YIELD name WHERE name STARTS WITH 'gds.' RETURN count(*) AS c").single()
-            return (rec and rec.get("c", 0) > 0) or False
-    except Exception:
-        return False
+        return _identifiers.run(s, char_id, by, tail, params, every)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Folded-name trigram index behind /search; kept current by the character writes
+def _load_search_names():
+    if GRAPH_BACKEND == "memory":
+        g = _snapshots.get()
+        return [(int(g.node_ids[i]), name) for name, idxs in g.name_index.items() for i in idxs]
+    with _raw_driver.session() as s:
+        return [(r["id"], r["name"]) for r in s.run("MATCH (c:Character) RETURN id(c) AS id, c.name AS name")]
+
+_names = NameIndex(_load_search_names, max_age=float(os.getenv("SEARCH_INDEX_MAX_AGE", "600")))
+
+# Degree counters and warm-started PageRank for /query/centrality; writes report their deltas via apply()
+def _load_degrees():
+    if GRAPH_BACKEND == "memory":
+        return degree_rows(_snapshots.get())
+    with _raw_driver.session() as s:
+        cypher = "MATCH (n:Character) RETURN id(n) AS id, n.name AS name, COUNT {(n)--()} AS degree"
+        return [(r["id"], r["name"], r["degree"]) for r in s.run(cypher)]
+
+_centrality = CentralityStore(_graph_version, _snapshots.get, _load_degrees, max_age=float(os.getenv("CENTRALITY_MAX_AGE", "600")))
+# Louvain partitions behind /query/communities, one per (engine, parameters) at the current graph version
+_communities = communities.CommunityStore(_graph_version, max_entries=int(os.getenv("COMMUNITY_CACHE_SIZE", "8")))
+# Pivot-sampled betweenness (approx=true); pivots are spread over this many processes
+_approx_betweenness = ApproxBetweenness(workers=int(os.getenv("BETWEENNESS_WORKERS", str(os.cpu_count() or 1))))
+
+# Background analytics (POST /jobs/*). Results are labelled with the persisted graph version;
+# while it could not be read the in-process counter restarts with the process, so the boot id is added
+_BOOT_ID = uuid.uuid4().hex[:12]
+_jobs = JobRunner(
+    os.getenv("JOBS_DB", "jobs.sqlite3"),
+    _snapshots.get,
+    version=lambda: _graph_version.current if _graph_meta.persistent else f"{_BOOT_ID}:{_graph_version.current}",
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    limits={
+        "centrality": int(os.getenv("JOB_LIMIT_CENTRALITY", "1")),
+        "communities": int(os.getenv("JOB_LIMIT_COMMUNITIES", "1")),
+        "paths": int(os.getenv("JOB_LIMIT_PATHS", "2")),
+    },
+)
+
+def _on_graph_write(version: int) -> None:
+    """The graph moved to `version`: a write committed here, or one seen on the GraphMeta node."""
+    _snapshots.invalidate()
+    _response_cache.clear()
+
+# The version lives on a (:GraphMeta) node; write endpoints bump it in their own transaction
+_graph_meta = GraphMeta(
+    _raw_driver,
+    _graph_version,
+    _on_graph_write,
+    refresh_interval=float(os.getenv("GRAPH_VERSION_REFRESH", "5")),
+    read_driver=_neo4j_driver,
+)
+
+_DIRECTIONS = {"out", "in", "any"}
+
+def _parse_rel_types(rel_types: Optional[str]) -> Optional[List[str]]:
+    if not rel_types:
+        return None
+    cleaned = [_clean_label_or_rel(rt) for rt in rel_types.split(",") if _clean_label_or_rel(rt)]
+    return cleaned or None
 
 # ---------- Core CRUD (using raw driver) ----------
 @app.get('/characters', response_model=List[CharacterOut])
@@ -129,28 +355,23 @@ def list_characters(limit: int = 100):
     try:
         with _raw_driver.session() as s:
             result = s.run("MATCH (c:Character) RETURN c LIMIT $limit", {"limit": limit})
-            characters = []
-            for record in result:
-                node = record["c"]
-                char_data = dict(node)
-                char_data["id"] = str(node.id)
-                characters.append(char_data)
-            return characters
+            return [_character_doc(record["c"]) for record in result]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get('/characters/{char_id}', response_model=CharacterOut)
-def get_character(char_id: str):
+def get_character(char_id: str, by: str = "auto"):
+    """
+    `by`: auto|name|character_id|id|element_id (see identifiers.py). auto reads
+    an all-digit identifier as a node id. A name shared by several characters
+    resolves to the oldest one.
+    """
     try:
         with _raw_driver.session() as s:
-            result = s.run("MATCH (c:Character) WHERE c.name = $char_id OR id(c) = $char_id RETURN c", {"char_id": char_id})
-            record = result.single()
-            if not record:
+            records = _character_lookup(s, char_id, by, "RETURN c, elementId(c) AS eid")
+            if not records:
                 raise HTTPException(status_code=404, detail='Character not found')
-            node = record["c"]
-            char_data = dict(node)
-            char_data["id"] = str(node.id)
-            return char_data
+            return _character_doc(records[0]["c"])
     except HTTPException:
         raise
     except Exception as e:
@@ -159,56 +380,59 @@ def get_character(char_id: str):
 @app.post('/characters', response_model=CharacterOut, status_code=201)
 def create_character(payload: CharacterIn):
     try:
-        with _raw_driver.session() as s:
-            result = s.run(
+        with _graph_meta.write() as w:
+            result = w.run(
                 "CREATE (c:Character) SET c += $props RETURN c",
                 {"props": payload.dict()}
             )
             node = result.single()["c"]
-            char_data = dict(node)
-            char_data["id"] = str(node.id)
-            return char_data
+        char_data = _character_doc(node)
+        _centrality.apply(w.version, nodes=[(node.id, char_data.get("name"))])
+        _names.upsert(node.id, char_data.get("name"))
+        return char_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put('/characters/{char_id}', response_model=CharacterOut)
-def update_character(char_id: str, payload: CharacterIn):
+def update_character(char_id: str, payload: CharacterIn, by: str = "auto"):
+    """Updates every character with that name when `char_id` is a name; returns the oldest."""
     try:
-        with _raw_driver.session() as s:
-            result = s.run(
-                "MATCH (c:Character) WHERE c.name = $char_id OR id(c) = $char_id SET c += $props RETURN c",
-                {"char_id": char_id, "props": payload.dict()}
-            )
-            record = result.single()
-            if not record:
+        with _graph_meta.write() as w:
+            records = _character_lookup(w, char_id, by, "SET c += $props RETURN c, elementId(c) AS eid",
+                                        {"props": payload.dict()}, every=True)
+            if not records:
                 raise HTTPException(status_code=404, detail='Character not found')
-            node = record["c"]
-            char_data = dict(node)
-            char_data["id"] = str(node.id)
-            return char_data
+        nodes = sorted((record["c"] for record in records), key=lambda n: n.id)
+        _centrality.apply(w.version, nodes=[(node.id, node.get("name")) for node in nodes])
+        for node in nodes:
+            _names.upsert(node.id, node.get("name"))
+        return _character_doc(nodes[0])
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete('/characters/{char_id}', status_code=204)
-def delete_character(char_id: str):
+def delete_character(char_id: str, by: str = "auto"):
+    """Deletes every character with that name when `char_id` is a name."""
     try:
-        with _raw_driver.session() as s:
-            result = s.run(
-                "MATCH (c:Character) WHERE c.name = $char_id OR id(c) = $char_id DELETE c RETURN count(c) as deleted",
-                {"char_id": char_id}
-            )
-            deleted = result.single()["deleted"]
-            if deleted == 0:
+        with _graph_meta.write() as w:
+            records = _character_lookup(w, char_id, by, "WITH c, id(c) AS cid, elementId(c) AS eid DELETE c RETURN cid, eid",
+                                        every=True)
+            if not records:
                 raise HTTPException(status_code=404, detail='Character not found')
-            return
+        _identifiers.remember(classify(char_id, by), None)
+        _centrality.apply(w.version, removed=[record["cid"] for record in records])
+        for record in records:
+            _names.remove(record["cid"])
+        return
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get('/factions')
+@_response_cache.cached("factions")
 def list_factions():
     try:
         with _raw_driver.session() as s:
@@ -220,180 +444,372 @@ def list_factions():
 @app.post('/relationships', status_code=201)
 def create_relationship(payload: RelationshipIn):
     try:
-        with _raw_driver.session() as s:
-            result = s.run(
-                "MATCH (a:Character), (b:Character) WHERE a.name = $from_id AND b.name = $to_id CREATE (a)-[r:" + payload.rel_type.upper() + "]->(b) RETURN r",
+        with _graph_meta.write() as w:
+            result = w.run(
+                "MATCH (a:Character), (b:Character) WHERE a.name = $from_id AND b.name = $to_id CREATE (a)-[r:" + payload.rel_type.upper() + "]->(b) RETURN id(a) AS start, id(b) AS end",
                 {"from_id": payload.from_id, "to_id": payload.to_id}
             )
-            if result.single():
-                return {'status': 'created'}
-            else:
+            # Namesakes: one relationship per (a, b) pair
+            created = [(r["start"], r["end"]) for r in result]
+            if not created:
                 raise HTTPException(status_code=400, detail='Could not create relationship')
+        _centrality.apply(w.version, edges=created)
+        return {'status': 'created'}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+_CHARACTERS_BY_IDS = "MATCH (c:Character) WHERE id(c) IN $ids RETURN c"
+
+def _characters_in_order(ids: List[Any], docs: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Character documents (keyed by node id) for `ids`, in that order (ids that are gone are skipped)."""
+    return [{**docs[nid], "id": str(nid)} for nid in ids if nid in docs]
+
+def _characters_by_ids(ids: List[Any]) -> List[Dict[str, Any]]:
+    if GRAPH_BACKEND == "memory":
+        g = _snapshots.get()
+        docs = {nid: dict(g.node_props[g.index_of[nid]]) for nid in ids if nid in g.index_of}
+    else:
+        with _raw_driver.session() as s:
+            docs = {record["c"].id: dict(record["c"]) for record in s.run(_CHARACTERS_BY_IDS, {"ids": ids})}
+    return _characters_in_order(ids, docs)
+
+def _search_limit(limit: int) -> None:
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+
+def _search_ids(name: str, limit: int, fuzzy: bool) -> List[Any]:
+    # The first query (and one every SEARCH_INDEX_MAX_AGE) builds the index
+    return [h["id"] for h in _names.search(name, limit, fuzzy)]
+
 @app.get('/search')
-def search(name: str):
+def search(name: str, limit: int = 10, fuzzy: bool = True):
+    """
+    Accent-insensitive ranked name search ("Luu Bi" finds "Lưu Bị");
+    see name_search.py for the ranking.
+    """
+    _search_limit(limit)
     try:
-        with _raw_driver.session() as s:
-            result = s.run(
-                "MATCH (c:Character) WHERE c.name CONTAINS $name RETURN c LIMIT 10",
-                {"name": name}
-            )
-            characters = []
-            for record in result:
-                node = record["c"]
-                char_data = dict(node)
-                char_data["id"] = str(node.id)
-                characters.append(char_data)
-            return characters
+        return _characters_by_ids(_search_ids(name, limit, fuzzy))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get('/search/stats')
+def search_stats():
+    return _names.stats()
+
 # ---------- Advanced Graph Queries ----------
 
 # 1) Complex undirected relationship query within N hops, returning paths
+#    (Cypher takes no parameter in a variable-length bound, so the validated
+#    integer is written into the pattern)
+_COMPLEX_CYPHER = "MATCH path=(a:Character {name:$from})-[*1..%d]-(b:Character {name:$to}) RETURN path LIMIT $limit"
+
+def _complex_query(from_name: str, to_name: str, max_hops: int, limit: int) -> Tuple[str, Dict[str, Any]]:
+    if max_hops < 1:
+        raise HTTPException(status_code=400, detail="max_hops must be >= 1")
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be >= 1")
+    return _COMPLEX_CYPHER % int(max_hops), {"from": from_name, "to": to_name, "limit": limit}
+
+def _complex_path(record) -> Optional[Dict[str, Any]]:
+    return _path_record_to_graph({"path": record["path"]}) if record.get("path") is not None else None
+
+def _iter_complex_paths(cypher: str, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    with _raw_driver.session() as s:
+        for r in s.run(cypher, params):
+            path = _complex_path(r)
+            if path is not None:
+                yield path
+
 @app.get("/query/complex")
-def api_complex(from_name: str, to_name: str, max_hops: int = 4, limit: int = 50):
-    cypher = "MATCH path=(a:Character {name:$from})-[*1..$max_hops]-(b:Character {name:$to}) RETURN path LIMIT $limit"
+def api_complex(from_name: str, to_name: str, max_hops: int = 4, limit: int = 50, stream: Optional[str] = None):
+    query = _complex_query(from_name, to_name, max_hops, limit)
+    if _check_stream(stream):
+        return _ndjson_response(_iter_complex_paths(*query), "path")
     try:
-        with _raw_driver.session() as s:
-            result = s.run(cypher, {"from": from_name, "to": to_name, "max_hops": max_hops, "limit": limit})
-            paths = [_path_record_to_graph({"path": r["path"]}) for r in result if r.get("path") is not None]
+        paths = list(_iter_complex_paths(*query))
         return {"count": len(paths), "paths": paths}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# 2) Shortest path (native Cypher). If GDS is available, optional K-shortest with Yen's algorithm.
+# Yen's runs one spur search per node of every accepted path (a Cypher round trip each without GDS)
+SHORTEST_PATH_MAX_K = int(os.getenv("SHORTEST_PATH_MAX_K", "100"))
+
+def _check_shortest_args(max_len: int, direction: str, k: int = 1) -> str:
+    if max_len < 1:
+        raise HTTPException(status_code=400, detail="max_len must be >= 1")
+    if not 1 <= k <= SHORTEST_PATH_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {SHORTEST_PATH_MAX_K}")
+    d = direction.lower()
+    if d not in _DIRECTIONS:
+        raise HTTPException(status_code=400, detail="direction must be out|in|any")
+    return d
+
+# 2) Shortest path (native Cypher). K-shortest with Yen's algorithm via GDS, bounded Cypher spur queries or in-process.
 @app.get("/query/shortest_path")
-def api_shortest_path(from_name: str, to_name: str, max_len: int = 15, k: int = 1):
+def api_shortest_path(
+    from_name: str,
+    to_name: str,
+    max_len: int = 15,
+    k: int = 1,
+    direction: str = "any",
+    rel_types: Optional[str] = None,
+):
+    d = _check_shortest_args(max_len, direction, k)
     try:
-        if k <= 1:
-            # FIXED: Use literal number instead of parameter in pattern
-            cypher = "MATCH (a:Character {name:$from}), (b:Character {name:$to}) MATCH p = shortestPath((a)-[*..15]-(b)) RETURN p AS path"
-            with _raw_driver.session() as s:
-                recs = s.run(cypher, {"from": from_name, "to": to_name})
-                paths = []
-                for r in recs:
-                    p = r.get("path")
-                    if p is not None:
-                        paths.append(_path_record_to_graph({"path": p}))
-                return {"count": len(paths), "paths": paths}
-        
-        # Try GDS Yen's k-shortest if requested
-        if _supports_gds():
-            query = """
-            MATCH (source:Character {name:$from}), (target:Character {name:$to})
-            CALL gds.shortestPath.yens.stream({
-              sourceNode: id(source),
-              targetNode: id(target),
-              k: $k,
-              relationshipTypes: null,
-              nodeProjection: 'Character',
-              relationshipProjection: '*'
-            })
-            YIELD index, path
-            RETURN index, path
-            """
-            with _raw_driver.session() as s:
-                recs = s.run(query, {"from": from_name, "to": to_name, "k": k})
-                paths = [_path_record_to_graph({"path": r["path"]}) for r in recs if r.get("path")]
-                return {"count": len(paths), "paths": paths, "engine": "gds.yens"}
-        
-        # Fallback: just return single shortest via Cypher
-        return api_shortest_path(from_name, to_name, max_len, 1)
-        
+        return _backend.shortest_paths(from_name, to_name, max_len, k, d, _parse_rel_types(rel_types))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# 3) Centrality: degree (Cypher), PageRank & Betweenness (GDS if available)
+# 3) Centrality: degree (Cypher); PageRank, Betweenness, Closeness & Eigenvector
+#    via GDS when available, otherwise computed in-process (native_analytics via centrality_store)
+_GDS_CENTRALITY_PROCS = {
+    "pagerank": "gds.pageRank.stream",
+    "betweenness": "gds.betweenness.stream",
+    "closeness": "gds.closeness.stream",
+    "eigenvector": "gds.eigenvector.stream",
+}
+
+def _gds_centrality(m: str, limit: int, approx: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    algo_query = f"""
+    CALL {_GDS_CENTRALITY_PROCS[m]}($graph, $config)
+    YIELD nodeId, score
+    RETURN gds.util.asNode(nodeId).name AS name, score
+    ORDER BY score DESC LIMIT $limit
+    """
+    info: Dict[str, Any] = {}
+
+    def run(graph_name):
+        with _raw_driver.session() as s:
+            config = {}
+            if approx is not None:
+                # GDS samples source nodes the same way; size the sample against the projection
+                n = s.run("CALL gds.graph.list($graph) YIELD nodeCount RETURN nodeCount", {"graph": graph_name}).single()["nodeCount"]
+                samples = approx["samples"] or sample_size(n, approx["epsilon"], approx["delta"])
+                config = {"samplingSize": min(samples, n), "samplingSeed": approx["seed"]}
+                info.update(approx, samples=config["samplingSize"], candidates=n)
+            return [dict(r) for r in s.run(algo_query, {"graph": graph_name, "config": config, "limit": limit})]
+
+    # Projection is reused across calls until the graph version changes
+    graph_name, results = _projections.run("default", run)
+    out = {"method": m, "results": results, "engine": "gds", "graph": graph_name, "graph_version": _graph_version.current}
+    if approx is not None:
+        out["approx"] = info
+    return out
+
+def _native_centrality(m: str, limit: int) -> Dict[str, Any]:
+    # Scores are kept per snapshot; PageRank/eigenvector warm-start from the previous vector
+    return _centrality.top(m, limit)
+
 @app.get("/query/centrality")
-def api_centrality(method: str = "degree", limit: int = 20):
+@_response_cache.cached("centrality")
+def api_centrality(
+    method: str = "degree",
+    limit: int = 20,
+    engine: str = "auto",
+    approx: bool = False,
+    samples: Optional[int] = None,
+    epsilon: Optional[float] = None,
+    delta: float = 0.1,
+    seed: int = 0,
+):
+    """
+    approx=true (betweenness only) runs Brandes from a seeded random pivot
+    sample: `samples` pivots, or as many as an additive error of `epsilon`
+    (normalised, default 0.05) on every node with probability 1 - `delta`
+    needs. The answer's `approx` block carries the bound actually achieved.
+    """
     m = method.lower()
+    engine = engine.lower()
+    if engine not in ("auto", "gds", "native"):
+        raise HTTPException(status_code=400, detail="engine must be auto|gds|native")
+    if approx:
+        if m != "betweenness":
+            raise HTTPException(status_code=400, detail="approx=true is only supported for method=betweenness")
+        if samples is not None and samples < 1:
+            raise HTTPException(status_code=400, detail="samples must be >= 1")
+        if epsilon is not None and not 0 < epsilon < 1:
+            raise HTTPException(status_code=400, detail="epsilon must be between 0 and 1")
+        if not 0 < delta < 1:
+            raise HTTPException(status_code=400, detail="delta must be between 0 and 1")
     try:
-        with _raw_driver.session() as s:
-            if m == "degree":
-                cypher = "MATCH (n:Character) RETURN n.name AS name, COUNT {(n)--()} AS score ORDER BY score DESC LIMIT $limit"
-                recs = s.run(cypher, {"limit": limit})
-                return {"method": "degree", "results": [dict(r) for r in recs]}
-            elif m in ("pagerank", "betweenness") and _supports_gds():
-                # GDS 2.13.2 requires creating a named graph first
-                graph_name = f"temp_graph_{m}_{limit}"
-                
-                # Create temporary graph
-                create_graph_query = f"""
-                CALL gds.graph.project('{graph_name}', 'Character', '*')
-                YIELD graphName, nodeCount, relationshipCount
-                RETURN graphName, nodeCount, relationshipCount
-                """
-                
-                try:
-                    # Create the graph
-                    s.run(create_graph_query).consume()
-                    
-                    # Run the algorithm
-                    if m == "pagerank":
-                        algo_query = f"""
-                        CALL gds.pageRank.stream('{graph_name}')
-                        YIELD nodeId, score
-                        RETURN gds.util.asNode(nodeId).name AS name, score
-                        ORDER BY score DESC LIMIT $limit
-                        """
-                    else:  # betweenness
-                        algo_query = f"""
-                        CALL gds.betweenness.stream('{graph_name}')
-                        YIELD nodeId, score
-                        RETURN gds.util.asNode(nodeId).name AS name, score
-                        ORDER BY score DESC LIMIT $limit
-                        """
-                    
-                    recs = s.run(algo_query, {"limit": limit})
-                    results = [dict(r) for r in recs]
-                    
-                    # Clean up temporary graph
-                    s.run(f"CALL gds.graph.drop('{graph_name}')").consume()
-                    
-                    return {"method": m, "results": results, "graph": graph_name}
-                    
-                except Exception as e:
-                    # Clean up on error
-                    try:
-                        s.run(f"CALL gds.graph.drop('{graph_name}')").consume()
-                    except:
-                        pass
-                    raise e
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported method or GDS not available. Use method=degree|pagerank|betweenness.")
+        if m == "degree":
+            return _centrality.degree(limit)
+        elif m in _GDS_CENTRALITY_PROCS:
+            if engine == "gds" and not _supports_gds():
+                raise HTTPException(status_code=400, detail="GDS not available. Use engine=native or engine=auto.")
+            use_gds = engine == "gds" or (engine == "auto" and _supports_gds())
+            if approx:
+                sampling = {"samples": samples, "epsilon": epsilon if epsilon is not None else 0.05, "delta": delta, "seed": seed}
+                if use_gds:
+                    return _gds_centrality(m, limit, sampling)
+                return _centrality.sampled_betweenness(_approx_betweenness, limit, samples, sampling["epsilon"], delta, seed)
+            if not use_gds:
+                return _native_centrality(m, limit)
+            return _gds_centrality(m, limit)
+        else:
+            raise HTTPException(status_code=400, detail="Unsupported method. Use method=degree|pagerank|betweenness|closeness|eigenvector.")
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 3b) Communities: Louvain via GDS when available, otherwise in-process (communities.py)
+_GDS_LOUVAIN = """
+CALL gds.louvain.mutate($graph, {mutateProperty: $prop})
+YIELD modularity, ranLevels
+RETURN modularity, ranLevels
+"""
+_GDS_LOUVAIN_MEMBERS = """
+CALL gds.graph.nodeProperty.stream($graph, $prop)
+YIELD nodeId, propertyValue
+WITH gds.util.asNode(nodeId) AS n, propertyValue
+RETURN id(n) AS id, n.name AS name, n.faction AS faction, propertyValue AS community
+"""
+
+def _supports_gds_louvain() -> bool:
+    caps = _capabilities.get()
+    return caps.has("gds.louvain.mutate") and caps.has("gds.graph.nodeProperty.stream")
+
+def _gds_communities() -> Dict[str, Any]:
+    # mutate (into the projection only) gives the modularity of exactly the partition read back
+    prop = f"louvain_{uuid.uuid4().hex[:12]}"
+
+    def run(graph_name):
+        with _raw_driver.session() as s:
+            stats = s.run(_GDS_LOUVAIN, {"graph": graph_name, "prop": prop}).single()
+            try:
+                rows = [((r["id"], r["name"], r["faction"]), r["community"])
+                        for r in s.run(_GDS_LOUVAIN_MEMBERS, {"graph": graph_name, "prop": prop})]
+            finally:
+                s.run("CALL gds.graph.nodeProperties.drop($graph, [$prop]) YIELD graphName RETURN graphName",
+                      {"graph": graph_name, "prop": prop}).consume()
+            return stats, rows
+
+    graph_name, (stats, rows) = _projections.run("undirected", run)
+    return {"algorithm": "louvain", "engine": "gds", "graph": graph_name, "modularity": stats["modularity"],
+            "levels": stats["ranLevels"], "resolution": 1.0, "seed": None, "communities": communities.partition(rows)}
+
+@app.get("/query/communities")
+def api_communities(
+    offset: int = 0,
+    limit: int = 20,
+    min_size: int = 1,
+    member_limit: int = 200,
+    engine: str = "auto",
+    resolution: float = 1.0,
+    seed: int = 0,
+):
+    """
+    Louvain communities of the Character graph (relationships undirected),
+    largest first, paged by community. Each one lists its members and how
+    many of each faction it holds; `modularity` scores the whole partition.
+    resolution != 1 and `seed` only apply to the native engine.
+    """
+    engine = engine.lower()
+    if engine not in ("auto", "gds", "native"):
+        raise HTTPException(status_code=400, detail="engine must be auto|gds|native")
+    if offset < 0 or limit < 1 or min_size < 1 or member_limit < 0:
+        raise HTTPException(status_code=400, detail="offset must be >= 0, limit and min_size >= 1, member_limit >= 0")
+    if resolution <= 0:
+        raise HTTPException(status_code=400, detail="resolution must be > 0")
+    if engine == "gds" and not _supports_gds_louvain():
+        raise HTTPException(status_code=400, detail="GDS Louvain not available. Use engine=native or engine=auto.")
+    if engine == "gds" and resolution != 1.0:
+        raise HTTPException(status_code=400, detail="gds.louvain has no resolution parameter. Use engine=native.")
+    use_gds = engine == "gds" or (engine == "auto" and resolution == 1.0 and _supports_gds_louvain())
+    try:
+        if use_gds:
+            result, cached = _communities.get(("gds",), _gds_communities)
+        else:
+            result, cached = _communities.get(("native", resolution, seed),
+                                              lambda: communities.native_partition(_snapshots.get(), resolution, seed))
+        return {**communities.page(result, offset, limit, min_size, member_limit), "cached": cached}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/communities/stats")
+def communities_stats():
+    return _communities.stats()
+
+@app.get("/cache/stats")
+def response_cache_stats():
+    return _response_cache.stats()
+
+@app.get("/centrality/stats")
+def centrality_stats():
+    return {**_centrality.stats(), "approx_betweenness": _approx_betweenness.stats()}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint (see metrics.py for the series)."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/slow_queries")
+def slow_queries(limit: int = 50, min_ms: float = 0.0, endpoint: Optional[str] = None):
+    """Newest slow queries first; sampled ones carry a PROFILE plan (see slow_queries.py)."""
+    return {
+        **_slow_queries.stats(),
+        "queries": _slow_queries.entries(limit=max(1, min(limit, 1000)), min_ms=min_ms, endpoint=endpoint),
+    }
+
+@app.delete("/debug/slow_queries")
+def clear_slow_queries():
+    _slow_queries.clear()
+    return {"status": "cleared"}
+
+@app.get("/layout/stats")
+def layout_stats():
+    return _layouts.stats()
+
+@app.get("/gds/projections")
+def gds_projection_stats():
+    return _projections.stats()
+
+def _hop_range(hops: int, min_hops: Optional[int], max_hops: Optional[int]):
+    """
+    (min_hops, max_hops) for /query/multi_hop. `hops` alone keeps the old
+    "exactly N hops away" answer; giving either bound asks for a range,
+    with min_hops defaulting to 1 and max_hops to `hops`.
+    """
+    if min_hops is None and max_hops is None:
+        lo = hi = hops
+    else:
+        lo = 1 if min_hops is None else min_hops
+        hi = hops if max_hops is None else max_hops
+    if hi < 1:
+        raise HTTPException(status_code=400, detail="hops / max_hops must be >= 1")
+    if not 0 <= lo <= hi:
+        raise HTTPException(status_code=400, detail="min_hops must be between 0 and max_hops")
+    return lo, hi
+
 # 4) Multi-hop traversal with direction & relationship type filter
+def _hop_direction(direction: str) -> str:
+    # multi_hop has always read an unknown direction as "any"
+    d = direction.lower()
+    return d if d in _DIRECTIONS else "any"
+
 @app.get("/query/multi_hop")
 def api_multi_hop(
     name: str,
     hops: int = 2,
+    min_hops: Optional[int] = None,
+    max_hops: Optional[int] = None,
     direction: str = "any",
     rel_types: Optional[str] = None,
     limit: int = 500,
+    stream: Optional[str] = None,
 ):
-    if hops < 1:
-        raise HTTPException(status_code=400, detail="hops must be >= 1")
-    dir_map = {"out": "->", "in": "<-", "any": "-"}
-    arrow = dir_map.get(direction.lower(), "-")
-    # sanitize relationship types
-    rel_clause = ""
-    if rel_types:
-        cleaned = [_clean_label_or_rel(rt) for rt in rel_types.split(",") if _clean_label_or_rel(rt)]
-        if cleaned:
-            rel_clause = ":" + "|".join(cleaned)
-    pattern = f"-[{rel_clause}*{hops}]{arrow}"
-    cypher = f"MATCH (p:Character {{name:$name}}){pattern}(other) RETURN DISTINCT other LIMIT $limit"
+    """
+    Nodes min_hops..max_hops away (by shortest hop distance), closest first,
+    with `distances` aligned to `nodes` and the BFS tree edge into each node.
+    """
+    lo, hi = _hop_range(hops, min_hops, max_hops)
+    d = _hop_direction(direction)
+    if _check_stream(stream):
+        return _ndjson_response(_backend.iter_multi_hop(name, lo, hi, d, _parse_rel_types(rel_types), limit), "batch")
     try:
-        with _raw_driver.session() as s:
-            recs = s.run(cypher, {"name": name, "limit": limit})
-            return _records_to_nodes_edges([r.data() for r in recs])
+        return _backend.multi_hop(name, lo, hi, d, _parse_rel_types(rel_types), limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -403,86 +819,54 @@ def api_filter_relation(name: str, rel_type: str, limit: int = 500):
     cleaned = _clean_label_or_rel(rel_type)
     if not cleaned:
         raise HTTPException(status_code=400, detail="Invalid relationship type")
-    cypher = f"MATCH (p:Character {{name:$name}})-[r:{cleaned}]->(other) RETURN other, r LIMIT $limit"
     try:
-        with _raw_driver.session() as s:
-            recs = s.run(cypher, {"name": name, "limit": limit})
-            return _records_to_nodes_edges([r.data() for r in recs])
+        return _backend.filter_relation(name, cleaned, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# 6) Subgraph extraction (APOC if present, else pure Cypher)
-@app.get("/query/subgraph")
-def api_subgraph(name: str, maxDepth: int = 2):
-    # Try APOC first
-    cypher_apoc = """
-    MATCH (p:Character {name:$name})
-    CALL apoc.path.subgraphAll(p, {maxLevel:$maxDepth})
-    YIELD nodes, relationships
-    RETURN nodes, relationships
-    """
-    try:
-        with _raw_driver.session() as s:
-            recs = s.run(cypher_apoc, {"name": name, "maxDepth": maxDepth})
-            first = recs.single()
-            if first:
-                nodes = first["nodes"]
-                rels = first["relationships"]
-                nodes_map = {n.id: {"id": n.id, "labels": list(n.labels), **dict(n)} for n in nodes}
-                edges = [{"id": r.id, "type": r.type, "start": r.start_node.id, "end": r.end_node.id, "properties": dict(r)} for r in rels]
-                return {"nodes": list(nodes_map.values()), "edges": edges}
-    except Exception:
-        pass
-
-    # Fallback without APOC - FIXED CYPHER QUERY
-    if maxDepth == 0:
-        cypher = """
-        MATCH (p:Character {name:$name})
-        RETURN collect(p) AS nodes, [] AS relationships
-        """
-    elif maxDepth == 1:
-        cypher = """
-        MATCH (p:Character {name:$name})
-        OPTIONAL MATCH (p)-[r]-(x)
-        RETURN collect(p) + collect(x) AS nodes, collect(r) AS relationships
-        """
-    elif maxDepth == 2:
-        cypher = """
-        MATCH (p:Character {name:$name})
-        OPTIONAL MATCH (p)-[r1]-(x1)
-        OPTIONAL MATCH (x1)-[r2]-(x2)
-        RETURN collect(p) + collect(x1) + collect(x2) AS nodes, collect(r1) + collect(r2) AS relationships
-        """
-    else:
-        cypher = """
-        MATCH (p:Character {name:$name})
-        OPTIONAL MATCH (p)-[r1]-(x1)
-        OPTIONAL MATCH (x1)-[r2]-(x2)
-        OPTIONAL MATCH (x2)-[r3]-(x3)
-        RETURN collect(p) + collect(x1) + collect(x2) + collect(x3) AS nodes, collect(r1) + collect(r2) + collect(r3) AS relationships
-        """
+def _subgraph_args(maxDepth: int, max_nodes: Optional[int], max_edges: Optional[int], direction: str,
+                   rel_types: Optional[str]):
+    """Validated /query/subgraph arguments; budgets default to, and never exceed, the server caps."""
+    if maxDepth < 0:
+        raise HTTPException(status_code=400, detail="maxDepth must be >= 0")
+    if (max_nodes is not None and max_nodes < 1) or (max_edges is not None and max_edges < 0):
+        raise HTTPException(status_code=400, detail="max_nodes must be >= 1 and max_edges >= 0")
+    d = direction.lower()
+    if d not in _DIRECTIONS:
+        d = "any"
+    return (
+        maxDepth,
+        min(max_nodes or SUBGRAPH_MAX_NODES, SUBGRAPH_MAX_NODES),
+        min(SUBGRAPH_MAX_EDGES if max_edges is None else max_edges, SUBGRAPH_MAX_EDGES),
+        d,
+        _parse_rel_types(rel_types),
+    )
 
+# 6) Subgraph extraction (APOC if present, else a budgeted BFS in Cypher)
+@app.get("/query/subgraph")
+@_response_cache.cached("subgraph")
+def api_subgraph(
+    name: str,
+    maxDepth: int = 2,
+    max_nodes: Optional[int] = None,
+    max_edges: Optional[int] = None,
+    direction: str = "any",
+    rel_types: Optional[str] = None,
+):
+    args = _subgraph_args(maxDepth, max_nodes, max_edges, direction, rel_types)
     try:
-        with _raw_driver.session() as s:
-            recs = s.run(cypher, {"name": name})
-            first = recs.single()
-            if not first:
-                return {"nodes": [], "edges": []}
-            nodes = first["nodes"]
-            rels = first["relationships"]
-            nodes_map = {n.id: {"id": n.id, "labels": list(n.labels), **dict(n)} for n in nodes}
-            edges = [{"id": r.id, "type": r.type, "start": r.start_node.id, "end": r.end_node.id, "properties": dict(r)} for r in rels]
-            return {"nodes": list(nodes_map.values()), "edges": edges}
+        return _backend.subgraph(name, *args)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# 7) Visual graph format for frontends (nodes/edges with display labels)
+# 7) Visual graph format for frontends (nodes/edges with display labels),
+#    converted from the cached /query/subgraph entry
 @app.get("/query/visual")
-def api_visual(name: str, maxDepth: int = 2):
-    sg = api_subgraph(name, maxDepth)
-    nodes = [{"id": n["id"], "label": n.get("name") or ",".join(n.get("labels", [])), "props": {k: v for k, v in n.items() if k not in ("id", "labels")}} for n in sg.get("nodes", [])]
-    edges = [{"id": e["id"], "source": e["start"], "target": e["end"], "type": e["type"], "props": e.get("properties", {})} for e in sg.get("edges", [])]
-    return {"nodes": nodes, "edges": edges}
+def api_visual(request: Request, name: str, maxDepth: int = 2, layout: bool = False, format: Optional[str] = None):
+    graph = _visual_from_subgraph(api_subgraph(name, maxDepth))
+    if layout:
+        graph = _layouts.apply(("visual", name.strip(), maxDepth), _graph_version.current, graph)
+    return _wire_response(request, format, graph)
 
 # 8) Add a flexible relation type by names (MERGE) with optional properties
 @app.post("/query/add_relation_type")
@@ -500,11 +884,21 @@ def api_add_relation_type(payload: Dict[str, Any] = Body(...)):
         raise HTTPException(status_code=400, detail="invalid rel_type")
 
     set_fragment = _props_to_set_fragment(properties, "r")
-    cypher = f"MERGE (a:Character {{name:$from}}) MERGE (b:Character {{name:$to}}) MERGE (a)-[r:{rel}]->(b){set_fragment} RETURN a,b,r"
+    cypher = f"MERGE (a:Character {{name:$from}}) MERGE (b:Character {{name:$to}}) MERGE (a)-[r:{rel}]->(b){set_fragment} RETURN id(a) AS a, id(b) AS b"
     try:
-        with _raw_driver.session() as s:
-            _ = s.run(cypher, {"from": from_name, "to": to_name, "props": properties}).consume()
-            return {"status": "ok", "created_relation": rel, "from": from_name, "to": to_name, "properties": properties}
+        with _graph_meta.write() as w:
+            result = w.run(cypher, {"from": from_name, "to": to_name, "props": properties})
+            rec = result.single()
+            counters = result.consume().counters
+        # MERGE may have created either Character and may have matched an existing relationship
+        _centrality.apply(
+            w.version,
+            nodes=[(rec["a"], from_name), (rec["b"], to_name)],
+            edges=[(rec["a"], rec["b"])] if counters.relationships_created else [],
+        )
+        _names.upsert(rec["a"], from_name)
+        _names.upsert(rec["b"], to_name)
+        return {"status": "ok", "created_relation": rel, "from": from_name, "to": to_name, "properties": properties}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -512,12 +906,14 @@ def api_add_relation_type(payload: Dict[str, Any] = Body(...)):
 
 # A) Introspect schema: labels & relationship types
 @app.get("/schema/labels")
+@_response_cache.cached("schema.labels")
 def get_labels():
     with _raw_driver.session() as s:
-        recs = s.run("CALL db.labels() YIELD label RETURN label ORDER BY label")
+        recs = s.run("CALL db.labels() YIELD label WHERE label <> $meta RETURN label ORDER BY label", {"meta": META_LABEL})
         return [r["label"] for r in recs]
 
 @app.get("/schema/relationship_types")
+@_response_cache.cached("schema.relationship_types")
 def get_rel_types():
     with _raw_driver.session() as s:
         recs = s.run("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType ORDER BY relationshipType")
@@ -526,9 +922,11 @@ def get_rel_types():
 # B) Upsert a node with arbitrary label & properties
 @app.post("/nodes/upsert")
 def upsert_node(label: str, key: str = "name", payload: Dict[str, Any] = Body(...)):
-    safe_label = _clean_label_or_rel(label)
+    safe_label = _node_label(label)
     if not safe_label:
         raise HTTPException(status_code=400, detail="Invalid label")
+    if not _IDENTIFIER.match(key):
+        raise HTTPException(status_code=400, detail="Invalid key property")
     if key not in payload:
         raise HTTPException(status_code=400, detail=f"Missing key property '{key}' in payload")
 
@@ -536,10 +934,14 @@ def upsert_node(label: str, key: str = "name", payload: Dict[str, Any] = Body(..
     set_fragment = _props_to_set_fragment(props, "n")
     cypher = f"MERGE (n:{safe_label} {{{key}: $keyVal}}){set_fragment} RETURN id(n) AS id, labels(n) AS labels, n AS node"
     try:
-        with _raw_driver.session() as s:
-            rec = s.run(cypher, {"keyVal": props[key], "props": props}).single()
+        with _graph_meta.write() as w:
+            rec = w.run(cypher, {"keyVal": props[key], "props": props}).single()
             node = rec["node"]
-            return {"id": rec["id"], "labels": rec["labels"], **dict(node)}
+        characters = [(rec["id"], node.get("name"))] if "Character" in rec["labels"] else []
+        _centrality.apply(w.version, nodes=characters)
+        if characters:
+            _names.upsert(rec["id"], node.get("name"))
+        return {"id": rec["id"], "labels": rec["labels"], **dict(node)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -562,68 +964,304 @@ def upsert_rel(
     RETURN id(r) AS id, type(r) AS type, id(a) AS start, id(b) AS end, r AS rel
     """
     try:
-        with _raw_driver.session() as s:
-            rec = s.run(cypher, {"from_id": from_id, "to_id": to_id, "props": properties or {}}).single()
+        with _graph_meta.write() as w:
+            result = w.run(cypher, {"from_id": from_id, "to_id": to_id, "props": properties or {}})
+            rec = result.single()
             if not rec:
                 raise HTTPException(status_code=400, detail="Could not create relationship")
             rel = rec["rel"]
-            return {"id": rec["id"], "type": rec["type"], "start": rec["start"], "end": rec["end"], "properties": dict(rel)}
+            created = result.consume().counters.relationships_created
+        _centrality.apply(w.version, edges=[(rec["start"], rec["end"])] if created else [])
+        return {"id": rec["id"], "type": rec["type"], "start": rec["start"], "end": rec["end"], "properties": dict(rel)}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # D) Visual navigation: fetch neighborhood of a node (by id or name) with paging
+def _neighbor_layout_key(graph: Dict[str, Any]):
+    # A page is identified by the nodes on it, whichever way it was reached
+    return ("neighbors", tuple(n["id"] for n in graph["nodes"]))
+
+def _check_neighbors_args(node_id: Optional[int], name: Optional[str], depth: int, limit: int, cursor: Optional[str]) -> None:
+    if depth < 0:
+        raise HTTPException(status_code=400, detail="depth must be >= 0")
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be >= 1")
+    if node_id is None and not name and not cursor:
+        raise HTTPException(status_code=400, detail="Provide id or name")
+
+def _neighbors_error(e: Exception) -> HTTPException:
+    if isinstance(e, CursorExpired):
+        return HTTPException(status_code=410, detail=f"{e}; request the first page again")
+    if isinstance(e, InvalidCursor):
+        return HTTPException(status_code=400, detail=str(e))
+    return HTTPException(status_code=500, detail=str(e))
+
+def _neighbor_cursor_page(node_id: Optional[int], name: Optional[str], depth: int, limit: int,
+                          cursor: Optional[str]) -> Dict[str, Any]:
+    version = _graph_version.current
+    if cursor:
+        ids, page = _cursors.resume(cursor, version, limit)
+    else:
+        ids, page = _cursors.start(*_backend.neighbor_order(node_id, name, depth), version, limit)
+    return {**_backend.neighbor_page(ids), "page": page}
+
 @app.get("/visual/neighbors")
 def visual_neighbors(
+    request: Request,
     id: Optional[int] = None,
     name: Optional[str] = None,
     depth: int = 1,
     offset: int = 0,
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    layout: bool = False,
+    format: Optional[str] = None,
 ):
-    if depth < 0:
-        raise HTTPException(status_code=400, detail="depth must be >= 0")
-    if id is None and not name:
-        raise HTTPException(status_code=400, detail="Provide id or name")
-
-    where = "id(n) = $id" if id is not None else "n.name = $name"
-    params = {"id": id, "name": name, "offset": offset, "limit": limit, "depth": depth}
-
-    # Collect nodes within depth
-    cy_nodes = f"""
-    MATCH (n:Character) WHERE {where}
-    CALL apoc.path.subgraphNodes(n, {{maxLevel:$depth}}) YIELD node
-    RETURN node SKIP $offset LIMIT $limit
     """
-    # Fallback if APOC missing: basic neighborhood for depth 0/1
-    cy_basic = f"""
-    MATCH (n:Character) WHERE {where}
-    WITH n
-    OPTIONAL MATCH (n)-[r]-(m)
-    WITH collect(n) + collect(m) AS nodes
-    UNWIND nodes AS node
-    RETURN DISTINCT node SKIP $offset LIMIT $limit
+    First page (no cursor, offset=0): the ordered neighbourhood is built once
+    and page.next_cursor points at the next page; pass it back as ?cursor=.
+    offset > 0 without a cursor keeps the old SKIP/LIMIT paging.
     """
-
+    _check_neighbors_args(id, name, depth, limit, cursor)
     try:
-        with _raw_driver.session() as s:
-            try:
-                recs = list(s.run(cy_nodes, params))
-            except Exception:
-                recs = list(s.run(cy_basic, params))
-
-            nodes = [{"id": v["node"].id, "label": v["node"].get("name") or ",".join(list(v["node"].labels)), "props": dict(v["node"])} for v in recs if v.get("node")]
-            # fetch edges among returned nodes
-            node_ids = [n["id"] for n in nodes]
-            if node_ids:
-                rels = s.run("MATCH (a)-[r]-(b) WHERE id(a) IN $ids AND id(b) IN $ids RETURN id(r) AS id, type(r) AS type, id(a) AS start, id(b) AS end, r", {"ids": node_ids})
-                edges = [{"id": r["id"], "type": r["type"], "source": r["start"], "target": r["end"], "props": dict(r["r"])} for r in rels]
-            else:
-                edges = []
-            return {"nodes": nodes, "edges": edges, "page": {"offset": offset, "limit": limit}}
+        if cursor or offset == 0:
+            graph = _neighbor_cursor_page(id, name, depth, limit, cursor)
+        else:
+            graph = _backend.neighbors(id, name, depth, offset, limit)
+        if layout:
+            graph = _layouts.apply(_neighbor_layout_key(graph), _graph_version.current, graph)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _neighbors_error(e)
+    return _wire_response(request, format, graph)
+
+# E) Bulk create/upsert: JSON array (or {"items": [...]}) or NDJSON body,
+#    written with chunked UNWIND transactions; one status per input item
+def _parse_bulk_body(body: bytes, content_type: str) -> List[Any]:
+    if "ndjson" in (content_type or ""):
+        return [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+    data = json.loads(body or b"[]")
+    if isinstance(data, dict):
+        data = data.get("items", [])
+    if not isinstance(data, list):
+        raise ValueError("Body must be a JSON array, {\"items\": [...]} or NDJSON")
+    return data
+
+async def _bulk_items(request: Request) -> List[Any]:
+    try:
+        return _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk body: {e}")
+
+def _safe_props(props: Dict[str, Any]) -> Dict[str, Any]:
+    # Same key rule as _props_to_set_fragment
+    return {k: v for k, v in (props or {}).items() if re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", k)}
+
+class _BulkResult:
+    """Per-item statuses plus the BatchStats of every write phase."""
+
+    def __init__(self, total: int):
+        self.items: List[Dict[str, Any]] = [{"index": i, "status": "pending"} for i in range(total)]
+        self.phases = []
+
+    def invalid(self, idx: int, error: str) -> None:
+        self.items[idx] = {"index": idx, "status": "invalid", "error": error}
+
+    def write(self, cypher: str, rows: List[Dict[str, Any]], batch_size: int, name: str, ok_status: str) -> None:
+        """`cypher` must return `row.idx AS idx, <id> AS id` for every row it wrote."""
+        def on_batch(chunk, records):
+            for rec in records:
+                self.items[rec["idx"]] = {"index": rec["idx"], "status": ok_status, "id": rec["id"]}
+            for row in chunk:
+                if self.items[row["idx"]]["status"] == "pending":
+                    self.items[row["idx"]] = {"index": row["idx"], "status": "not_found"}
+
+        def on_error(chunk, exc):
+            for row in chunk:
+                self.items[row["idx"]] = {"index": row["idx"], "status": "error", "error": str(exc)}
+
+        if rows:
+            # Every committed batch bumps the stored graph version in its own transaction
+            self.phases.append(write_batches(_raw_driver, cypher, rows, batch_size, name, on_batch, on_error,
+                                             in_tx=_graph_meta.bump_in, on_commit=_graph_meta.committed))
+
+    def index_names(self, rows: List[Dict[str, Any]]) -> None:
+        """Feed the written Character rows to the /search index."""
+        for row in rows:
+            item = self.items[row["idx"]]
+            if item["status"] in ("created", "upserted") and "name" in row["props"]:
+                _names.upsert(item["id"], row["props"]["name"])
+
+    def response(self) -> Dict[str, Any]:
+        written = sum(1 for it in self.items if it["status"] in ("created", "upserted"))
+        if written:
+            _centrality.invalidate()
+        return {
+            "total": len(self.items),
+            "written": written,
+            "failed": len(self.items) - written,
+            "items": self.items,
+            "batches": [p.to_dict() for p in self.phases],
+        }
+
+def _check_batch_size(batch_size: int) -> None:
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be >= 1")
+
+@app.post("/characters/bulk")
+async def bulk_create_characters(request: Request, batch_size: int = DEFAULT_BATCH_SIZE):
+    _check_batch_size(batch_size)
+    items = await _bulk_items(request)
+    result = _BulkResult(len(items))
+    rows = []
+    for idx, item in enumerate(items):
+        try:
+            rows.append({"idx": idx, "props": CharacterIn(**item).dict()})
+        except (TypeError, ValidationError) as e:
+            result.invalid(idx, str(e))
+    cypher = "UNWIND $rows AS row CREATE (c:Character) SET c += row.props RETURN row.idx AS idx, id(c) AS id"
+    await run_in_threadpool(result.write, cypher, rows, batch_size, "characters", "created")
+    result.index_names(rows)
+    return result.response()
+
+@app.post("/relationships/bulk")
+async def bulk_create_relationships(request: Request, batch_size: int = DEFAULT_BATCH_SIZE):
+    _check_batch_size(batch_size)
+    items = await _bulk_items(request)
+    result = _BulkResult(len(items))
+    # Relationship types cannot be parameters: one UNWIND statement per type
+    by_type: Dict[str, List[Dict[str, Any]]] = {}
+    for idx, item in enumerate(items):
+        try:
+            rel = RelationshipIn(**item)
+        except (TypeError, ValidationError) as e:
+            result.invalid(idx, str(e))
+            continue
+        rel_type = _clean_label_or_rel(rel.rel_type)
+        if not rel_type:
+            result.invalid(idx, "Invalid relationship type")
+            continue
+        props = _safe_props(rel.properties)
+        if rel.since is not None:
+            props["since"] = rel.since
+        by_type.setdefault(rel_type, []).append({"idx": idx, "from": rel.from_id, "to": rel.to_id, "props": props})
+
+    def write_all():
+        for rel_type, rows in by_type.items():
+            cypher = f"""
+            UNWIND $rows AS row
+            MATCH (a:Character {{name: row.from}})
+            MATCH (b:Character {{name: row.to}})
+            CREATE (a)-[r:{rel_type}]->(b) SET r += row.props
+            RETURN row.idx AS idx, id(r) AS id
+            """
+            result.write(cypher, rows, batch_size, f"relationships:{rel_type}", "created")
+
+    await run_in_threadpool(write_all)
+    return result.response()
+
+@app.post("/nodes/upsert/bulk")
+async def bulk_upsert_nodes(request: Request, label: str, key: str = "name", batch_size: int = DEFAULT_BATCH_SIZE):
+    _check_batch_size(batch_size)
+    safe_label = _node_label(label)
+    if not safe_label:
+        raise HTTPException(status_code=400, detail="Invalid label")
+    if not _IDENTIFIER.match(key):
+        raise HTTPException(status_code=400, detail="Invalid key property")
+    items = await _bulk_items(request)
+    result = _BulkResult(len(items))
+    rows = []
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict) or item.get(key) is None:
+            result.invalid(idx, f"Missing key property '{key}'")
+            continue
+        rows.append({"idx": idx, "keyVal": item[key], "props": _safe_props(item)})
+    cypher = f"UNWIND $rows AS row MERGE (n:{safe_label} {{{key}: row.keyVal}}) SET n += row.props RETURN row.idx AS idx, id(n) AS id"
+    await run_in_threadpool(result.write, cypher, rows, batch_size, f"nodes:{safe_label}", "upserted")
+    if safe_label == "Character":
+        result.index_names(rows)
+    return result.response()
+
+# ---------- Background jobs ----------
+# Same parameters as the synchronous endpoints; the answer is 202 with the job
+# (status queued/running, or done when an identical result for the current graph exists)
+_CENTRALITY_METHODS = {"degree", "pagerank", "betweenness", "closeness", "eigenvector"}
+
+def _submit_job(kind: str, params: Dict[str, Any]):
+    job = _jobs.submit(kind, params)
+    return JSONResponse(status_code=202, content=job, headers={"Location": f"/jobs/{job['id']}"})
+
+@app.post("/jobs/centrality", status_code=202)
+def submit_centrality_job(method: str = "betweenness", limit: int = 20):
+    m = method.lower()
+    if m not in _CENTRALITY_METHODS:
+        raise HTTPException(status_code=400, detail="Unsupported method. Use method=degree|pagerank|betweenness|closeness|eigenvector.")
+    return _submit_job("centrality", {"method": m, "limit": limit})
+
+@app.post("/jobs/communities", status_code=202)
+def submit_communities_job(limit: int = 50, min_size: int = 1, resolution: float = 1.0, seed: int = 0):
+    if resolution <= 0:
+        raise HTTPException(status_code=400, detail="resolution must be > 0")
+    return _submit_job("communities", {"limit": limit, "min_size": min_size, "resolution": resolution, "seed": seed})
+
+@app.post("/jobs/paths", status_code=202)
+def submit_paths_job(
+    from_name: str,
+    to_name: str,
+    max_len: int = 15,
+    k: int = 1,
+    direction: str = "any",
+    rel_types: Optional[str] = None,
+):
+    d = _check_shortest_args(max_len, direction, k)
+    params = {"from_name": from_name, "to_name": to_name, "max_len": max_len, "k": k, "direction": d,
+              "rel_types": _parse_rel_types(rel_types)}
+    return _submit_job("paths", params)
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50, kind: Optional[str] = None):
+    return {"jobs": _jobs.list(limit, kind), "stats": _jobs.stats()}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job, result = _jobs.result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} ({job['progress']:.0%})")
+    return {"job": job, "result": result}
+
+# ---------- Capabilities ----------
+@app.get("/capabilities")
+def get_capabilities(refresh: bool = False):
+    caps = _capabilities.refresh() if refresh else _capabilities.get()
+    info = caps.to_dict()
+    info["plans"] = {
+        "subgraph": "apoc.path.subgraphAll" if caps.has("apoc.path.subgraphAll") else "cypher",
+        "visual_neighbors": "apoc.path.subgraphNodes" if caps.has("apoc.path.subgraphNodes") else "cypher",
+        "centrality": "gds" if caps.gds else "native",
+        "communities": "gds.louvain" if caps.has("gds.louvain.mutate") and caps.has("gds.graph.nodeProperty.stream") else "native louvain",
+        "k_shortest_paths": "gds.yens (direction=out) / native" if caps.has("gds.shortestPath.yens.stream") else "native",
+    }
+    info["ttl"] = _capabilities.ttl
+    info["lookup_indexes"] = {"ok": not _schema_errors, "errors": _schema_errors}
+    info["identifier_cache"] = _identifiers.stats()
+    return info
+
+@app.get("/graph/version")
+def graph_version():
+    """The version ETags and caches are keyed on (persisted on the GraphMeta node)."""
+    return _graph_meta.stats()
 
 # ---------- Health ----------
 @app.get("/health")
@@ -0,0 +1,328 @@
+"""
+Async mode of the Tam Quoc API
+Run with: python -m uvicorn main_async:app --host 0.0.0.0 --port 8000
+
+The read endpoints the frontend calls most are `async def` handlers on the
+neo4j AsyncDriver, so a request waiting on Neo4j holds an await point
+instead of a threadpool worker. Every other route (writes, GDS/native
+centrality, capabilities, ...) is the sync handler from main.py, mounted
+unchanged. The async driver is opened and closed by the app lifespan.
+"""
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from neo4j import AsyncGraphDatabase
+
+import main
+import metrics
+from main import (
+    CharacterOut,
+    _CHARACTERS_BY_IDS,
+    _character_doc,
+    _characters_in_order,
+    _check_neighbors_args,
+    _check_shortest_args,
+    _check_stream,
+    _complex_path,
+    _complex_query,
+    _hop_direction,
+    _hop_range,
+    _clean_label_or_rel,
+    _cursors,
+    _graph_version,
+    _identifiers,
+    _layouts,
+    _ndjson,
+    _ndjson_response,
+    _neighbor_layout_key,
+    _neighbors_error,
+    _parse_rel_types,
+    _response_cache,
+    _search_ids,
+    _search_limit,
+    _subgraph_args,
+    _visual_from_subgraph,
+    _wire_response,
+)
+from etag import ETagMiddleware
+from graph_meta import META_LABEL
+from graph_backend import AsyncNeo4jBackend, Neo4jBackend, ThreadedBackend
+
+# Set by the lifespan
+_adriver = None
+_abackend = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _adriver, _abackend
+    _adriver = metrics.instrument_driver(
+        AsyncGraphDatabase.driver(main._RAW_NEO4J_URI, auth=(main._RAW_NEO4J_USER, main._RAW_NEO4J_PASSWORD)),
+        main._INSTRUMENT_DRIVERS,
+    )
+    if isinstance(main._backend, Neo4jBackend):
+        _abackend = AsyncNeo4jBackend(_adriver, main._backend)
+    else:
+        # GRAPH_BACKEND=memory: CPU-bound lookups on the snapshot, kept off the event loop
+        _abackend = ThreadedBackend(main._backend)
+    await run_in_threadpool(main._probe_capabilities)
+    try:
+        yield
+    finally:
+        await _adriver.close()
+        await run_in_threadpool(main._shutdown_all)
+
+app = FastAPI(
+    title="Tam Quoc API — Graph Suite (async)",
+    lifespan=lifespan,
+    default_response_class=metrics.TimedJSONResponse if main.METRICS_ENABLED else JSONResponse,
+)
+
+if main.ETAG_ENABLED:
+    app.add_middleware(ETagMiddleware, version=lambda: _graph_version.current, prefixes=main.ETAG_PREFIXES,
+                       exclude_paths=main.ETAG_EXCLUDE_PATHS)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+if main.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# ---------- Helpers ----------
+async def _read(cypher: str, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+    async with _adriver.session() as s:
+        result = await s.run(cypher, params or {})
+        return [r async for r in result]
+
+def _ndjson_async_response(items: AsyncIterator[Dict[str, Any]], kind: str) -> StreamingResponse:
+    """Async counterpart of main._ndjson_response (same line format)."""
+    async def body():
+        count = 0
+        try:
+            async for item in items:
+                count += 1
+                yield _ndjson({"type": kind, **item})
+            yield _ndjson({"type": "end", "count": count})
+        except Exception as e:
+            yield _ndjson({"type": "error", "detail": str(e), "count": count})
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+# ---------- Core reads ----------
+@app.get('/characters', response_model=List[CharacterOut])
+async def list_characters(limit: int = 100):
+    try:
+        recs = await _read("MATCH (c:Character) RETURN c LIMIT $limit", {"limit": limit})
+        return [_character_doc(r["c"]) for r in recs]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/characters/{char_id}', response_model=CharacterOut)
+async def get_character(char_id: str, by: str = "auto"):
+    try:
+        async with _adriver.session() as s:
+            records = await _identifiers.run_async(s, char_id, by, "RETURN c, elementId(c) AS eid")
+        if not records:
+            raise HTTPException(status_code=404, detail='Character not found')
+        return _character_doc(records[0]["c"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/factions')
+@_response_cache.cached("factions")
+async def list_factions():
+    try:
+        recs = await _read("MATCH (c:Character) RETURN DISTINCT c.faction as faction")
+        return [r["faction"] for r in recs if r["faction"]]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/search')
+async def search(name: str, limit: int = 10, fuzzy: bool = True):
+    _search_limit(limit)
+    try:
+        ids = await run_in_threadpool(_search_ids, name, limit, fuzzy)
+        if main.GRAPH_BACKEND == "memory":
+            return await run_in_threadpool(main._characters_by_ids, ids)
+        recs = await _read(_CHARACTERS_BY_IDS, {"ids": ids})
+        return _characters_in_order(ids, {r["c"].id: dict(r["c"]) for r in recs})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ---------- Advanced Graph Queries ----------
+async def _iter_complex_paths(cypher: str, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    async with _adriver.session() as s:
+        result = await s.run(cypher, params)
+        async for r in result:
+            path = _complex_path(r)
+            if path is not None:
+                yield path
+
+@app.get("/query/complex")
+async def api_complex(from_name: str, to_name: str, max_hops: int = 4, limit: int = 50, stream: Optional[str] = None):
+    query = _complex_query(from_name, to_name, max_hops, limit)
+    if _check_stream(stream):
+        return _ndjson_async_response(_iter_complex_paths(*query), "path")
+    try:
+        paths = [p async for p in _iter_complex_paths(*query)]
+        return {"count": len(paths), "paths": paths}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/query/shortest_path")
+async def api_shortest_path(
+    from_name: str,
+    to_name: str,
+    max_len: int = 15,
+    k: int = 1,
+    direction: str = "any",
+    rel_types: Optional[str] = None,
+):
+    d = _check_shortest_args(max_len, direction, k)
+    try:
+        return await _abackend.shortest_paths(from_name, to_name, max_len, k, d, _parse_rel_types(rel_types))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/query/centrality")
+@_response_cache.cached("centrality")
+async def api_centrality(
+    method: str = "degree",
+    limit: int = 20,
+    engine: str = "auto",
+    approx: bool = False,
+    samples: Optional[int] = None,
+    epsilon: Optional[float] = None,
+    delta: float = 0.1,
+    seed: int = 0,
+):
+    # Degree counters, GDS projections and the native engine are synchronous (centrality_store.py)
+    return await run_in_threadpool(main.api_centrality.__wrapped__, method, limit, engine, approx, samples, epsilon, delta, seed)
+
+@app.get("/query/multi_hop")
+async def api_multi_hop(
+    name: str,
+    hops: int = 2,
+    min_hops: Optional[int] = None,
+    max_hops: Optional[int] = None,
+    direction: str = "any",
+    rel_types: Optional[str] = None,
+    limit: int = 500,
+    stream: Optional[str] = None,
+):
+    lo, hi = _hop_range(hops, min_hops, max_hops)
+    d = _hop_direction(direction)
+    if _check_stream(stream):
+        items = _abackend.iter_multi_hop(name, lo, hi, d, _parse_rel_types(rel_types), limit)
+        if isinstance(_abackend, ThreadedBackend):
+            return _ndjson_response(items, "batch")
+        return _ndjson_async_response(items, "batch")
+    try:
+        return await _abackend.multi_hop(name, lo, hi, d, _parse_rel_types(rel_types), limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/query/filter_relation")
+async def api_filter_relation(name: str, rel_type: str, limit: int = 500):
+    cleaned = _clean_label_or_rel(rel_type)
+    if not cleaned:
+        raise HTTPException(status_code=400, detail="Invalid relationship type")
+    try:
+        return await _abackend.filter_relation(name, cleaned, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/query/subgraph")
+@_response_cache.cached("subgraph")
+async def api_subgraph(
+    name: str,
+    maxDepth: int = 2,
+    max_nodes: Optional[int] = None,
+    max_edges: Optional[int] = None,
+    direction: str = "any",
+    rel_types: Optional[str] = None,
+):
+    args = _subgraph_args(maxDepth, max_nodes, max_edges, direction, rel_types)
+    try:
+        return await _abackend.subgraph(name, *args)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/query/visual")
+async def api_visual(request: Request, name: str, maxDepth: int = 2, layout: bool = False, format: Optional[str] = None):
+    graph = _visual_from_subgraph(await api_subgraph(name, maxDepth))
+    if layout:
+        # CPU-bound NumPy work, off the event loop
+        graph = await run_in_threadpool(_layouts.apply, ("visual", name.strip(), maxDepth), _graph_version.current, graph)
+    return _wire_response(request, format, graph)
+
+async def _neighbor_cursor_page(node_id: Optional[int], name: Optional[str], depth: int, limit: int,
+                                cursor: Optional[str]) -> Dict[str, Any]:
+    version = _graph_version.current
+    if cursor:
+        ids, page = _cursors.resume(cursor, version, limit)
+    else:
+        ids, page = _cursors.start(*await _abackend.neighbor_order(node_id, name, depth), version, limit)
+    return {**await _abackend.neighbor_page(ids), "page": page}
+
+@app.get("/visual/neighbors")
+async def visual_neighbors(
+    request: Request,
+    id: Optional[int] = None,
+    name: Optional[str] = None,
+    depth: int = 1,
+    offset: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    layout: bool = False,
+    format: Optional[str] = None,
+):
+    _check_neighbors_args(id, name, depth, limit, cursor)
+    try:
+        if cursor or offset == 0:
+            graph = await _neighbor_cursor_page(id, name, depth, limit, cursor)
+        else:
+            graph = await _abackend.neighbors(id, name, depth, offset, limit)
+        if layout:
+            graph = await run_in_threadpool(_layouts.apply, _neighbor_layout_key(graph), _graph_version.current, graph)
+    except Exception as e:
+        raise _neighbors_error(e)
+    return _wire_response(request, format, graph)
+
+# ---------- Schema & health ----------
+@app.get("/schema/labels")
+@_response_cache.cached("schema.labels")
+async def get_labels():
+    recs = await _read("CALL db.labels() YIELD label WHERE label <> $meta RETURN label ORDER BY label", {"meta": META_LABEL})
+    return [r["label"] for r in recs]
+
+@app.get("/schema/relationship_types")
+@_response_cache.cached("schema.relationship_types")
+async def get_rel_types():
+    recs = await _read("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType ORDER BY relationshipType")
+    return [r["relationshipType"] for r in recs]
+
+@app.get("/health")
+async def health():
+    try:
+        await _read("RETURN 1 AS ok")
+        return {"status": "ok", "mode": "async"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ---------- Remaining routes from main.py (sync, threadpool) ----------
+_async_routes = {(r.path, m) for r in app.routes if isinstance(r, APIRoute) for m in r.methods}
+for _route in main.app.routes:
+    if isinstance(_route, APIRoute) and not any((_route.path, m) in _async_routes for m in _route.methods):
+        app.router.routes.append(_route)
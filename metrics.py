@@ -0,0 +1,424 @@
+"""
+Per-endpoint, per-phase instrumentation exported at GET /metrics
+(Prometheus text format 0.0.4).
+
+Where a request spends its time:
+- MetricsMiddleware (pure ASGI) times the whole request and counts the
+  response bytes, labelled by route template (/query/subgraph, not the
+  concrete URL)
+- instrument_driver() wraps a neo4j Driver/AsyncDriver: every query
+  records the time blocked in the driver (run + fetching records), the
+  server's result_available_after / result_consumed_after from the
+  result summary, and the row count
+- add_query_listener(fn) gets fn(endpoint, query, params, seconds, rows,
+  summary) after every query (slow_queries.SlowQueryLog uses it)
+- phase("convert"), @timed("convert") and TimedJSONResponse (FastAPI's
+  default_response_class) time record conversion and JSON rendering
+
+Phase times accumulate on a per-request object held in a ContextVar, so
+they also reach sync handlers running in the threadpool; when the request
+ends, each phase is observed once, and "other" gets what no phase
+claimed (validation, handler logic, jsonable_encoder). Everything is a
+few perf_counter() calls and dict updates per query or request.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from neo4j import AsyncDriver
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            sep = "," if base else ""
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound:g}"}} {cumulative:g}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {cumulative:g}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative:g}")
+        return lines
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+REQUEST_SECONDS = Histogram(
+    "tamquoc_http_request_duration_seconds", "Wall time per request", ("endpoint", "method", "status"), LATENCY_BUCKETS)
+RESPONSE_BYTES = Histogram(
+    "tamquoc_http_response_bytes", "Response body size", ("endpoint",), BYTES_BUCKETS)
+PHASE_SECONDS = Histogram(
+    "tamquoc_phase_seconds", "Time per request phase (neo4j_driver, convert, serialize, encode, other)",
+    ("endpoint", "phase"), LATENCY_BUCKETS)
+NEO4J_QUERY_SECONDS = Histogram(
+    "tamquoc_neo4j_query_seconds", "Client-side time blocked in the driver per query", ("endpoint",), LATENCY_BUCKETS)
+NEO4J_AVAILABLE_AFTER = Histogram(
+    "tamquoc_neo4j_result_available_after_seconds", "Server time until the first record was available",
+    ("endpoint",), LATENCY_BUCKETS)
+NEO4J_CONSUMED_AFTER = Histogram(
+    "tamquoc_neo4j_result_consumed_after_seconds", "Server time to stream the result after it was available",
+    ("endpoint",), LATENCY_BUCKETS)
+NEO4J_ROWS = Histogram(
+    "tamquoc_neo4j_rows", "Records returned per query", ("endpoint",), ROWS_BUCKETS)
+
+HISTOGRAMS = (REQUEST_SECONDS, RESPONSE_BYTES, PHASE_SECONDS, NEO4J_QUERY_SECONDS,
+              NEO4J_AVAILABLE_AFTER, NEO4J_CONSUMED_AFTER, NEO4J_ROWS)
+
+def render() -> str:
+    lines: List[str] = []
+    for h in HISTOGRAMS:
+        lines.extend(h.render())
+    return "\n".join(lines) + "\n"
+
+# ---------- Per-request phase accounting ----------
+class RequestMetrics:
+    __slots__ = ("scope", "phases")
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.phases: Dict[str, float] = {}
+
+    @property
+    def endpoint(self) -> str:
+        # The router stores the matched route in the (shared) scope before calling the handler
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+    def add(self, phase_name: str, seconds: float) -> None:
+        self.phases[phase_name] = self.phases.get(phase_name, 0.0) + seconds
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("tamquoc_request_metrics", default=None)
+
+def _endpoint() -> str:
+    req = _current.get()
+    return req.endpoint if req is not None else "-"
+
+def add_phase(phase_name: str, seconds: float) -> None:
+    req = _current.get()
+    if req is not None:
+        req.add(phase_name, seconds)
+
+@contextmanager
+def phase(phase_name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(phase_name, time.perf_counter() - started)
+
+def timed(phase_name: str):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                add_phase(phase_name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose json.dumps counts as the "serialize" phase."""
+
+    def render(self, content: Any) -> bytes:
+        with phase("serialize"):
+            return super().render(content)
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        req = RequestMetrics(scope)
+        token = _current.set(req)
+        status = "500"
+        size = 0
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            endpoint = req.endpoint
+            REQUEST_SECONDS.observe(elapsed, endpoint, scope.get("method", ""), status)
+            RESPONSE_BYTES.observe(size, endpoint)
+            claimed = 0.0
+            for name, seconds in req.phases.items():
+                PHASE_SECONDS.observe(seconds, endpoint, name)
+                claimed += seconds
+            PHASE_SECONDS.observe(max(0.0, elapsed - claimed), endpoint, "other")
+            _current.reset(token)
+
+# ---------- Driver wrapper ----------
+_query_listeners: List[Callable[..., None]] = []
+
+def add_query_listener(fn: Callable[..., None]) -> None:
+    """fn(endpoint, query, params, seconds, rows, summary), called after each query completes."""
+    _query_listeners.append(fn)
+
+def _query_text(query) -> str:
+    # session.run() also takes neo4j.Query objects
+    return getattr(query, "text", query)
+
+def _record_query(driver_seconds: float, rows: int, summary, query=None, params=None) -> None:
+    endpoint = _endpoint()
+    add_phase("neo4j_driver", driver_seconds)
+    NEO4J_QUERY_SECONDS.observe(driver_seconds, endpoint)
+    NEO4J_ROWS.observe(rows, endpoint)
+    if summary is not None:
+        if summary.result_available_after is not None:
+            NEO4J_AVAILABLE_AFTER.observe(summary.result_available_after / 1000.0, endpoint)
+        if summary.result_consumed_after is not None:
+            NEO4J_CONSUMED_AFTER.observe(summary.result_consumed_after / 1000.0, endpoint)
+    for fn in _query_listeners:
+        try:
+            fn(endpoint, _query_text(query), params, driver_seconds, rows, summary)
+        except Exception:
+            pass
+
+class _Proxy:
+    def __init__(self, inner):
+        self._inner = inner
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+class _Result(_Proxy):
+    """Counts the time spent inside the driver while the caller iterates."""
+
+    def __init__(self, inner, run_seconds: float, query=None, params=None):
+        super().__init__(inner)
+        self._query = query
+        self._params = params
+        self._seconds = run_seconds
+        self._rows = 0
+        self._done = False
+        self._records = None
+
+    def _finish(self, summary=None) -> None:
+        if self._done:
+            return
+        self._done = True
+        if summary is None:
+            try:
+                summary = self._inner.consume()
+            except Exception:
+                summary = None
+        _record_query(self._seconds, self._rows, summary, self._query, self._params)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            if self._records is None:
+                self._records = iter(self._inner)
+            record = next(self._records)
+        except StopIteration:
+            self._seconds += time.perf_counter() - started
+            self._finish()
+            raise
+        self._seconds += time.perf_counter() - started
+        self._rows += 1
+        return record
+
+    def _timed(self, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def single(self, *args, **kwargs):
+        record = self._timed(self._inner.single, *args, **kwargs)
+        self._rows += record is not None
+        self._finish()
+        return record
+
+    def data(self, *args, **kwargs):
+        rows = self._timed(self._inner.data, *args, **kwargs)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def consume(self):
+        summary = self._timed(self._inner.consume)
+        self._finish(summary)
+        return summary
+
+class _Runner(_Proxy):
+    """Session or transaction: run() returns an instrumented result."""
+
+    def run(self, query, parameters=None, **kwargs):
+        started = time.perf_counter()
+        result = self._inner.run(query, parameters, **kwargs)
+        return _Result(result, time.perf_counter() - started, query, {**(parameters or {}), **kwargs})
+
+class _Session(_Runner):
+    def __enter__(self):
+        self._inner.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._inner.__exit__(*exc)
+
+    def _managed(self, method, fn, *args, **kwargs):
+        return method(lambda tx, *a, **kw: fn(_Runner(tx), *a, **kw), *args, **kwargs)
+
+    def execute_read(self, fn, *args, **kwargs):
+        return self._managed(self._inner.execute_read, fn, *args, **kwargs)
+
+    def execute_write(self, fn, *args, **kwargs):
+        return self._managed(self._inner.execute_write, fn, *args, **kwargs)
+
+    def begin_transaction(self, *args, **kwargs):
+        return _Transaction(self._inner.begin_transaction(*args, **kwargs))
+
+class _Transaction(_Runner):
+    def __enter__(self):
+        self._inner.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._inner.__exit__(*exc)
+
+class InstrumentedDriver(_Proxy):
+    def session(self, *args, **kwargs):
+        return _Session(self._inner.session(*args, **kwargs))
+
+class _AsyncResult(_Proxy):
+    def __init__(self, inner, run_seconds: float, query=None, params=None):
+        super().__init__(inner)
+        self._query = query
+        self._params = params
+        self._seconds = run_seconds
+        self._rows = 0
+        self._done = False
+        self._records = None
+
+    async def _finish(self, summary=None) -> None:
+        if self._done:
+            return
+        self._done = True
+        if summary is None:
+            try:
+                summary = await self._inner.consume()
+            except Exception:
+                summary = None
+        _record_query(self._seconds, self._rows, summary, self._query, self._params)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        started = time.perf_counter()
+        try:
+            if self._records is None:
+                self._records = self._inner.__aiter__()
+            record = await self._records.__anext__()
+        except StopAsyncIteration:
+            self._seconds += time.perf_counter() - started
+            await self._finish()
+            raise
+        self._seconds += time.perf_counter() - started
+        self._rows += 1
+        return record
+
+    async def single(self, *args, **kwargs):
+        started = time.perf_counter()
+        record = await self._inner.single(*args, **kwargs)
+        self._seconds += time.perf_counter() - started
+        self._rows += record is not None
+        await self._finish()
+        return record
+
+    async def data(self, *args, **kwargs):
+        started = time.perf_counter()
+        rows = await self._inner.data(*args, **kwargs)
+        self._seconds += time.perf_counter() - started
+        self._rows += len(rows)
+        await self._finish()
+        return rows
+
+    async def consume(self):
+        started = time.perf_counter()
+        summary = await self._inner.consume()
+        self._seconds += time.perf_counter() - started
+        await self._finish(summary)
+        return summary
+
+class _AsyncRunner(_Proxy):
+    async def run(self, query, parameters=None, **kwargs):
+        started = time.perf_counter()
+        result = await self._inner.run(query, parameters, **kwargs)
+        return _AsyncResult(result, time.perf_counter() - started, query, {**(parameters or {}), **kwargs})
+
+class _AsyncSession(_AsyncRunner):
+    async def __aenter__(self):
+        await self._inner.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._inner.__aexit__(*exc)
+
+    async def execute_read(self, fn, *args, **kwargs):
+        return await self._inner.execute_read(lambda tx, *a, **kw: fn(_AsyncRunner(tx), *a, **kw), *args, **kwargs)
+
+    async def execute_write(self, fn, *args, **kwargs):
+        return await self._inner.execute_write(lambda tx, *a, **kw: fn(_AsyncRunner(tx), *a, **kw), *args, **kwargs)
+
+class InstrumentedAsyncDriver(_Proxy):
+    def session(self, *args, **kwargs):
+        return _AsyncSession(self._inner.session(*args, **kwargs))
+
+def instrument_driver(driver, enabled: bool = True):
+    """Wrap a neo4j Driver or AsyncDriver (returned unchanged when disabled)."""
+    if not enabled:
+        return driver
+    if isinstance(driver, AsyncDriver):
+        return InstrumentedAsyncDriver(driver)
+    return InstrumentedDriver(driver)
@@ -0,0 +1,250 @@
+"""
+In-process name search for /search.
+
+Every character name is folded (NFD, combining marks dropped, đ -> d,
+lower case, punctuation -> space), so "Luu Bi", "lưu bị" and "LƯU BỊ"
+all match "Lưu Bị". NameIndex keeps an inverted index over the folded
+names:
+
+- trigrams of "  <name> " (pg_trgm-style padding) for substring and
+  fuzzy lookups
+- the first one and two letters of every word, for 1-2 letter queries
+
+Exact and prefix matches come from a sorted list of the distinct folded
+names (a bisect range); the other tiers only touch the posting lists of
+the query's own grams, and every tier stops after a fixed number of
+names, so query cost does not grow with the number of characters. Results are ranked exact > prefix > word prefix >
+every query word starts a name word > substring > fuzzy (trigram
+similarity), then by similarity and length.
+
+The index is built lazily by `loader` (an iterable of (id, name)) and
+kept current by the write endpoints through upsert()/remove(); it is
+rebuilt from scratch when it is older than `max_age` seconds, to pick up
+writes made outside the API (e.g. full_data_loader.py).
+"""
+import bisect
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Fuzzy matches below this trigram similarity are dropped
+MIN_SIMILARITY = 0.3
+# Candidates looked at per requested result, in each match tier
+CANDIDATES_PER_RESULT = 20
+# Trigrams on more than this share of all names are skipped when collecting fuzzy candidates
+COMMON_GRAM_SHARE = 0.05
+
+_MATCH_RANK = {"exact": 0, "prefix": 1, "word_prefix": 2, "words": 3, "substring": 4, "fuzzy": 5}
+
+_FOLD_EXTRA = {"đ": "d", "Đ": "d"}
+
+def fold(text: str) -> str:
+    """Accent-, case- and punctuation-insensitive form of a name."""
+    decomposed = unicodedata.normalize("NFD", "".join(_FOLD_EXTRA.get(ch, ch) for ch in text))
+    out = []
+    for ch in decomposed:
+        if unicodedata.category(ch) == "Mn":
+            continue
+        out.append(ch.lower() if ch.isalnum() else " ")
+    return " ".join("".join(out).split())
+
+def _trigrams(folded: str) -> Set[str]:
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _word_prefixes(folded: str) -> Set[str]:
+    # " t" / " ta": word starts (the two-letter form is the same key as the padded word-start trigram)
+    return {" " + w[:k] for w in folded.split() for k in (1, 2)}
+
+def _grams(folded: str) -> Set[str]:
+    return _trigrams(folded) | _word_prefixes(folded)
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+class NameIndex:
+    def __init__(self, loader: Callable[[], Iterable[Tuple[Any, str]]], max_age: float = 600.0):
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._names: Dict[Any, Tuple[str, str]] = {}  # id -> (name, folded)
+        # Grams point at distinct folded names; namesakes share one entry
+        self._ids: Dict[str, Set[Any]] = {}  # folded -> ids
+        self._postings: Dict[str, Set[str]] = {}  # gram -> folded names
+        self._sorted: List[str] = []  # distinct folded names, for prefix ranges
+        self._built_at: Optional[float] = None
+        self.builds = 0
+        self.queries = 0
+        self.last_build_seconds = 0.0
+
+    # ---------- Maintenance ----------
+    def _add(self, node_id: Any, name: str, keep_sorted: bool = True) -> None:
+        folded = fold(name)
+        self._names[node_id] = (name, folded)
+        ids = self._ids.get(folded)
+        if ids is None:
+            ids = self._ids[folded] = set()
+            for g in _grams(folded):
+                self._postings.setdefault(g, set()).add(folded)
+            if keep_sorted:
+                bisect.insort(self._sorted, folded)
+        ids.add(node_id)
+
+    def _discard(self, node_id: Any) -> None:
+        old = self._names.pop(node_id, None)
+        if old is None:
+            return
+        folded = old[1]
+        ids = self._ids[folded]
+        ids.discard(node_id)
+        if ids:
+            return
+        del self._ids[folded]
+        del self._sorted[bisect.bisect_left(self._sorted, folded)]
+        for g in _grams(folded):
+            names = self._postings.get(g)
+            if names is not None:
+                names.discard(folded)
+                if not names:
+                    del self._postings[g]
+
+    def rebuild(self) -> None:
+        started = time.perf_counter()
+        rows = list(self._loader())
+        with self._lock:
+            self._names, self._ids, self._postings = {}, {}, {}
+            for node_id, name in rows:
+                if isinstance(name, str) and name:
+                    self._add(node_id, name, keep_sorted=False)
+            self._sorted = sorted(self._ids)
+            self._built_at = time.time()
+            self.builds += 1
+            self.last_build_seconds = time.perf_counter() - started
+
+    def _ensure_built(self) -> None:
+        built_at = self._built_at
+        if built_at is None or (self.max_age > 0 and time.time() - built_at > self.max_age):
+            self.rebuild()
+
+    def upsert(self, node_id: Any, name: Optional[str]) -> None:
+        """Index (or re-index) one character after a write; no-op before the first build."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._discard(node_id)
+            if isinstance(name, str) and name:
+                self._add(node_id, name)
+
+    def remove(self, node_id: Any) -> None:
+        with self._lock:
+            self._discard(node_id)
+
+    # ---------- Queries ----------
+    def _candidates(self, grams: Iterable[str]) -> Set[str]:
+        lists = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        if not lists or not lists[0]:
+            return set()
+        out = set(lists[0])
+        for names in lists[1:]:
+            out &= names
+            if not out:
+                break
+        return out
+
+    @staticmethod
+    def _query_grams(q: str) -> Set[str]:
+        if len(q) <= 2:
+            return {" " + q}
+        return {q[i:i + 3] for i in range(len(q) - 2)}
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """Ranked [{id, name, score, match}] for a free-text query."""
+        q = fold(query)
+        if not q or limit < 1:
+            return []
+        self._ensure_built()
+        # Every tier stops after `budget` names, so a query that matches half
+        # the graph costs the same as one that matches a few names
+        budget = limit * CANDIDATES_PER_RESULT
+        with self._lock:
+            self.queries += 1
+            hits: Dict[str, str] = {}  # folded name -> match tier
+            # exact / prefix: a contiguous range of the sorted names (shortest first within a stem)
+            i = bisect.bisect_left(self._sorted, q)
+            while i < len(self._sorted) and len(hits) < budget and self._sorted[i].startswith(q):
+                hits[self._sorted[i]] = "exact" if self._sorted[i] == q else "prefix"
+                i += 1
+            if len(hits) < limit:
+                found = 0
+                for folded in self._candidates(self._query_grams(q)):
+                    if found >= budget:
+                        break
+                    if folded in hits:
+                        continue
+                    if f" {q}" in f" {folded}":
+                        hits[folded] = "word_prefix"
+                    elif len(q) > 2 and q in folded:
+                        hits[folded] = "substring"
+                    else:
+                        continue
+                    found += 1
+            words = q.split()
+            if len(hits) < limit and len(words) > 1:
+                # "thuc 99" -> "Thục Hán #99": each word of the query starts some word of the name
+                names = None
+                for w in words:
+                    found_names = self._candidates(self._query_grams(w) | {" " + w[:2]})
+                    names = found_names if names is None else names & found_names
+                found = 0
+                for folded in names or ():
+                    if found >= budget:
+                        break
+                    if folded not in hits:
+                        name_words = folded.split()
+                        if all(any(nw.startswith(w) for nw in name_words) for w in words):
+                            hits[folded] = "words"
+                            found += 1
+            if fuzzy and len(hits) < limit and len(q) > 2:
+                # Names sharing the most trigrams with the query, then scored exactly
+                lists = sorted((self._postings.get(g, set()) for g in _trigrams(q)), key=len)
+                common = max(budget, int(len(self._ids) * COMMON_GRAM_SHARE))
+                shared = Counter()
+                for names in lists:
+                    if len(names) > common and shared:
+                        break
+                    shared.update(names)
+                for folded, _ in shared.most_common(budget):
+                    hits.setdefault(folded, "fuzzy")
+            q_grams = _trigrams(q)
+            ranked = []
+            for folded, match in hits.items():
+                score = similarity(q_grams, _trigrams(folded))
+                if match == "fuzzy" and score < MIN_SIMILARITY:
+                    continue
+                ranked.append((_MATCH_RANK[match], -score, len(folded), folded, match))
+            ranked.sort()
+            out = []
+            for _, neg_score, _, folded, match in ranked:
+                for node_id in sorted(self._ids[folded], key=lambda i: (self._names[i][0], str(i))):
+                    out.append({"id": node_id, "name": self._names[node_id][0], "score": round(-neg_score, 4), "match": match})
+                if len(out) >= limit:
+                    break
+        return out[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "names": len(self._names),
+                "distinct_names": len(self._ids),
+                "grams": len(self._postings),
+                "built_at": self._built_at,
+                "builds": self.builds,
+                "last_build_seconds": round(self.last_build_seconds, 4),
+                "queries": self.queries,
+                "max_age": self.max_age,
+            }
@@ -0,0 +1,277 @@
+"""
+In-process centrality over a CSRGraph snapshot (NumPy / SciPy sparse).
+
+Used by /query/centrality when GDS is not installed. Defaults follow the
+GDS procedures run against the 'Character', '*' projection (natural,
+i.e. directed, orientation; parallel relationships count separately), so
+scores line up with gds.*.stream within GDS_TOLERANCE:
+
+- pagerank:    gds.pageRank    (damping 0.85, 20 iterations, tol 1e-7, unnormalised)
+- betweenness: gds.betweenness (Brandes, unnormalised, directed)
+- closeness:   gds.closeness   (reachable / sum of distances, outgoing BFS)
+- eigenvector: gds.eigenvector (power iteration, L2-normalised, 20 iterations)
+- louvain:     gds.louvain     (undirected, relationship multiplicity as weight)
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from graph_backend import CSRGraph
+
+GDS_TOLERANCE = 1e-6
+
+METHODS = ("pagerank", "betweenness", "closeness", "eigenvector")
+
+def adjacency(g: CSRGraph, node_mask: Optional[np.ndarray] = None, undirected: bool = False) -> sp.csr_matrix:
+    """n x n sparse matrix with A[u, v] = number of u->v relationships."""
+    src, dst = g.edge_src, g.edge_dst
+    if node_mask is not None:
+        keep = node_mask[src] & node_mask[dst]
+        src, dst = src[keep], dst[keep]
+    if undirected:
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+    data = np.ones(len(src), dtype=np.float64)
+    # Duplicate (u, v) entries are summed, which keeps multigraph semantics
+    return sp.csr_matrix((data, (src, dst)), shape=(g.n, g.n))
+
+def pagerank(A: sp.csr_matrix, damping: float = 0.85, max_iter: int = 20, tol: float = 1e-7) -> np.ndarray:
+    return power_pagerank(A, damping, max_iter, tol)[0]
+
+def power_pagerank(A: sp.csr_matrix, damping: float = 0.85, max_iter: int = 20, tol: float = 1e-7,
+                   start: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+    """
+    PageRank power iteration from `start` (1 - damping everywhere when None)
+    -> (scores, iterations run). A previous score vector as `start` converges
+    in a few iterations after a small change to the graph.
+    """
+    n = A.shape[0]
+    out_deg = np.asarray(A.sum(axis=1)).ravel()
+    inv_deg = np.divide(1.0, out_deg, out=np.zeros(n), where=out_deg > 0)
+    AT = A.T.tocsr()
+    scores = np.full(n, 1.0 - damping) if start is None else np.asarray(start, dtype=np.float64)
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        nxt = (1.0 - damping) + damping * (AT @ (scores * inv_deg))
+        delta = np.abs(nxt - scores).max() if n else 0.0
+        scores = nxt
+        if delta < tol:
+            break
+    return scores, iterations
+
+def eigenvector(A: sp.csr_matrix, max_iter: int = 20, tol: float = 1e-7) -> np.ndarray:
+    return power_eigenvector(A, max_iter, tol)[0]
+
+def power_eigenvector(A: sp.csr_matrix, max_iter: int = 20, tol: float = 1e-7,
+                      start: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+    """Eigenvector power iteration from `start` (uniform when None) -> (scores, iterations run)."""
+    n = A.shape[0]
+    AT = A.T.tocsr()
+    if start is None or not np.any(start):
+        scores = np.full(n, 1.0 / n) if n else np.zeros(0)
+    else:
+        scores = np.asarray(start, dtype=np.float64)
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        nxt = AT @ scores
+        norm = np.linalg.norm(nxt)
+        if norm == 0:
+            return np.zeros(n), iterations
+        nxt /= norm
+        delta = np.abs(nxt - scores).max()
+        scores = nxt
+        if delta < tol:
+            break
+    return scores, iterations
+
+def default_batch_size(n: int) -> int:
+    # Small batches keep the per-level frontiers sparse; cap the dense
+    # (n x batch) work matrices at ~128 MB for very large graphs
+    return int(max(1, min(32, (1 << 24) // max(n, 1))))
+
+def _batched_bfs(A: sp.csr_matrix, sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    """
+    BFS from a batch of sources at once, one sparse x dense product per level.
+
+    Returns (depth, sigma, levels): depth[v, b] is the hop distance from
+    sources[b] (-1 if unreachable), sigma[v, b] the number of shortest paths
+    and levels[d] the rows that sit at distance d for at least one source.
+    Only the rows of the current frontier and their out-neighbours are
+    touched, so a level costs O(frontier edges x batch), not O(n x batch).
+    """
+    n, b = A.shape[0], len(sources)
+    cols = np.arange(b)
+    depth = np.full((n, b), -1, dtype=np.int32)
+    sigma = np.zeros((n, b), dtype=np.float64)
+    depth[sources, cols] = 0
+    sigma[sources, cols] = 1.0
+    active = np.unique(sources)
+    levels = [active]
+    level = 0
+    while True:
+        sub = A[active]
+        cand = np.unique(sub.indices)
+        if len(cand) == 0:
+            break
+        frontier = np.where(depth[active] == level, sigma[active], 0.0)
+        nxt = sub[:, cand].T @ frontier
+        nxt[depth[cand] >= 0] = 0.0
+        reached = nxt > 0
+        rows = reached.any(axis=1)
+        if not rows.any():
+            break
+        level += 1
+        cand, nxt, reached = cand[rows], nxt[rows], reached[rows]
+        d = depth[cand]
+        d[reached] = level
+        depth[cand] = d
+        sigma[cand] += nxt
+        active = cand
+        levels.append(active)
+    return depth, sigma, levels
+
+def _batches(sources: Sequence[int], batch_size: int) -> Iterator[np.ndarray]:
+    sources = np.asarray(sources, dtype=np.int64)
+    for i in range(0, len(sources), batch_size):
+        yield sources[i:i + batch_size]
+
+def betweenness(A: sp.csr_matrix, sources: Optional[Sequence[int]] = None, batch_size: Optional[int] = None,
+                progress: Optional[Callable[[float], None]] = None) -> np.ndarray:
+    """
+    Brandes' algorithm with the BFS and dependency-accumulation phases run
+    for a whole batch of sources per sparse-dense product. `sources`
+    restricts the pivots (all nodes by default); scores are the raw
+    dependency sums. `progress` gets the fraction of sources done after
+    each batch.
+    """
+    n = A.shape[0]
+    sources = np.arange(n) if sources is None else np.asarray(sources, dtype=np.int64)
+    batch_size = batch_size or default_batch_size(n)
+    scores = np.zeros(n)
+    done = 0
+    for batch in _batches(sources, batch_size):
+        depth, sigma, levels = _batched_bfs(A, batch)
+        delta = np.zeros_like(sigma)
+        for level in range(len(levels) - 1, 0, -1):
+            rows, parents = levels[level], levels[level - 1]
+            sig = sigma[rows]
+            w = np.where(depth[rows] == level, (1.0 + delta[rows]) / np.where(sig > 0, sig, 1.0), 0.0)
+            # contrib[u, b] = sum over u->v of w[v, b]
+            contrib = A[parents][:, rows] @ w
+            delta[parents] += np.where(depth[parents] == level - 1, sigma[parents] * contrib, 0.0)
+        delta[batch, np.arange(len(batch))] = 0.0
+        scores += delta.sum(axis=1)
+        done += len(batch)
+        if progress is not None:
+            progress(done / len(sources))
+    return scores
+
+def closeness(A: sp.csr_matrix, batch_size: Optional[int] = None, progress: Optional[Callable[[float], None]] = None) -> np.ndarray:
+    n = A.shape[0]
+    batch_size = batch_size or default_batch_size(n)
+    scores = np.zeros(n)
+    for batch in _batches(np.arange(n), batch_size):
+        depth, _, _ = _batched_bfs(A, batch)
+        reached = depth > 0
+        farness = np.where(reached, depth, 0).sum(axis=0)
+        count = reached.sum(axis=0)
+        scores[batch] = np.divide(count, farness, out=np.zeros(len(batch)), where=farness > 0)
+        if progress is not None:
+            progress((batch[-1] + 1) / n)
+    return scores
+
+def modularity(W: sp.csr_matrix, labels: np.ndarray, resolution: float = 1.0) -> float:
+    """Newman modularity of `labels` on the symmetric weight matrix W (self-loops included)."""
+    W = W.tocoo()
+    m2 = W.sum()
+    if m2 == 0:
+        return 0.0
+    internal = W.data[labels[W.row] == labels[W.col]].sum()
+    tot = np.bincount(labels, weights=np.asarray(W.sum(axis=1)).ravel())
+    return float(internal / m2 - resolution * np.square(tot / m2).sum())
+
+def _louvain_level(W: sp.csr_matrix, resolution: float, order: np.ndarray, tol: float) -> Tuple[np.ndarray, bool]:
+    """One local-moving phase: (community per node, whether any node moved)."""
+    n = W.shape[0]
+    m2 = W.sum()
+    k = np.asarray(W.sum(axis=1)).ravel()
+    comm = np.arange(n)
+    tot = k.copy()
+    indptr, indices, data = W.indptr.tolist(), W.indices.tolist(), W.data.tolist()
+    comm_l, tot_l, k_l = comm.tolist(), tot.tolist(), k.tolist()
+    moved_any = False
+    while True:
+        moves = 0
+        for i in order.tolist():
+            ki, ci = k_l[i], comm_l[i]
+            links: Dict[int, float] = {}
+            for p in range(indptr[i], indptr[i + 1]):
+                j = indices[p]
+                if j != i:
+                    c = comm_l[j]
+                    links[c] = links.get(c, 0.0) + data[p]
+            tot_l[ci] -= ki
+            scale = resolution * ki / m2
+            best, best_gain = ci, links.get(ci, 0.0) - scale * tot_l[ci]
+            for c, w in links.items():
+                gain = w - scale * tot_l[c]
+                if gain > best_gain + tol:
+                    best, best_gain = c, gain
+            tot_l[best] += ki
+            if best != ci:
+                comm_l[i] = best
+                moves += 1
+        if not moves:
+            break
+        moved_any = True
+    _, labels = np.unique(np.asarray(comm_l), return_inverse=True)
+    return labels, moved_any
+
+def louvain(A: sp.csr_matrix, resolution: float = 1.0, seed: int = 0, max_levels: int = 10,
+            tol: float = 1e-10) -> Tuple[np.ndarray, float, int]:
+    """
+    Louvain community detection on A treated as undirected (A + A.T, so a
+    relationship weighs 1 whatever its direction). Nodes are visited in a
+    seeded random order, so a (graph, seed) pair always gives the same
+    partition. Returns (community per node, modularity, levels); labels are
+    0..c-1 and isolated nodes get a community of their own.
+    """
+    W = (A + A.T).tocsr()
+    n = W.shape[0]
+    labels = np.arange(n)
+    rng = np.random.default_rng(seed)
+    levels = 0
+    current = W
+    while levels < max_levels and current.shape[0] > 1:
+        level_labels, moved = _louvain_level(current, resolution, rng.permutation(current.shape[0]), tol)
+        if not moved:
+            break
+        levels += 1
+        labels = level_labels[labels]
+        # Collapse every community into one node; internal weight becomes its self-loop
+        P = sp.csr_matrix((np.ones(current.shape[0]), (np.arange(current.shape[0]), level_labels)))
+        current = (P.T @ current @ P).tocsr()
+    return labels, modularity(W, labels, resolution), levels
+
+def compute(g: CSRGraph, method: str, label: str = "Character", **kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """(scores, node mask) for `method` over the nodes carrying `label`."""
+    mask = g.label_mask(label)
+    A = adjacency(g, mask)
+    if method == "pagerank":
+        scores = pagerank(A, **kwargs)
+    elif method == "betweenness":
+        scores = betweenness(A, **kwargs)
+    elif method == "closeness":
+        scores = closeness(A, **kwargs)
+    elif method == "eigenvector":
+        scores = eigenvector(A, **kwargs)
+    else:
+        raise ValueError(f"Unknown centrality method '{method}'")
+    return scores, mask
+
+def top_scores(g: CSRGraph, scores: np.ndarray, limit: int, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """Top `limit` nodes as [{name, score}], the row shape the GDS queries return."""
+    idx = np.nonzero(mask)[0] if mask is not None else np.arange(g.n)
+    # Stable sort so ties keep snapshot order
+    order = idx[np.argsort(-scores[idx], kind="stable")][:max(limit, 0)]
+    return [{"name": g.node_props[i].get("name"), "score": float(scores[i])} for i in order]
@@ -0,0 +1,148 @@
+"""
+In-process shortest path search over a CSRGraph snapshot.
+
+- PathSearcher.shortest: bidirectional BFS (k = 1). Each side grows a
+  whole level at a time with CSRGraph.expand, and the smaller frontier
+  goes first, so the work depends on the neighbourhood between the two
+  endpoints and not on the size of the graph.
+- k_shortest: Yen's algorithm. Every spur path is found by the same
+  searcher with some root nodes and edges banned: a PathSearcher here, or
+  graph_backend.CypherPathSearcher against Neo4j.
+
+The searcher owns its scratch arrays and resets only the entries it
+touched, so repeated spur searches in Yen do not pay O(n) each time.
+"""
+import heapq
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from graph_backend import CSRGraph, CypherPathSearcher
+
+Path = Tuple[List[int], List[int]]  # (node indices, edge indices)
+
+_REVERSE = {"out": "in", "in": "out", "any": "any"}
+
+class PathSearcher:
+    def __init__(self, g: "CSRGraph", direction: str = "any", type_codes: Optional[np.ndarray] = None):
+        self.g = g
+        self.direction = direction
+        self.type_codes = type_codes
+        # dist/parent for the forward (from source) and backward (from target) searches
+        self._dist = [np.full(g.n, -1, dtype=np.int64), np.full(g.n, -1, dtype=np.int64)]
+        self._par_node = [np.full(g.n, -1, dtype=np.int64), np.full(g.n, -1, dtype=np.int64)]
+        self._par_edge = [np.full(g.n, -1, dtype=np.int64), np.full(g.n, -1, dtype=np.int64)]
+        self._touched: List[List[np.ndarray]] = [[], []]
+
+    def _reset(self) -> None:
+        for side in (0, 1):
+            for idx in self._touched[side]:
+                self._dist[side][idx] = -1
+                self._par_node[side][idx] = -1
+                self._par_edge[side][idx] = -1
+            self._touched[side] = []
+
+    def _mark(self, side: int, nodes: np.ndarray, parents: np.ndarray, edges: np.ndarray, depth: int) -> None:
+        self._dist[side][nodes] = depth
+        self._par_node[side][nodes] = parents
+        self._par_edge[side][nodes] = edges
+        self._touched[side].append(nodes)
+
+    def shortest(
+        self,
+        s: int,
+        t: int,
+        max_len: int,
+        banned_nodes: Optional[Sequence[int]] = None,
+        banned_edges: Optional[Sequence[int]] = None,
+    ) -> Optional[Path]:
+        """Shortest s -> t path with at most `max_len` edges, avoiding the banned nodes/edges."""
+        if s == t:
+            return [s], []
+        if max_len < 1:
+            return None
+        banned_n = np.asarray(list(banned_nodes or ()), dtype=np.int64)
+        banned_e = np.asarray(list(banned_edges or ()), dtype=np.int64)
+        if np.isin([s, t], banned_n).any():
+            return None
+
+        self._reset()
+        one = np.zeros(1, dtype=np.int64)
+        self._mark(0, one + s, one - 1, one - 1, 0)
+        self._mark(1, one + t, one - 1, one - 1, 0)
+        frontier = [one + s, one + t]
+        depth = [0, 0]
+        directions = (self.direction, _REVERSE[self.direction])
+        try:
+            while len(frontier[0]) and len(frontier[1]) and depth[0] + depth[1] < max_len:
+                side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+                srcs, nbrs, eids = self.g.expand(frontier[side], directions[side], self.type_codes)
+                keep = self._dist[side][nbrs] < 0
+                if len(banned_n):
+                    keep &= ~np.isin(nbrs, banned_n)
+                if len(banned_e):
+                    keep &= ~np.isin(eids, banned_e)
+                srcs, nbrs, eids = srcs[keep], nbrs[keep], eids[keep]
+                # first discovery wins, which keeps the parent choice deterministic
+                nbrs, first = np.unique(nbrs, return_index=True)
+                srcs, eids = srcs[first], eids[first]
+                depth[side] += 1
+                self._mark(side, nbrs, srcs, eids, depth[side])
+                frontier[side] = nbrs
+
+                other = self._dist[1 - side][nbrs]
+                met = other >= 0
+                if met.any():
+                    # every meeting node of this level has forward depth fixed;
+                    # pick the one closest to the other endpoint
+                    best = nbrs[met][np.argmin(other[met])]
+                    return self._join(int(best))
+            return None
+        finally:
+            self._reset()
+
+    def _join(self, meet: int) -> Path:
+        nodes, edges = [meet], []
+        while self._par_node[0][nodes[-1]] >= 0:
+            edges.append(int(self._par_edge[0][nodes[-1]]))
+            nodes.append(int(self._par_node[0][nodes[-1]]))
+        nodes.reverse()
+        edges.reverse()
+        cur = meet
+        while self._par_node[1][cur] >= 0:
+            edges.append(int(self._par_edge[1][cur]))
+            cur = int(self._par_node[1][cur])
+            nodes.append(cur)
+        return nodes, edges
+
+def k_shortest(searcher: "PathSearcher | CypherPathSearcher", s: int, t: int, k: int, max_len: int) -> List[Path]:
+    """Yen's k loopless shortest paths (by hop count), each at most `max_len` edges long."""
+    first = searcher.shortest(s, t, max_len)
+    if first is None:
+        return []
+    found: List[Path] = [first]
+    seen = {tuple(first[1])}
+    candidates: List[Tuple[int, int, Path]] = []
+    counter = 0
+    while len(found) < k:
+        prev_nodes, prev_edges = found[-1]
+        for i in range(len(prev_nodes) - 1):
+            spur = prev_nodes[i]
+            root_nodes, root_edges = prev_nodes[:i + 1], prev_edges[:i]
+            # edges leaving the spur node on any accepted path sharing this root
+            banned_edges = [p_edges[i] for p_nodes, p_edges in found if p_edges[:i] == root_edges and len(p_edges) > i]
+            spur_path = searcher.shortest(spur, t, max_len - i, banned_nodes=root_nodes[:-1], banned_edges=banned_edges)
+            if spur_path is None:
+                continue
+            path = (root_nodes[:-1] + spur_path[0], root_edges + spur_path[1])
+            key = tuple(path[1])
+            if key in seen:
+                continue
+            seen.add(key)
+            counter += 1
+            heapq.heappush(candidates, (len(path[1]), counter, path))
+        if not candidates:
+            break
+        found.append(heapq.heappop(candidates)[2])
+    return found
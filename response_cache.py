@@ -0,0 +1,160 @@
+"""
+Read-through response cache for the read-only endpoints.
+
+Entries are keyed by endpoint name, the graph version and the handler's
+arguments after defaults are applied (so `?name=X` and `?name=X&maxDepth=2`
+share one entry). The cache is an LRU bounded by entry count, every entry
+also expires after `ttl` seconds, and main._on_graph_write() clears it.
+Because the version is part of the key, a read that raced a write can
+never be served after that write.
+
+Callers get a shallow copy of the stored value, so a handler may add or
+replace top-level keys (page, layout, ...) without touching the entry;
+nested values are shared and must be treated as read-only.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    return value
+
+# Rough JSON size of one node / edge / row of a cached list
+_ITEM_BYTES = 200
+
+def _approx_size(value: Any, depth: int = 0) -> int:
+    """
+    Rough JSON size for the memory report, from the shape of the top levels
+    (lists count `_ITEM_BYTES` per item), so a miss does not pay for a
+    second serialisation of the answer.
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, (list, tuple)):
+        return len(value) * _ITEM_BYTES
+    if isinstance(value, dict):
+        if depth >= 2:
+            return len(value) * _ITEM_BYTES
+        return sum(len(str(k)) + 4 + _approx_size(v, depth + 1) for k, v in value.items())
+    return 8
+
+def _detached(value: Any) -> Any:
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, version: Optional[Callable[[], int]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Current graph version; becomes part of every key
+        self.version = version or (lambda: 0)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, endpoint: str, params: Dict[str, Any]) -> Tuple:
+        return (endpoint, self.version(), tuple(sorted((k, _normalize(v)) for k, v in params.items())))
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, size, value = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: Tuple, value: Any) -> None:
+        size = _approx_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.time() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def cached(self, endpoint: str):
+        """Decorator for a FastAPI handler (sync or async); the signature is kept for FastAPI."""
+        def decorate(fn):
+            sig = inspect.signature(fn)
+
+            def key_for(args, kwargs):
+                bound = sig.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return self.key(endpoint, bound.arguments)
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    key = key_for(args, kwargs)
+                    hit, value = self.get(key)
+                    if hit:
+                        return _detached(value)
+                    value = await fn(*args, **kwargs)
+                    self.put(key, value)
+                    return _detached(value)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = key_for(args, kwargs)
+                hit, value = self.get(key)
+                if hit:
+                    return _detached(value)
+                value = fn(*args, **kwargs)
+                self.put(key, value)
+                return _detached(value)
+            return wrapper
+        return decorate
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "approx_bytes": self._bytes,
+            }
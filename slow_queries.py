@@ -0,0 +1,195 @@
+"""
+Slow-query log behind GET /debug/slow_queries.
+
+Every Cypher query that goes through the instrumented driver (metrics.py)
+is checked against `threshold_ms` (time blocked in the driver: run plus
+fetching every record). Slow ones go into a bounded ring buffer with
+their parameters, row count and the server's result_available_after /
+result_consumed_after. Parameter values can be names, payloads or other
+user data, so by default only their type and size are kept; with
+`show_params` the values are kept too (each repr cut to `max_param_chars`).
+
+A `sample_rate` fraction of the slow read queries is re-run once under
+PROFILE on a background thread (one at a time, in a READ session, with
+a transaction timeout), and the entry gets the operator tree with db hits
+and rows per operator. Anything that might write - CREATE/MERGE/SET/
+DELETE/REMOVE/DROP/FOREACH/LOAD CSV, CALL ... IN TRANSACTIONS, schema
+commands, non-stream GDS/APOC procedures - is never re-run.
+"""
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from neo4j import READ_ACCESS, Query
+
+logger = logging.getLogger(__name__)
+
+_WRITE_CLAUSES = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS|ALTER|GRANT|DENY|REVOKE)\b",
+    re.IGNORECASE,
+)
+_PROCEDURE = re.compile(r"\bCALL\s+([A-Za-z_][\w.]*)", re.IGNORECASE)
+_NOT_PROFILABLE_PREFIX = re.compile(r"^\s*(PROFILE|EXPLAIN|SHOW|USE|CYPHER)\b", re.IGNORECASE)
+
+def is_profilable(query: str) -> bool:
+    """True for queries that are safe to run a second time under PROFILE (reads only)."""
+    if _NOT_PROFILABLE_PREFIX.match(query) or _WRITE_CLAUSES.search(query):
+        return False
+    for proc in _PROCEDURE.findall(query):
+        name = proc.lower()
+        if name.startswith(("apoc.path.", "db.labels", "db.relationshiptypes")) or name.endswith(".stream"):
+            continue
+        return False
+    return True
+
+def _short(value: Any, limit: int) -> Any:
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = repr(value) if not isinstance(value, str) else value
+    return text if len(text) <= limit else text[:limit] + f"… ({len(text)} chars)"
+
+def _redacted(value: Any) -> Any:
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}, {len(value)} chars>"
+    if isinstance(value, (list, tuple, set, dict)):
+        return f"<{type(value).__name__}, {len(value)} items>"
+    return f"<{type(value).__name__}>"
+
+def plan_tree(profile: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Driver profile dict -> {operator, details, db_hits, rows, children}."""
+    if not profile:
+        return None
+    args = profile.get("args") or {}
+    return {
+        "operator": profile.get("operatorType"),
+        "details": args.get("Details"),
+        "identifiers": profile.get("identifiers"),
+        "db_hits": profile.get("dbHits", args.get("DbHits", 0)),
+        "rows": profile.get("rows", args.get("Rows", 0)),
+        "estimated_rows": args.get("EstimatedRows"),
+        "children": [plan_tree(c) for c in profile.get("children") or []],
+    }
+
+def _total_db_hits(node: Optional[Dict[str, Any]]) -> int:
+    if not node:
+        return 0
+    return int(node.get("db_hits") or 0) + sum(_total_db_hits(c) for c in node["children"])
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        threshold_ms: float = 500.0,
+        sample_rate: float = 0.1,
+        capacity: int = 200,
+        profile_driver=None,
+        profile_timeout: float = 30.0,
+        max_param_chars: int = 500,
+        show_params: bool = False,
+    ):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.profile_driver = profile_driver
+        self.profile_timeout = profile_timeout
+        self.max_param_chars = max_param_chars
+        self.show_params = show_params
+        self._lock = threading.Lock()
+        self._entries: deque = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._profiler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-profile")
+        self._profiling = False
+        self.seen = 0
+        self.recorded = 0
+        self.profiled = 0
+
+    def observe(self, endpoint: str, query: str, params: Optional[Dict[str, Any]], seconds: float, rows: int, summary) -> None:
+        """Query listener for metrics.add_query_listener."""
+        with self._lock:
+            self.seen += 1
+        if seconds * 1000 < self.threshold_ms:
+            return
+        entry = {
+            "id": next(self._ids),
+            "at": time.time(),
+            "endpoint": endpoint,
+            "query": query,
+            "params": {
+                k: _short(v, self.max_param_chars) if self.show_params else _redacted(v)
+                for k, v in (params or {}).items()
+            },
+            "ms": round(seconds * 1000, 2),
+            "rows": rows,
+            "available_after_ms": getattr(summary, "result_available_after", None),
+            "consumed_after_ms": getattr(summary, "result_consumed_after", None),
+            "profile": None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+            sample = (
+                self.profile_driver is not None
+                and not self._profiling
+                and random.random() < self.sample_rate
+                and is_profilable(query)
+            )
+            if sample:
+                self._profiling = True
+        logger.warning("🐢 Slow query (%.0f ms, %d rows) on %s: %s", entry["ms"], rows, endpoint, " ".join(query.split())[:300])
+        if sample:
+            entry["profile"] = {"status": "pending"}
+            self._profiler.submit(self._profile, entry, dict(params or {}))
+
+    def _profile(self, entry: Dict[str, Any], params: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            with self.profile_driver.session(default_access_mode=READ_ACCESS) as s:
+                summary = s.run(Query(f"PROFILE {entry['query']}", timeout=self.profile_timeout), params).consume()
+            tree = plan_tree(summary.profile)
+            entry["profile"] = {
+                "status": "done",
+                "ms": round((time.perf_counter() - started) * 1000, 2),
+                "total_db_hits": _total_db_hits(tree),
+                "plan": tree,
+            }
+            self.profiled += 1
+        except Exception as e:
+            entry["profile"] = {"status": "error", "error": str(e)}
+        finally:
+            with self._lock:
+                self._profiling = False
+
+    def entries(self, limit: int = 50, min_ms: float = 0.0, endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest first."""
+        with self._lock:
+            items = list(self._entries)
+        out = []
+        for e in reversed(items):
+            if e["ms"] >= min_ms and (endpoint is None or e["endpoint"] == endpoint):
+                out.append(e)
+                if len(out) >= limit:
+                    break
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_ms,
+                "sample_rate": self.sample_rate,
+                "capacity": self._entries.maxlen,
+                "entries": len(self._entries),
+                "queries_seen": self.seen,
+                "slow_recorded": self.recorded,
+                "profiled": self.profiled,
+                "params_shown": self.show_params,
+            }
@@ -15,9 +15,13 @@ const NetworkGraph = ({ nodes, edges }) => {
       label: node.name || node.label || `Node ${node.id}`,
       group: node.faction || 'default',
       color: node.color || '#666',
-      title: node.name || node.label || `Node ${node.id}`
+      title: node.name || node.label || `Node ${node.id}`,
+      ...(node.x !== undefined ? { x: node.x, y: node.y } : {})
     }));
 
+    // Positions computed server-side (layout=true): skip the in-browser simulation
+    const positioned = visNodes.length > 0 && visNodes.every(node => node.x !== undefined);
+
     const visEdges = edges.map(edge => ({
       from: edge.from || edge.start || edge.source,
       to: edge.to || edge.end || edge.target,
@@ -48,6 +52,7 @@ const NetworkGraph = ({ nodes, edges }) => {
         }
       },
       physics: {
+        enabled: !positioned,
         stabilization: false,
         barnesHut: {
           gravitationalConstant: -80000,
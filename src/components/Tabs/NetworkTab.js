@@ -37,7 +37,7 @@ export default function NetworkTab() {
     try {
       // Load a sample character's subgraph to start
       if (characters.length > 0) {
-        const visual = await graphQueriesAPI.visual(characters[0].name, 3);
+        const visual = await graphQueriesAPI.visual(characters[0].name, 3, true);
         const networkData = convertToVisNetwork(visual);
         setNetworkData(networkData);
       }
@@ -53,7 +53,7 @@ export default function NetworkTab() {
     
     setLoading(true);
     try {
-      const visual = await graphQueriesAPI.visual(characterName, depth);
+      const visual = await graphQueriesAPI.visual(characterName, depth, true);
       const networkData = convertToVisNetwork(visual);
       setNetworkData(networkData);
     } catch (error) {
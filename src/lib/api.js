@@ -70,9 +70,9 @@ export const charactersAPI = {
     return response.data;
   },
 
-  // Search characters by name
-  search: async (name) => {
-    const response = await api.get(`/search?name=${encodeURIComponent(name)}`);
+  // Search characters by name (accent-insensitive, ranked: "Luu Bi" finds "Lưu Bị")
+  search: async (name, limit = 10) => {
+    const response = await api.get('/search', { params: { name, limit } });
     return response.data;
   },
 };
@@ -145,17 +145,33 @@ export const graphQueriesAPI = {
   },
 
   // Centrality analysis
-  centrality: async (method = 'degree', limit = 20) => {
-    const response = await api.get('/query/centrality', {
-      params: { method, limit },
+  // approx: sampled betweenness (samples pivots, or enough for an error of epsilon); the same seed gives the same ranking
+  centrality: async (method = 'degree', limit = 20, { approx = false, samples = null, epsilon = null, seed = null } = {}) => {
+    const params = { method, limit };
+    if (approx) {
+      params.approx = true;
+      if (samples !== null) params.samples = samples;
+      if (epsilon !== null) params.epsilon = epsilon;
+      if (seed !== null) params.seed = seed;
+    }
+    const response = await api.get('/query/centrality', { params });
+    return response.data;
+  },
+
+  // Louvain communities, largest first, paged by community (page.next_offset -> next page)
+  communities: async (offset = 0, limit = 20, { minSize = 1, memberLimit = 200, resolution = 1.0 } = {}) => {
+    const response = await api.get('/query/communities', {
+      params: { offset, limit, min_size: minSize, member_limit: memberLimit, resolution },
     });
     return response.data;
   },
 
   // Multi-hop traversal
-  multiHop: async (name, hops = 2, direction = 'any', relTypes = null, limit = 500) => {
+  // minHops = null: only nodes exactly `hops` away; otherwise every node minHops..hops away
+  multiHop: async (name, hops = 2, direction = 'any', relTypes = null, limit = 500, minHops = null) => {
     const params = { name, hops, direction, limit };
     if (relTypes) params.rel_types = relTypes;
+    if (minHops !== null) params.min_hops = minHops;
     const response = await api.get('/query/multi_hop', { params });
     return response.data;
   },
@@ -168,21 +184,80 @@ export const graphQueriesAPI = {
     return response.data;
   },
 
-  // Subgraph extraction
-  subgraph: async (name, maxDepth = 2) => {
-    const response = await api.get('/query/subgraph', {
-      params: { name, maxDepth },
-    });
+  // Subgraph extraction; the server caps max_nodes/max_edges and sets truncated when a budget was hit
+  subgraph: async (name, maxDepth = 2, { maxNodes = null, maxEdges = null, direction = 'any', relTypes = null } = {}) => {
+    const params = { name, maxDepth, direction };
+    if (maxNodes !== null) params.max_nodes = maxNodes;
+    if (maxEdges !== null) params.max_edges = maxEdges;
+    if (relTypes) params.rel_types = relTypes;
+    const response = await api.get('/query/subgraph', { params });
     return response.data;
   },
 
-  // Visual graph format
-  visual: async (name, maxDepth = 2) => {
+  // Visual graph format (fetched columnar, decoded to {nodes, edges})
+  // layout=true: node x/y are computed (and cached) by the server; only views that draw the graph ask for it
+  visual: async (name, maxDepth = 2, layout = false) => {
     const response = await api.get('/query/visual', {
-      params: { name, maxDepth },
+      params: { name, maxDepth, layout, format: 'columnar' },
     });
+    return decodeColumnarGraph(response.data);
+  },
+};
+
+// =============================================================================
+// JOBS API
+// =============================================================================
+
+// Long-running analytics run as server-side jobs instead of inside a request
+// (betweenness on a large graph outlives the 30s timeout above)
+export const jobsAPI = {
+  // Each submit returns the job ({id, status, progress, ...}); reused=true when an
+  // identical job already finished (or is running) for the current graph version
+  centrality: async (method = 'betweenness', limit = 20) => {
+    const response = await api.post('/jobs/centrality', null, { params: { method, limit } });
+    return response.data;
+  },
+
+  communities: async (limit = 50, minSize = 1, resolution = 1.0) => {
+    const response = await api.post('/jobs/communities', null, { params: { limit, min_size: minSize, resolution } });
+    return response.data;
+  },
+
+  paths: async (fromName, toName, maxLen = 15, k = 1, direction = 'any', relTypes = null) => {
+    const params = { from_name: fromName, to_name: toName, max_len: maxLen, k, direction };
+    if (relTypes) params.rel_types = relTypes;
+    const response = await api.post('/jobs/paths', null, { params });
     return response.data;
   },
+
+  get: async (jobId) => {
+    const response = await api.get(`/jobs/${jobId}`);
+    return response.data;
+  },
+
+  list: async (limit = 50, kind = null) => {
+    const params = { limit };
+    if (kind) params.kind = kind;
+    const response = await api.get('/jobs', { params });
+    return response.data;
+  },
+
+  result: async (jobId) => {
+    const response = await api.get(`/jobs/${jobId}/result`);
+    return response.data.result;
+  },
+
+  // Poll a submitted job until it is done and return its result; onProgress gets the job on each poll
+  wait: async (job, { intervalMs = 1000, onProgress = null } = {}) => {
+    let current = job;
+    while (current.status !== 'done') {
+      if (current.status === 'failed') throw new Error(current.error || 'Job failed');
+      if (onProgress) onProgress(current);
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+      current = await jobsAPI.get(current.id);
+    }
+    return jobsAPI.result(current.id);
+  },
 };
 
 // =============================================================================
@@ -190,13 +265,14 @@ export const graphQueriesAPI = {
 // =============================================================================
 
 export const visualAPI = {
-  // Get neighbors of a node
-  neighbors: async (id = null, name = null, depth = 1, offset = 0, limit = 50) => {
-    const params = { depth, offset, limit };
+  // Get neighbors of a node; pass the previous response's page.next_cursor to get the next page
+  neighbors: async (id = null, name = null, depth = 1, offset = 0, limit = 50, layout = false, cursor = null) => {
+    const params = { depth, offset, limit, layout, format: 'columnar' };
+    if (cursor) params.cursor = cursor;
     if (id !== null) params.id = id;
     if (name) params.name = name;
     const response = await api.get('/visual/neighbors', { params });
-    return response.data;
+    return decodeColumnarGraph(response.data);
   },
 };
 
@@ -255,6 +331,7 @@ export const convertToVisNetwork = (graphData) => {
     faction: node.faction || node.props?.faction,
     title: `${node.label || node.name || 'Unknown'}\nFaction: ${node.faction || node.props?.faction || 'Unknown'}`,
     ...node.props,
+    ...(node.x !== undefined ? { x: node.x, y: node.y } : {}),
   })) || [];
 
   const edges = graphData.edges?.map(edge => ({
@@ -270,6 +347,46 @@ export const convertToVisNetwork = (graphData) => {
   return { nodes, edges };
 };
 
+// Decode the compact columnar graph (format=columnar, see wire_format.py)
+// back to {nodes: [{id, label, props}], edges: [{id, type, source, target, props}]}
+export const decodeColumnarGraph = (doc) => {
+  if (!doc || doc.format !== 'tq-columnar/1') return doc;
+  const { nodes: n, edges: e, tables } = doc;
+  const rowProps = (cols, i) => {
+    const props = {};
+    for (const [key, col] of Object.entries(cols)) {
+      if (col[i] !== null && col[i] !== undefined) props[key] = col[i];
+    }
+    return props;
+  };
+
+  const nodes = [];
+  for (let i = 0; i < n.count; i++) {
+    const props = rowProps(n.props, i);
+    if (doc.name_is_label && n.label[i] !== null && props.name === undefined) props.name = n.label[i];
+    if (n.faction[i] >= 0) props.faction = tables.faction[n.faction[i]];
+    const node = { id: n.id[i], label: n.label[i], props };
+    if (n.x && n.x[i] !== null) {
+      node.x = n.x[i];
+      node.y = n.y[i];
+    }
+    nodes.push(node);
+  }
+  const edges = [];
+  for (let i = 0; i < e.count; i++) {
+    edges.push({
+      id: e.id[i],
+      type: e.type[i] >= 0 ? tables.type[e.type[i]] : null,
+      source: n.id[e.source[i]],
+      target: n.id[e.target[i]],
+      props: rowProps(e.props, i),
+    });
+  }
+
+  const { format, name_is_label, tables: _tables, nodes: _n, edges: _e, ...rest } = doc;
+  return { ...rest, nodes, edges };
+};
+
 // Handle API errors consistently
 export const handleAPIError = (error, defaultMessage = 'An error occurred') => {
   if (error.response) {
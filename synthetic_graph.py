@@ -0,0 +1,80 @@
+"""
+Synthetic Three Kingdoms-shaped graphs for benchmarks.
+
+Mirrors the structure of the seed data: factions led by a few lords, each
+lord surrounded by generals and advisors (hubs with high out-degree), a
+sprinkling of family ties inside a faction and alliances/enmities across
+factions. Output uses the node/edge dict shapes CSRGraph accepts.
+"""
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from full_data_loader import RELATIONSHIP_TYPES
+
+FACTIONS = ["Thục Hán", "Tào Ngụy", "Đông Ngô", "Khác"]
+
+def generate(num_edges: int, avg_degree: float = 5.0, seed: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    rng = np.random.default_rng(seed)
+    n = max(len(FACTIONS) * 2, int(num_edges / avg_degree * 2))
+    faction = rng.integers(0, len(FACTIONS), size=n)
+    # ~2% of characters are lords; they attract most "serves" edges
+    is_lord = rng.random(n) < 0.02
+    is_lord[:len(FACTIONS)] = True
+    faction[:len(FACTIONS)] = np.arange(len(FACTIONS))
+
+    nodes = [
+        {
+            "id": int(i),
+            "labels": ["Character"],
+            "character_id": int(i),
+            "name": f"{FACTIONS[faction[i]]} #{i}",
+            "faction": FACTIONS[faction[i]],
+        }
+        for i in range(n)
+    ]
+
+    types = list(RELATIONSHIP_TYPES.values())
+    serve_types = ["SERVES_AS_GENERAL", "SERVES_AS_ADVISOR"]
+    family_types = ["SWORN_BROTHER", "FATHER_SON", "SIBLINGS", "SUCCESSOR", "ROMANTIC"]
+    cross_types = ["RED_CLIFF_ALLY", "ENEMY", "FORMERLY_SERVED"]
+
+    lords_by_faction = [np.nonzero(is_lord & (faction == f))[0] for f in range(len(FACTIONS))]
+    members_by_faction = [np.nonzero(faction == f)[0] for f in range(len(FACTIONS))]
+
+    kind = rng.choice(3, size=num_edges, p=[0.6, 0.25, 0.15])
+    a = rng.integers(0, n, size=num_edges)
+    src = np.empty(num_edges, dtype=np.int64)
+    dst = np.empty(num_edges, dtype=np.int64)
+    rel = np.empty(num_edges, dtype=object)
+    for f in range(len(FACTIONS)):
+        sel = np.nonzero(faction[a] == f)[0]
+        lords, members = lords_by_faction[f], members_by_faction[f]
+        # lord -> member
+        s = sel[kind[sel] == 0]
+        src[s] = lords[rng.integers(0, len(lords), size=len(s))]
+        dst[s] = a[s]
+        rel[s] = rng.choice(serve_types, size=len(s))
+        # member <-> member inside the faction
+        s = sel[kind[sel] == 1]
+        src[s] = a[s]
+        dst[s] = members[rng.integers(0, len(members), size=len(s))]
+        rel[s] = rng.choice(family_types, size=len(s))
+    # anyone -> anyone across factions
+    s = np.nonzero(kind == 2)[0]
+    src[s] = a[s]
+    dst[s] = rng.integers(0, n, size=len(s))
+    rel[s] = rng.choice(cross_types, size=len(s))
+
+    label_of = {v: k for k, v in RELATIONSHIP_TYPES.items()}
+    edges = [
+        {
+            "id": int(i),
+            "type": rel[i] if rel[i] in types else "RELATED_TO",
+            "start": int(src[i]),
+            "end": int(dst[i]),
+            "properties": {"type": label_of.get(rel[i], rel[i])},
+        }
+        for i in range(num_edges)
+    ]
+    return nodes, edges
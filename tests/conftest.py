@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from graph_backend import GraphSnapshotStore, InMemoryGraphBackend
+from graphs import seed_graph, simple_graph, to_networkx
+
+@pytest.fixture(scope="session")
+def seed():
+    return seed_graph()
+
+@pytest.fixture(scope="session")
+def simple():
+    return simple_graph()
+
+@pytest.fixture(scope="session", params=["seed", "simple"])
+def graph(request):
+    """Each test using it runs once on the seed data and once on the synthetic graph."""
+    return request.getfixturevalue(request.param)
+
+@pytest.fixture(scope="session")
+def nx_graph(graph):
+    return to_networkx(graph)
+
+@pytest.fixture
+def memory_backend(graph):
+    return InMemoryGraphBackend(GraphSnapshotStore(lambda: graph))
+
+@pytest.fixture(scope="session")
+def app_main(tmp_path_factory):
+    """main with the in-memory backend on the seed graph; no Neo4j is contacted for reads."""
+    pytest.importorskip("fastapi")
+    os.environ.setdefault("GRAPH_BACKEND", "memory")
+    os.environ.setdefault("GRAPH_SNAPSHOT_SOURCE", "seed")
+    os.environ.setdefault("JOBS_DB", str(tmp_path_factory.mktemp("jobs") / "jobs.sqlite3"))
+    import main
+    return main
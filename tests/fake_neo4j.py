@@ -0,0 +1,207 @@
+"""
+A stand-in Neo4j driver that answers, from a CSRGraph, the Cypher the
+Neo4jBackend fallbacks (no APOC, no GDS) send.
+
+Only the query shapes graph_backend.py builds are understood; anything
+else fails the test, so a new query shape gets a matching entry here.
+Rows come back in snapshot order, which is one of the orders Neo4j may
+pick since none of these queries has an ORDER BY.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from graph_backend import CSRGraph
+
+class FakeNode(dict):
+    def __init__(self, id: int, labels: Iterable[str], props: Dict[str, Any]):
+        super().__init__(props)
+        self.id = id
+        self.labels = frozenset(labels)
+
+class FakeRel(dict):
+    def __init__(self, id: int, type: str, start: FakeNode, end: FakeNode, props: Dict[str, Any]):
+        super().__init__(props)
+        self.id = id
+        self.type = type
+        self.start_node = start
+        self.end_node = end
+
+class FakePath:
+    def __init__(self, nodes: List[FakeNode], relationships: List[FakeRel]):
+        self.nodes = nodes
+        self.relationships = relationships
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return None
+
+class NoCapabilities:
+    """CapabilityRegistry stand-in for a server without APOC or GDS."""
+
+    def get(self):
+        return self
+
+    def has(self, name: str) -> bool:
+        return False
+
+    def expire(self) -> None:
+        pass
+
+_ARROWS = {("-", "->"): "out", ("<-", "-"): "in", ("-", "-"): "any"}
+
+def _types(clause: Optional[str]) -> Optional[List[str]]:
+    return clause.lstrip(":").split("|") if clause else None
+
+class FakeSession:
+    def __init__(self, graph: "FakeGraph"):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> FakeResult:
+        self.graph.queries.append(query)
+        p = {**(parameters or {}), **kwargs}
+        q = " ".join(query.split())
+        return FakeResult(self.graph.answer(q, p))
+
+class FakeGraph:
+    """Driver-shaped: session() opens a FakeSession over the snapshot."""
+
+    def __init__(self, g: CSRGraph):
+        self.g = g
+        self.queries: List[str] = []
+        self.nodes = [FakeNode(int(g.node_ids[i]), g.node_labels[i], g.node_props[i]) for i in range(g.n)]
+        self.rels = [
+            FakeRel(int(g.edge_ids[e]), g.rel_types[g.edge_type[e]], self.nodes[g.edge_src[e]],
+                    self.nodes[g.edge_dst[e]], g.edge_props[e])
+            for e in range(g.m)
+        ]
+        self.rel_index = {r.id: e for e, r in enumerate(self.rels)}
+
+    def session(self, **kwargs) -> FakeSession:
+        return FakeSession(self)
+
+    # ----- helpers -----
+    def _index(self, node_id) -> Optional[int]:
+        return self.g.index_for_id(node_id)
+
+    def _characters(self, p: Dict[str, Any], where: str) -> List[int]:
+        if where == "id(n) = $id":
+            i = self._index(p["id"])
+            return [i] if i is not None and "Character" in self.g.node_labels[i] else []
+        return list(self.g.nodes_named(p["name"]))
+
+    def _steps(self, indices: Iterable[int], direction: str, types: Optional[List[str]]):
+        """(a index, b index, edge index, start index) for every relationship walked from `indices`."""
+        codes = self.g.type_codes(types)
+        for i in indices:
+            nbrs, eids = self.g.neighbors(i, direction, codes)
+            for j, e in zip(nbrs.tolist(), eids.tolist()):
+                yield i, j, e, int(self.g.edge_src[e])
+
+    def _ids(self, ids) -> List[int]:
+        return [i for i in (self._index(x) for x in ids) if i is not None]
+
+    # ----- the queries -----
+    def answer(self, q: str, p: Dict[str, Any]) -> List[Dict[str, Any]]:
+        g = self.g
+        if q == "MATCH (p:Character {name:$name}) RETURN id(p) AS id":
+            return [{"id": self.nodes[i].id} for i in g.nodes_named(p["name"])]
+
+        m = re.fullmatch(r"MATCH \(n:Character\) WHERE (id\(n\) = \$id|n\.name = \$name) RETURN id\(n\) AS id", q)
+        if m:
+            return [{"id": self.nodes[i].id} for i in self._characters(p, m.group(1))]
+
+        m = re.fullmatch(r"MATCH \(a\)(<?-)\[r(:[\w|]+)?\](->?)\(b\) WHERE id\(a\) IN \$frontier "
+                         r"RETURN id\(b\) AS id, id\(r\) AS rel", q)
+        if m:
+            direction = _ARROWS[(m.group(1), m.group(3))]
+            return [{"id": self.nodes[j].id, "rel": self.rels[e].id}
+                    for _, j, e, _ in self._steps(self._ids(p["frontier"]), direction, _types(m.group(2)))]
+
+        m = re.fullmatch(r"MATCH \(a\)-\[r(:[\w|]+)?\]-\(b\) WHERE id\(a\) IN \$frontier RETURN id\(a\) AS src, "
+                         r"id\(b\) AS id, id\(r\) AS rel, id\(startNode\(r\)\) AS start LIMIT \$rowLimit", q)
+        if m:
+            rows = [{"src": self.nodes[i].id, "id": self.nodes[j].id, "rel": self.rels[e].id, "start": self.nodes[s].id}
+                    for i, j, e, s in self._steps(self._ids(p["frontier"]), "any", _types(m.group(1)))]
+            return rows[:p["rowLimit"]]
+
+        if q == "MATCH (a)--(b) WHERE id(a) IN $frontier RETURN DISTINCT id(b) AS id":
+            ids = {self.nodes[j].id: None for _, j, _, _ in self._steps(self._ids(p["frontier"]), "any", None)}
+            return [{"id": i} for i in ids]
+
+        if q == "MATCH (n) WHERE id(n) IN $ids RETURN n":
+            return [{"n": self.nodes[i]} for i in self._ids(p["ids"])]
+
+        if q == "MATCH ()-[r]->() WHERE id(r) IN $rels RETURN r":
+            return [{"r": self.rels[self.rel_index[r]]} for r in p["rels"] if r in self.rel_index]
+
+        m = re.fullmatch(r"MATCH \(a\)-\[r\]->\(b\) WHERE id\(a\) IN \$ids AND id\(b\) IN \$ids "
+                         r"RETURN id\(r\) AS id, type\(r\) AS type, id\(a\) AS start, id\(b\) AS end, r", q)
+        if m:
+            inside = set(self._ids(p["ids"]))
+            return [{"id": self.rels[e].id, "type": self.rels[e].type, "start": self.nodes[i].id,
+                     "end": self.nodes[j].id, "r": self.rels[e]}
+                    for i, j, e, _ in self._steps(sorted(inside), "out", None) if j in inside]
+
+        m = re.fullmatch(r"MATCH \(p:Character \{name:\$name\}\)-\[r:(\w+)\]->\(other\) RETURN other, r LIMIT \$limit", q)
+        if m:
+            rows = [{"other": self.nodes[j], "r": self.rels[e]}
+                    for _, j, e, _ in self._steps(g.nodes_named(p["name"]), "out", [m.group(1)])]
+            return rows[:p["limit"]]
+
+        m = re.fullmatch(r"MATCH \(a\), \(b\) WHERE id\(a\) = \$s AND id\(b\) = \$t MATCH p = shortestPath\(\(a\)(<?-)"
+                         r"\[(:[\w|]+)?\*\.\.(\d+)\](->?)\(b\)\) WHERE none\(n IN nodes\(p\) WHERE id\(n\) IN \$bannedNodes\) "
+                         r"AND none\(r IN relationships\(p\) WHERE id\(r\) IN \$bannedRels\) "
+                         r"RETURN \[n IN nodes\(p\) \| id\(n\)\] AS nodes, \[r IN relationships\(p\) \| id\(r\)\] AS rels", q)
+        if m:
+            path = self._bfs_path(p, _ARROWS[(m.group(1), m.group(4))], _types(m.group(2)), int(m.group(3)))
+            return [path] if path else []
+
+        m = re.fullmatch(r"MATCH \(a:Character \{name:\$from\}\), \(b:Character \{name:\$to\}\) MATCH p = shortestPath\(\(a\)(<?-)"
+                         r"\[(:[\w|]+)?\*\.\.(\d+)\](->?)\(b\)\) RETURN p AS path", q)
+        if m:
+            rows = []
+            for s in g.nodes_named(p["from"]):
+                for t in g.nodes_named(p["to"]):
+                    ids = {"s": self.nodes[s].id, "t": self.nodes[t].id, "bannedNodes": [], "bannedRels": []}
+                    path = self._bfs_path(ids, _ARROWS[(m.group(1), m.group(4))], _types(m.group(2)), int(m.group(3)))
+                    if path:
+                        rows.append({"path": FakePath([self.nodes[self._index(i)] for i in path["nodes"]],
+                                                      [self.rels[self.rel_index[r]] for r in path["rels"]])})
+            return rows
+
+        raise AssertionError(f"FakeGraph does not understand: {q}")
+
+    def _bfs_path(self, p: Dict[str, Any], direction: str, types: Optional[List[str]], max_len: int):
+        """Plain BFS standing in for shortestPath with the banned-node/relationship predicates."""
+        s, t = self._index(p["s"]), self._index(p["t"])
+        banned_nodes = set(self._ids(p["bannedNodes"]))
+        banned_rels = {self.rel_index[r] for r in p["bannedRels"] if r in self.rel_index}
+        if s in banned_nodes or t in banned_nodes:
+            return None
+        parent = {s: None}
+        frontier = [s]
+        for _ in range(max_len):
+            nxt = []
+            for i, j, e, _ in self._steps(frontier, direction, types):
+                if j in parent or j in banned_nodes or e in banned_rels:
+                    continue
+                parent[j] = (i, e)
+                nxt.append(j)
+            if t in parent:
+                nodes, rels = [t], []
+                while parent[nodes[-1]] is not None:
+                    i, e = parent[nodes[-1]]
+                    rels.append(self.rels[e].id)
+                    nodes.append(i)
+                return {"nodes": [self.nodes[i].id for i in reversed(nodes)], "rels": rels[::-1]}
+            frontier = nxt
+        return None
@@ -0,0 +1,134 @@
+"""
+A stand-in Neo4j driver for the write endpoints: a small labelled property
+graph that answers the MERGE / UNWIND shapes main.py sends, the GraphMeta
+version bump, and the Character read by ids.
+
+As in fake_neo4j.py, an unknown query shape fails the test.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from fake_neo4j import FakeNode
+from graph_meta import BUMP_CYPHER, READ_CYPHER
+
+class Counters:
+    def __init__(self):
+        self.nodes_created = 0
+        self.nodes_deleted = 0
+        self.relationships_created = 0
+        self.relationships_deleted = 0
+        self.properties_set = 0
+
+class Summary:
+    def __init__(self, counters: Counters):
+        self.counters = counters
+
+class Record(dict):
+    def data(self) -> Dict[str, Any]:
+        return dict(self)
+
+class Result(list):
+    def __init__(self, rows: Iterable[Dict[str, Any]], counters: Counters):
+        super().__init__(Record(r) for r in rows)
+        self._summary = Summary(counters)
+
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self) -> Summary:
+        return self._summary
+
+def _flat(query: str) -> str:
+    return " ".join(query.split())
+
+class FakeTx:
+    def __init__(self, graph: "WritableGraph"):
+        self.graph = graph
+
+    def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> Result:
+        return self.graph.run(query, {**(parameters or {}), **kwargs})
+
+    def commit(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeWriteSession(FakeTx):
+    def begin_transaction(self) -> FakeTx:
+        return FakeTx(self.graph)
+
+    def execute_write(self, work, *args):
+        return work(FakeTx(self.graph), *args)
+
+class WritableGraph:
+    """Driver-shaped: nodes live in `nodes` (id -> FakeNode), relationships in `rels`."""
+
+    def __init__(self):
+        self.nodes: Dict[int, FakeNode] = {}
+        self.rels: List[Any] = []
+        self.version = 0
+        self.queries: List[str] = []
+
+    def session(self, **kwargs) -> FakeWriteSession:
+        return FakeWriteSession(self)
+
+    def character_names(self):
+        """Loader for a NameIndex over the Characters stored here."""
+        return [(i, n.get("name")) for i, n in self.nodes.items() if "Character" in n.labels]
+
+    def _merge(self, label: str, key: str, value: Any, counters: Counters) -> FakeNode:
+        for node in self.nodes.values():
+            if label in node.labels and node.get(key) == value:
+                return node
+        node = FakeNode(len(self.nodes) + 1, [label], {key: value})
+        self.nodes[node.id] = node
+        counters.nodes_created += 1
+        return node
+
+    def run(self, query: str, p: Dict[str, Any]) -> Result:
+        self.queries.append(query)
+        q = _flat(query)
+        counters = Counters()
+        if q == _flat(BUMP_CYPHER):
+            self.version += 1
+            return Result([{"version": self.version}], counters)
+        if q == _flat(READ_CYPHER):
+            return Result([{"version": self.version}], counters)
+
+        if q == "MATCH (c:Character) WHERE id(c) IN $ids RETURN c":
+            return Result([{"c": self.nodes[i]} for i in p["ids"] if i in self.nodes and "Character" in self.nodes[i].labels],
+                          counters)
+
+        m = re.fullmatch(r"UNWIND \$rows AS row MERGE \(n:(\w+) \{(\w+): row\.keyVal\}\) SET n \+= row\.props "
+                         r"RETURN row\.idx AS idx, id\(n\) AS id", q)
+        if m:
+            rows = []
+            for row in p["rows"]:
+                node = self._merge(m.group(1), m.group(2), row["keyVal"], counters)
+                node.update(row["props"])
+                rows.append({"idx": row["idx"], "id": node.id})
+            return Result(rows, counters)
+
+        m = re.fullmatch(r"MERGE \(n:(\w+) \{(\w+): \$keyVal\}\)((?: SET .*)?) "
+                         r"RETURN id\(n\) AS id, labels\(n\) AS labels, n AS node", q)
+        if m:
+            node = self._merge(m.group(1), m.group(2), p["keyVal"], counters)
+            for key in re.findall(r"n\.(\w+) = \$props\.\w+", m.group(3)):
+                node[key] = p["props"][key]
+            return Result([{"id": node.id, "labels": sorted(node.labels), "node": node}], counters)
+
+        m = re.fullmatch(r"MERGE \(a:Character \{name:\$from\}\) MERGE \(b:Character \{name:\$to\}\) "
+                         r"MERGE \(a\)-\[r:(\w+)\]->\(b\)(?: SET .*)? RETURN id\(a\) AS a, id\(b\) AS b", q)
+        if m:
+            a = self._merge("Character", "name", p["from"], counters)
+            b = self._merge("Character", "name", p["to"], counters)
+            if (a.id, m.group(1), b.id) not in self.rels:
+                self.rels.append((a.id, m.group(1), b.id))
+                counters.relationships_created += 1
+            return Result([{"a": a.id, "b": b.id}], counters)
+
+        raise AssertionError(f"WritableGraph does not understand: {q}")
@@ -0,0 +1,46 @@
+"""
+Graphs for the engine tests and their networkx twins.
+
+- seed_graph():   the Three Kingdoms seed data (full_data_loader.NODES/EDGES)
+- simple_graph(): a synthetic graph with parallel relationships and
+  self-loops dropped and a ring added, so every node has an outgoing edge
+  and networkx's simple-graph definitions line up with the CSR engine's
+"""
+from typing import Dict, Tuple
+
+import networkx as nx
+
+from graph_backend import CSRGraph, load_snapshot_from_seed_data
+from synthetic_graph import generate
+
+def seed_graph() -> CSRGraph:
+    return load_snapshot_from_seed_data()
+
+def simple_graph(num_edges: int = 1500, seed: int = 0) -> CSRGraph:
+    nodes, edges = generate(num_edges, seed=seed)
+    n = len(nodes)
+    ring = [{"id": num_edges + i, "type": "RELATED_TO", "start": i, "end": (i + 1) % n, "properties": {}} for i in range(n)]
+    seen: Dict[Tuple[int, int], None] = {}
+    kept = []
+    for e in edges + ring:
+        pair = (e["start"], e["end"])
+        if e["start"] != e["end"] and pair not in seen:
+            seen[pair] = None
+            kept.append(e)
+    return CSRGraph(nodes, kept)
+
+def to_networkx(g: CSRGraph) -> nx.MultiDiGraph:
+    """Node = snapshot index, edge key = edge index, with the relationship type as `type`."""
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(range(g.n))
+    for e in range(g.m):
+        G.add_edge(int(g.edge_src[e]), int(g.edge_dst[e]), key=e, type=g.rel_types[g.edge_type[e]])
+    return G
+
+def oriented(G: nx.MultiDiGraph, direction: str) -> nx.Graph:
+    """The simple graph a traversal along `direction` walks."""
+    if direction == "out":
+        return nx.DiGraph(G)
+    if direction == "in":
+        return nx.DiGraph(G).reverse()
+    return nx.Graph(G.to_undirected())
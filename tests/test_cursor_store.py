@@ -0,0 +1,41 @@
+"""CursorStore paging, expiry and rejection of forged cursors."""
+import pytest
+
+from cursor_store import CursorExpired, CursorStore, InvalidCursor
+
+def _store():
+    store = CursorStore()
+    ids, page = store.start(list(range(10)), [i // 4 for i in range(10)], version=1, limit=4)
+    return store, ids, page
+
+def test_pages_walk_the_stored_order():
+    store, ids, page = _store()
+    seen = list(ids)
+    while page["next_cursor"]:
+        ids, page = store.resume(page["next_cursor"], 1, 4)
+        seen += ids
+    assert seen == list(range(10))
+    assert page["offset"] == 8 and page["hops"] == [2, 2]
+
+def test_graph_change_expires_the_cursor():
+    store, _, page = _store()
+    with pytest.raises(CursorExpired):
+        store.resume(page["next_cursor"], 2, 4)
+
+@pytest.mark.parametrize("offset", [-1, 11, 10**9])
+def test_offset_outside_the_list_is_rejected(offset):
+    store, _, page = _store()
+    token, _ = CursorStore.decode(page["next_cursor"])
+    with pytest.raises(InvalidCursor):
+        store.resume(CursorStore.encode(token, offset), 1, 4)
+
+def test_offset_at_the_end_is_an_empty_last_page():
+    store, _, page = _store()
+    token, _ = CursorStore.decode(page["next_cursor"])
+    ids, info = store.resume(CursorStore.encode(token, 10), 1, 4)
+    assert ids == [] and info["next_cursor"] is None
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm9jb2xvbg", ""])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        CursorStore().resume(cursor, 1, 4)
@@ -0,0 +1,62 @@
+"""ETagMiddleware: 304 on a matching tag, and no tag on volatile responses."""
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from etag import ETagMiddleware
+
+@pytest.fixture
+def client():
+    version = {"v": 1}
+    calls = []
+    app = FastAPI()
+
+    @app.get("/query/item")
+    def item():
+        calls.append(1)
+        return {"ok": True}
+
+    @app.get("/query/communities")
+    def communities():
+        return {"cached": bool(calls)}
+
+    @app.get("/visual/neighbors")
+    def neighbors():
+        return {"page": {"next_cursor": "x"}}
+
+    app.add_middleware(ETagMiddleware, version=lambda: version["v"], prefixes=("/query/",),
+                       exclude_paths=("/query/communities",))
+    c = TestClient(app)
+    c.version, c.calls = version, calls
+    return c
+
+def test_matching_tag_is_answered_304_without_the_handler(client):
+    tag = client.get("/query/item").headers["etag"]
+    r = client.get("/query/item", headers={"If-None-Match": tag})
+    assert r.status_code == 304 and r.content == b"" and client.calls == [1]
+    assert client.get("/query/item", headers={"If-None-Match": f"W/{tag}"}).status_code == 304
+
+def test_version_change_invalidates_the_tag(client):
+    tag = client.get("/query/item").headers["etag"]
+    client.version["v"] = 2
+    r = client.get("/query/item", headers={"If-None-Match": tag})
+    assert r.status_code == 200 and r.headers["etag"] != tag
+
+@pytest.mark.parametrize("path", ["/query/communities", "/visual/neighbors"])
+def test_volatile_responses_are_not_tagged(client, path):
+    r = client.get(path, headers={"If-None-Match": "*"})
+    assert r.status_code == 200 and "etag" not in r.headers
+
+@pytest.mark.parametrize("format", ["json", "columnar"])
+def test_visual_with_layout_revalidates_to_304(app_main, format):
+    with TestClient(app_main.app) as c:
+        params = {"name": "Lưu Bị", "maxDepth": 1, "layout": "true", "format": format}
+        first = c.get("/query/visual", params=params)
+        assert first.status_code == 200 and "etag" in first.headers
+        # a later request, served from the layout cache, is the same bytes under the same tag
+        again = c.get("/query/visual", params=params)
+        assert again.content == first.content and again.headers["etag"] == first.headers["etag"]
+        r = c.get("/query/visual", params=params, headers={"If-None-Match": first.headers["etag"]})
+        assert r.status_code == 304 and r.content == b""
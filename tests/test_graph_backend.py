@@ -0,0 +1,245 @@
+"""CSRGraph and InMemoryGraphBackend against networkx, and against the Neo4jBackend (Cypher) fallbacks."""
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from fake_neo4j import FakeGraph, NoCapabilities
+from full_data_loader import EDGES, NODES
+from graph_backend import CSRGraph, GraphSnapshotStore, InMemoryGraphBackend, Neo4jBackend
+from graphs import oriented
+
+DIRECTIONS = ["out", "in", "any"]
+
+def _names(g, count=3):
+    """A hub, a median-degree node and a leaf-ish node, by name."""
+    degree = np.bincount(g.edge_src, minlength=g.n) + np.bincount(g.edge_dst, minlength=g.n)
+    order = np.argsort(-degree, kind="stable")
+    picks = [order[0], order[len(order) // 2], order[-1]][:count]
+    return [g.node_props[i]["name"] for i in picks]
+
+def _id_dist(result):
+    return {n["id"]: d for n, d in zip(result["nodes"], result["distances"])}
+
+# ---------- CSR loading ----------
+def test_seed_snapshot_holds_every_node_and_edge(seed):
+    assert seed.n == len(NODES)
+    assert seed.m == len(EDGES)
+    assert sorted(seed.node_ids.tolist()) == sorted(n["id"] for n in NODES)
+    assert Counter(zip(seed.node_ids[seed.edge_src].tolist(), seed.node_ids[seed.edge_dst].tolist())) == \
+        Counter((e["from"], e["to"]) for e in EDGES)
+    for n in NODES:
+        (i,) = seed.nodes_named(n["label"])
+        assert seed.node_json(i)["faction"] == n["group"]
+
+def test_edges_with_missing_endpoints_are_dropped():
+    g = CSRGraph([{"id": 1, "labels": ["Character"], "name": "a"}],
+                 [{"id": 7, "type": "ENEMY", "start": 1, "end": 2, "properties": {}}])
+    assert g.m == 0 and g.out_indptr.tolist() == [0, 0]
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_neighbors_match_networkx(graph, nx_graph, direction):
+    for i in range(graph.n):
+        nbrs, eids = graph.neighbors(i, direction)
+        expected = []
+        if direction in ("out", "any"):
+            expected += [(v, k) for _, v, k in nx_graph.out_edges(i, keys=True)]
+        if direction in ("in", "any"):
+            expected += [(u, k) for u, _, k in nx_graph.in_edges(i, keys=True)]
+        assert sorted(zip(nbrs.tolist(), eids.tolist())) == sorted(expected)
+
+def test_neighbors_filter_by_type(graph, nx_graph):
+    rel_type = graph.rel_types[0]
+    codes = graph.type_codes([rel_type])
+    for i in range(graph.n):
+        nbrs, _ = graph.neighbors(i, "out", codes)
+        expected = [v for _, v, t in nx_graph.out_edges(i, data="type") if t == rel_type]
+        assert sorted(nbrs.tolist()) == sorted(expected)
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_expand_is_the_union_of_neighbors(graph, direction):
+    frontier = np.arange(0, graph.n, 3)
+    srcs, nbrs, eids = graph.expand(frontier, direction)
+    expected = []
+    for i in frontier:
+        n_i, e_i = graph.neighbors(int(i), direction)
+        expected += [(int(i), j, e) for j, e in zip(n_i.tolist(), e_i.tolist())]
+    assert sorted(zip(srcs.tolist(), nbrs.tolist(), eids.tolist())) == sorted(expected)
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_bfs_levels_match_networkx(graph, nx_graph, direction):
+    G = oriented(nx_graph, direction)
+    for depth in (1, 3):
+        dist = graph.bfs_levels([0], depth, direction)
+        expected = nx.single_source_shortest_path_length(G, 0, cutoff=depth)
+        assert {i: int(d) for i, d in enumerate(dist) if d >= 0} == expected
+
+# ---------- InMemoryGraphBackend ----------
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_multi_hop_distances_match_networkx(graph, nx_graph, memory_backend, direction):
+    G = oriented(nx_graph, direction)
+    for name in _names(graph):
+        (s,) = graph.nodes_named(name)
+        out = memory_backend.multi_hop(name, 1, 3, direction, None, limit=graph.n)
+        expected = {int(graph.node_ids[i]): d for i, d in nx.single_source_shortest_path_length(G, s, cutoff=3).items() if d >= 1}
+        assert _id_dist(out) == expected
+        assert out["distances"] == sorted(out["distances"])
+        assert not out["truncated"]
+        # one BFS tree edge into every node, from a node one hop closer
+        dist = {**_id_dist(out), int(graph.node_ids[s]): 0}
+        assert len(out["edges"]) == len(out["nodes"])
+        for e in out["edges"]:
+            a, b = (e["start"], e["end"]) if direction != "in" else (e["end"], e["start"])
+            if direction == "any" and dist.get(a, -9) + 1 != dist[b]:
+                a, b = b, a
+            assert dist[a] + 1 == dist[b]
+
+def test_multi_hop_limit_truncates_closest_first(simple):
+    backend = InMemoryGraphBackend(GraphSnapshotStore(lambda: simple))
+    name = _names(simple)[0]
+    full = backend.multi_hop(name, 0, 3, "any", None, limit=simple.n)
+    cut = backend.multi_hop(name, 0, 3, "any", None, limit=10)
+    assert cut["truncated"] and len(cut["nodes"]) == 10
+    assert cut["distances"] == full["distances"][:10]
+    streamed = list(backend.iter_multi_hop(name, 0, 3, "any", None, simple.n, batch_size=7))
+    assert [n["id"] for b in streamed for n in b["nodes"]] == [n["id"] for n in full["nodes"]]
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_subgraph_matches_networkx_ego_graph(graph, nx_graph, memory_backend, direction):
+    G = oriented(nx_graph, direction)
+    for name in _names(graph):
+        (s,) = graph.nodes_named(name)
+        out = memory_backend.subgraph(name, 2, max_nodes=graph.n, max_edges=graph.m, direction=direction)
+        members = set(nx.single_source_shortest_path_length(G, s, cutoff=2))
+        assert {n["id"] for n in out["nodes"]} == {int(graph.node_ids[i]) for i in members}
+        # every relationship among the members, whatever its direction, once
+        expected = {int(graph.edge_ids[k]) for u, v, k in nx_graph.subgraph(members).edges(keys=True)}
+        assert {e["id"] for e in out["edges"]} == expected
+        assert len(out["edges"]) == len(expected)
+        assert not out["truncated"]
+
+def test_subgraph_budgets_truncate(simple):
+    backend = InMemoryGraphBackend(GraphSnapshotStore(lambda: simple))
+    name = _names(simple)[0]
+    out = backend.subgraph(name, 3, max_nodes=15, max_edges=simple.m)
+    assert out["truncated"] and len(out["nodes"]) == 15
+    out = backend.subgraph(name, 3, max_nodes=simple.n, max_edges=5)
+    assert out["truncated"] and len(out["edges"]) == 5
+    ids = {n["id"] for n in out["nodes"]}
+    assert all(e["start"] in ids and e["end"] in ids for e in out["edges"])
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_shortest_path_length_matches_networkx(graph, nx_graph, memory_backend, direction):
+    G = oriented(nx_graph, direction)
+    names = _names(graph)
+    for a in names:
+        for b in names:
+            out = memory_backend.shortest_paths(a, b, max_len=15, k=1, direction=direction)
+            (s,), (t,) = graph.nodes_named(a), graph.nodes_named(b)
+            try:
+                expected = nx.shortest_path_length(G, s, t)
+            except nx.NetworkXNoPath:
+                expected = None
+            if expected is None or expected > 15:
+                assert out["count"] == 0
+            else:
+                (path,) = out["paths"]
+                assert len(path["edges"]) == expected
+
+def test_neighbor_order_is_by_distance_then_id(graph, nx_graph, memory_backend):
+    G = oriented(nx_graph, "any")
+    (s,) = graph.nodes_named(_names(graph)[0])
+    ids, dists = memory_backend.neighbor_order(None, graph.node_props[s]["name"], 2)
+    expected = sorted((d, int(graph.node_ids[i])) for i, d in nx.single_source_shortest_path_length(G, s, cutoff=2).items())
+    assert list(zip(dists, ids)) == expected
+    assert memory_backend.neighbor_order(int(graph.node_ids[s]), None, 2) == (ids, dists)
+
+# ---------- parity with the Cypher path ----------
+@pytest.fixture
+def neo4j_backend(graph):
+    return Neo4jBackend(FakeGraph(graph), NoCapabilities())
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_multi_hop_parity(graph, memory_backend, neo4j_backend, direction):
+    for name in _names(graph):
+        for min_hops, max_hops in ((0, 1), (1, 3), (2, 2)):
+            mem = memory_backend.multi_hop(name, min_hops, max_hops, direction, None, graph.n)
+            cy = neo4j_backend.multi_hop(name, min_hops, max_hops, direction, None, graph.n)
+            assert _id_dist(cy) == _id_dist(mem)
+            assert cy["truncated"] == mem["truncated"]
+    rel_type = graph.rel_types[-1]
+    name = _names(graph)[0]
+    assert _id_dist(neo4j_backend.multi_hop(name, 1, 2, direction, [rel_type], graph.n)) == \
+        _id_dist(memory_backend.multi_hop(name, 1, 2, direction, [rel_type], graph.n))
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_subgraph_parity(graph, memory_backend, neo4j_backend, direction):
+    for name in _names(graph):
+        mem = memory_backend.subgraph(name, 2, graph.n, graph.m, direction)
+        cy = neo4j_backend.subgraph(name, 2, graph.n, graph.m, direction)
+        assert {n["id"] for n in cy["nodes"]} == {n["id"] for n in mem["nodes"]}
+        assert {e["id"] for e in cy["edges"]} == {e["id"] for e in mem["edges"]}
+        assert (cy["depth"], cy["truncated"]) == (mem["depth"], mem["truncated"])
+
+def test_neighbor_cursor_parity(graph, memory_backend, neo4j_backend):
+    name = _names(graph)[0]
+    ids, dists = neo4j_backend.neighbor_order(None, name, 2)
+    assert (ids, dists) == memory_backend.neighbor_order(None, name, 2)
+    page = ids[:25]
+    cy, mem = neo4j_backend.neighbor_page(page), memory_backend.neighbor_page(page)
+    assert [n["id"] for n in cy["nodes"]] == [n["id"] for n in mem["nodes"]] == page
+    assert sorted(e["id"] for e in cy["edges"]) == sorted(e["id"] for e in mem["edges"])
+
+def test_filter_relation_parity(graph, memory_backend, neo4j_backend):
+    for name in _names(graph):
+        for rel_type in graph.rel_types:
+            cy = neo4j_backend.filter_relation(name, rel_type, 100)
+            mem = memory_backend.filter_relation(name, rel_type, 100)
+            assert sorted(e["id"] for e in cy["edges"]) == sorted(e["id"] for e in mem["edges"])
+            assert {n["id"] for n in cy["nodes"]} == {n["id"] for n in mem["nodes"]}
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_k_shortest_parity(graph, memory_backend, neo4j_backend, direction):
+    names = _names(graph)
+    for a, b in ((names[0], names[1]), (names[1], names[2])):
+        mem = memory_backend.shortest_paths(a, b, max_len=6, k=4, direction=direction)
+        cy = neo4j_backend.shortest_paths(a, b, max_len=6, k=4, direction=direction)
+        assert cy["engine"] == "cypher.yens"
+        assert [len(p["edges"]) for p in cy["paths"]] == [len(p["edges"]) for p in mem["paths"]]
+        for p in cy["paths"]:
+            ids = [n["id"] for n in p["nodes"]]
+            assert len(ids) == len(set(ids)) == len(p["edges"]) + 1
+            assert {e["start"] for e in p["edges"]} | {e["end"] for e in p["edges"]} == set(ids)
+    # no snapshot is pulled out of the database, only bounded shortestPath queries
+    assert not any(q.startswith("MATCH (n) WHERE NOT n:GraphMeta") for q in neo4j_backend.driver.queries)
+
+def _namesake_graph():
+    """Two characters named A and two named B; every A->B pair has paths of its own."""
+    names = ["A", "A", "B", "B", "x", "y", "z"]
+    pairs = [(0, 4), (4, 2), (1, 3), (0, 5), (5, 6), (6, 3), (1, 4), (4, 3), (0, 2)]
+    nodes = [{"id": i, "labels": ["Character"], "name": n} for i, n in enumerate(names)]
+    edges = [{"id": e, "type": "RELATED_TO", "start": a, "end": b, "properties": {}} for e, (a, b) in enumerate(pairs)]
+    return CSRGraph(nodes, edges)
+
+@pytest.mark.parametrize("k", [1, 2, 3, 5])
+def test_k_shortest_is_a_global_top_k_over_namesakes(k):
+    g = _namesake_graph()
+    G = nx.MultiDiGraph([(a, b) for a, b in zip(g.edge_src.tolist(), g.edge_dst.tolist())])
+    every = sorted(len(p) for s in (0, 1) for t in (2, 3) for p in nx.all_simple_edge_paths(G, s, t))
+    memory = InMemoryGraphBackend(GraphSnapshotStore(lambda: g))
+    neo4j = Neo4jBackend(FakeGraph(g), NoCapabilities())
+    for backend in (memory, neo4j):
+        out = backend.shortest_paths("A", "B", max_len=6, k=k, direction="out")
+        assert out["count"] == len(out["paths"]) == k
+        assert [len(p["edges"]) for p in out["paths"]] == every[:k]
+
+def test_an_incomplete_backend_fails_at_construction():
+    from graph_backend import GraphBackend
+
+    class Partial(GraphBackend):
+        def multi_hop(self, name, min_hops, max_hops, direction, rel_types, limit):
+            return {}
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
@@ -0,0 +1,24 @@
+"""LayoutCache: positions for every node, and byte-identical answers within a version."""
+import json
+
+from graph_layout import LayoutCache
+
+GRAPH = {
+    "nodes": [{"id": i, "label": str(i)} for i in range(6)],
+    "edges": [{"source": i, "target": (i + 1) % 6} for i in range(6)],
+}
+
+def test_apply_places_every_node_without_touching_the_input():
+    out = LayoutCache(iterations=20).apply(("k",), 1, GRAPH)
+    assert all("x" in n and "y" in n for n in out["nodes"])
+    assert all("x" not in n for n in GRAPH["nodes"])
+    assert out["layout"] == {"algorithm": "fruchterman_reingold", "graph_version": 1}
+
+def test_cache_hit_and_warm_start_leave_the_body_unchanged():
+    cache = LayoutCache(iterations=20)
+    first = cache.apply(("k",), 1, GRAPH)
+    assert json.dumps(cache.apply(("k",), 1, GRAPH)) == json.dumps(first)
+    # a new version warm-starts from the known positions; only stats() says so
+    cache.apply(("k",), 2, GRAPH)
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["warm_starts"] == 1
@@ -0,0 +1,77 @@
+"""Identifier classification and the reads-one / writes-all split for names."""
+import pytest
+
+from identifiers import IdentifierResolver, classify
+
+class RecordingSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def run(self, query, params):
+        self.queries.append(query)
+        return self.rows
+
+@pytest.mark.parametrize("ident, by, expected", [
+    ("Lưu Bị", "auto", ("name", "Lưu Bị")),
+    ("42", "auto", ("id", 42)),
+    ("42", "name", ("name", "42")),
+    ("42", "character_id", ("character_id", 42)),
+    ("4:0f3c2d1e-aaaa-bbbb-cccc-0123456789ab:12", "auto", ("element_id", "4:0f3c2d1e-aaaa-bbbb-cccc-0123456789ab:12")),
+])
+def test_classify(ident, by, expected):
+    assert classify(ident, by) == expected
+
+@pytest.mark.parametrize("ident, by", [("", "auto"), ("x", "id"), ("x", "nope")])
+def test_classify_rejects(ident, by):
+    with pytest.raises(ValueError):
+        classify(ident, by)
+
+def test_name_reads_resolve_one_node_and_cache_it():
+    resolver = IdentifierResolver()
+    s = RecordingSession([{"eid": "e1"}])
+    resolver.run(s, "Tào Tháo", "auto", "RETURN c, elementId(c) AS eid")
+    assert "LIMIT 1" in s.queries[0]
+    resolver.run(s, "Tào Tháo", "auto", "RETURN c, elementId(c) AS eid")
+    assert "elementId(c) = $eid" in s.queries[1]
+
+def test_name_writes_match_every_namesake_and_skip_the_cache():
+    resolver = IdentifierResolver()
+    s = RecordingSession([{"eid": "e1"}, {"eid": "e2"}])
+    resolver.run(s, "Tào Tháo", "auto", "RETURN c, elementId(c) AS eid")
+    records = resolver.run(s, "Tào Tháo", "auto", "SET c += $props RETURN c, elementId(c) AS eid", every=True)
+    assert len(records) == 2
+    assert s.queries[-1].startswith("MATCH (c:Character {name: $value}) SET")
+    assert "LIMIT" not in s.queries[-1] and "$eid" not in s.queries[-1]
+
+def test_ensure_schema_runs_the_extra_statements():
+    from graph_meta import CONSTRAINT_CYPHER
+    from identifiers import SCHEMA_STATEMENTS, ensure_schema
+
+    class Result:
+        def consume(self):
+            return None
+
+    class Session:
+        def __init__(self):
+            self.queries = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def run(self, query):
+            self.queries.append(query)
+            return Result()
+
+    session = Session()
+
+    class Driver:
+        def session(self):
+            return session
+
+    assert ensure_schema(Driver(), (CONSTRAINT_CYPHER,)) == []
+    assert session.queries == [*SCHEMA_STATEMENTS, CONSTRAINT_CYPHER]
+    assert "REQUIRE m.key IS UNIQUE" in CONSTRAINT_CYPHER
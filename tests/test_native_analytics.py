@@ -0,0 +1,85 @@
+"""native_analytics centrality against networkx on simple directed graphs."""
+import networkx as nx
+import numpy as np
+import pytest
+
+import native_analytics
+from graphs import to_networkx
+
+@pytest.fixture(scope="module")
+def A(graph):
+    return native_analytics.adjacency(graph)
+
+@pytest.fixture(scope="module")
+def G(graph):
+    # Both test graphs are free of parallel relationships and self-loops
+    return nx.DiGraph(to_networkx(graph))
+
+def _as_array(graph, scores):
+    return np.array([scores[i] for i in range(graph.n)])
+
+def test_betweenness_matches_networkx(graph, A, G):
+    expected = _as_array(graph, nx.betweenness_centrality(G, normalized=False))
+    np.testing.assert_allclose(native_analytics.betweenness(A), expected, rtol=1e-9, atol=1e-9)
+
+@pytest.mark.parametrize("batch_size", [3, 64])
+def test_betweenness_does_not_depend_on_batch_size(graph, A, batch_size):
+    np.testing.assert_allclose(native_analytics.betweenness(A, batch_size=batch_size),
+                               native_analytics.betweenness(A), rtol=1e-12, atol=1e-9)
+
+def test_betweenness_pivots_sum_to_the_exact_scores(graph, A):
+    half = np.arange(0, graph.n, 2)
+    rest = np.arange(1, graph.n, 2)
+    np.testing.assert_allclose(native_analytics.betweenness(A, sources=half) + native_analytics.betweenness(A, sources=rest),
+                               native_analytics.betweenness(A), rtol=1e-9, atol=1e-9)
+
+def test_betweenness_counts_parallel_relationships_as_separate_paths():
+    # 0 => 1 (twice) -> 2 and 0 -> 3 -> 2: node 1 carries 2 of the 3 shortest 0 ~> 2 paths
+    A = native_analytics.sp.csr_matrix(np.array([[0, 2, 0, 1], [0, 0, 1, 0], [0, 0, 0, 0], [0, 0, 1, 0]], dtype=float))
+    np.testing.assert_allclose(native_analytics.betweenness(A), [0, 2 / 3, 0, 1 / 3])
+
+def test_closeness_matches_networkx(graph, A, G):
+    # native closeness follows outgoing paths (gds.closeness); networkx measures incoming distance
+    expected = _as_array(graph, nx.closeness_centrality(G.reverse(), wf_improved=False))
+    np.testing.assert_allclose(native_analytics.closeness(A), expected, rtol=1e-12, atol=1e-12)
+
+def test_pagerank_matches_networkx(simple):
+    # Every node of the synthetic graph has an outgoing edge, so no rank mass is dropped and the
+    # unnormalised GDS scores are networkx's probabilities times n
+    A = native_analytics.adjacency(simple)
+    G = nx.DiGraph(to_networkx(simple))
+    expected = _as_array(simple, nx.pagerank(G, alpha=0.85, tol=1e-12, max_iter=500))
+    scores = native_analytics.pagerank(A, max_iter=500, tol=1e-12)
+    np.testing.assert_allclose(scores / simple.n, expected, rtol=1e-6, atol=1e-9)
+
+def test_pagerank_warm_start_converges_to_the_same_scores(simple):
+    A = native_analytics.adjacency(simple)
+    cold, _ = native_analytics.power_pagerank(A, max_iter=500, tol=1e-12)
+    warm, iterations = native_analytics.power_pagerank(A, max_iter=500, tol=1e-12, start=cold)
+    np.testing.assert_allclose(warm, cold, rtol=1e-9)
+    assert iterations <= 2
+
+def test_eigenvector_matches_networkx(simple):
+    A = native_analytics.adjacency(simple)
+    G = nx.DiGraph(to_networkx(simple))
+    expected = _as_array(simple, nx.eigenvector_centrality_numpy(G))
+    scores = native_analytics.eigenvector(A, max_iter=2000, tol=1e-12)
+    np.testing.assert_allclose(scores, np.abs(expected), rtol=1e-4, atol=1e-6)
+
+def test_louvain_modularity_matches_networkx(simple):
+    A = native_analytics.adjacency(simple)
+    labels, q, levels = native_analytics.louvain(A, seed=0)
+    # a u -> v plus a v -> u relationship make a weight-2 undirected edge
+    G = nx.from_scipy_sparse_array(A + A.T)
+    communities = [set(np.nonzero(labels == c)[0].tolist()) for c in range(labels.max() + 1)]
+    assert q == pytest.approx(nx.community.modularity(G, communities), abs=1e-9)
+    assert levels >= 1 and q > 0.3
+    assert np.array_equal(native_analytics.louvain(A, seed=0)[0], labels)
+
+def test_compute_restricts_to_the_label(seed):
+    scores, mask = native_analytics.compute(seed, "betweenness")
+    assert mask.all()
+    rows = native_analytics.top_scores(seed, scores, 3, mask)
+    assert [r["score"] for r in rows] == sorted((r["score"] for r in rows), reverse=True)
+    with pytest.raises(ValueError):
+        native_analytics.compute(seed, "harmonic")
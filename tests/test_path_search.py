@@ -0,0 +1,100 @@
+"""PathSearcher and Yen's k_shortest edge cases, and k_shortest against networkx.shortest_simple_paths."""
+from itertools import islice
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_backend import CSRGraph
+from graphs import to_networkx
+from path_search import PathSearcher, k_shortest
+
+def _graph(pairs, n=None):
+    n = n if n is not None else max(max(p) for p in pairs) + 1
+    nodes = [{"id": i, "labels": ["Character"], "name": str(i)} for i in range(n)]
+    edges = [{"id": e, "type": "RELATED_TO", "start": a, "end": b, "properties": {}} for e, (a, b) in enumerate(pairs)]
+    return CSRGraph(nodes, edges)
+
+def _assert_walk(g, path, s, t, direction="out"):
+    nodes, edges = path
+    assert nodes[0] == s and nodes[-1] == t
+    assert len(nodes) == len(set(nodes)) == len(edges) + 1
+    for a, b, e in zip(nodes, nodes[1:], edges):
+        ends = (int(g.edge_src[e]), int(g.edge_dst[e]))
+        assert ends == {"out": (a, b), "in": (b, a)}.get(direction, ends) and set(ends) == {a, b}
+
+# 0 -> 1 -> 2 -> 3 and a detour 0 -> 4 -> 5 -> 3, plus 1 -> 3 directly
+DIAMOND = [(0, 1), (1, 2), (2, 3), (0, 4), (4, 5), (5, 3), (1, 3)]
+
+def test_source_equals_target_is_the_empty_path():
+    g = _graph(DIAMOND)
+    assert PathSearcher(g, "out").shortest(2, 2, 5) == ([2], [])
+    assert PathSearcher(g, "out").shortest(2, 2, 0) == ([2], [])
+    assert k_shortest(PathSearcher(g, "out"), 2, 2, 3, 5) == [([2], [])]
+
+def test_shortest_respects_direction():
+    g = _graph(DIAMOND)
+    assert PathSearcher(g, "out").shortest(0, 3, 5) == ([0, 1, 3], [0, 6])
+    assert PathSearcher(g, "out").shortest(3, 0, 5) is None
+    assert PathSearcher(g, "in").shortest(3, 0, 5)[0] == [3, 1, 0]
+    assert len(PathSearcher(g, "any").shortest(3, 0, 5)[1]) == 2
+
+def test_max_len_cuts_longer_paths():
+    g = _graph(DIAMOND)
+    searcher = PathSearcher(g, "out")
+    assert searcher.shortest(0, 3, 1) is None
+    assert searcher.shortest(0, 3, 0) is None
+    assert len(searcher.shortest(0, 3, 2)[1]) == 2
+    # without 1 -> 3 the best is 3 hops, over the bound of 2
+    assert searcher.shortest(0, 3, 2, banned_edges=[6]) is None
+    assert len(searcher.shortest(0, 3, 3, banned_edges=[6])[1]) == 3
+    assert all(len(edges) <= 3 for _, edges in k_shortest(searcher, 0, 3, 10, 3))
+
+def test_banned_nodes_and_edges_are_avoided():
+    g = _graph(DIAMOND)
+    searcher = PathSearcher(g, "out")
+    assert searcher.shortest(0, 3, 5, banned_nodes=[1]) == ([0, 4, 5, 3], [3, 4, 5])
+    assert searcher.shortest(0, 3, 5, banned_edges=[6]) == ([0, 1, 2, 3], [0, 1, 2])
+    assert searcher.shortest(0, 3, 5, banned_nodes=[1, 5]) is None
+    # a banned endpoint means no path at all
+    assert searcher.shortest(0, 3, 5, banned_nodes=[3]) is None
+    assert searcher.shortest(0, 3, 5, banned_nodes=[0]) is None
+    # scratch state is reset between searches
+    assert searcher.shortest(0, 3, 5) == ([0, 1, 3], [0, 6])
+
+def test_yen_lists_every_simple_path_in_length_order():
+    g = _graph(DIAMOND)
+    paths = k_shortest(PathSearcher(g, "out"), 0, 3, 10, 10)
+    assert [nodes for nodes, _ in paths] == [[0, 1, 3], [0, 1, 2, 3], [0, 4, 5, 3]] or \
+        [nodes for nodes, _ in paths] == [[0, 1, 3], [0, 4, 5, 3], [0, 1, 2, 3]]
+
+def test_yen_keeps_parallel_relationships_apart():
+    g = _graph([(0, 1), (0, 1), (1, 2)])
+    paths = k_shortest(PathSearcher(g, "out"), 0, 2, 5, 5)
+    assert sorted(edges for _, edges in paths) == [[0, 2], [1, 2]]
+
+def test_unreachable_target_gives_no_paths():
+    g = _graph(DIAMOND, n=7)
+    assert PathSearcher(g, "any").shortest(0, 6, 10) is None
+    assert k_shortest(PathSearcher(g, "any"), 0, 6, 3, 10) == []
+
+@pytest.mark.parametrize("direction", ["out", "in"])
+def test_yen_matches_networkx_shortest_simple_paths(simple, direction):
+    G = nx.DiGraph(to_networkx(simple))
+    if direction == "in":
+        G = G.reverse()
+    searcher = PathSearcher(simple, direction)
+    rng = np.random.default_rng(1)
+    checked = 0
+    for s, t in rng.integers(0, simple.n, size=(12, 2)).tolist():
+        if s == t or not nx.has_path(G, s, t):
+            continue
+        k = 6
+        expected = [len(p) - 1 for p in islice(nx.shortest_simple_paths(G, s, t), k)]
+        paths = k_shortest(searcher, s, t, k, max_len=simple.n)
+        assert [len(edges) for _, edges in paths] == expected
+        assert len({tuple(edges) for _, edges in paths}) == len(paths)
+        for path in paths:
+            _assert_walk(simple, path, s, t, direction)
+        checked += 1
+    assert checked >= 5
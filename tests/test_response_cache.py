@@ -0,0 +1,46 @@
+"""ResponseCache.cached hands out copies, so callers cannot change a stored entry."""
+import asyncio
+
+from response_cache import ResponseCache
+
+def test_cached_returns_a_copy_of_the_entry():
+    cache = ResponseCache()
+    calls = []
+
+    @cache.cached("ep")
+    def handler(name: str):
+        calls.append(name)
+        return {"name": name, "items": [1, 2]}
+
+    first = handler("a")
+    first["page"] = {"next_cursor": "x"}
+    second = handler("a")
+    assert calls == ["a"]
+    assert "page" not in second
+    assert second is not first and second == {"name": "a", "items": [1, 2]}
+
+def test_async_cached_returns_a_copy_of_the_entry():
+    cache = ResponseCache()
+
+    @cache.cached("ep")
+    async def handler(name: str):
+        return [name]
+
+    first = asyncio.run(handler("a"))
+    first.append("b")
+    assert asyncio.run(handler("a")) == ["a"]
+
+def test_size_estimate_does_not_serialise_the_value(monkeypatch):
+    import response_cache
+
+    def no_dumps(*args, **kwargs):
+        raise AssertionError("json.dumps on the cache path")
+    monkeypatch.setattr("json.dumps", no_dumps)
+    cache = ResponseCache()
+    small = {"nodes": [{"id": i} for i in range(10)], "edges": []}
+    large = {"nodes": [{"id": i} for i in range(1000)], "edges": [{"id": i} for i in range(2000)]}
+    cache.put(cache.key("a", {}), small)
+    before = cache.stats()["approx_bytes"]
+    cache.put(cache.key("b", {}), large)
+    assert cache.stats()["approx_bytes"] - before > 100 * before
+    assert response_cache._approx_size({"page": {"next_cursor": None}, "count": 3}) > 0
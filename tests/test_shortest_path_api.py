@@ -0,0 +1,20 @@
+"""/query/shortest_path and /jobs/paths argument checks (shared by the sync and async apps)."""
+import pytest
+
+@pytest.fixture
+def client(app_main):
+    from fastapi.testclient import TestClient
+    return TestClient(app_main.app)
+
+@pytest.mark.parametrize("k", [0, -3, 101])
+def test_k_outside_the_bounds_is_rejected(client, app_main, k):
+    params = {"from_name": "Lưu Bị", "to_name": "Tào Tháo", "k": k}
+    r = client.get("/query/shortest_path", params=params)
+    assert r.status_code == 400 and str(app_main.SHORTEST_PATH_MAX_K) in r.json()["detail"]
+    assert client.post("/jobs/paths", params=params).status_code == 400
+
+def test_k_paths_come_back_shortest_first(client):
+    r = client.get("/query/shortest_path", params={"from_name": "Lưu Bị", "to_name": "Tào Tháo", "k": 3})
+    assert r.status_code == 200
+    lengths = [len(p["edges"]) for p in r.json()["paths"]]
+    assert r.json()["count"] == len(lengths) <= 3 and lengths == sorted(lengths)
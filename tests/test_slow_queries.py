@@ -0,0 +1,38 @@
+"""SlowQueryLog recording, parameter redaction and the PROFILE safety filter."""
+import pytest
+
+pytest.importorskip("neo4j")
+
+from slow_queries import SlowQueryLog, is_profilable
+
+PARAMS = {"name": "Lưu Bị", "ids": [1, 2, 3], "limit": 10, "fuzzy": True}
+
+def test_only_slow_queries_are_recorded():
+    log = SlowQueryLog(threshold_ms=100, sample_rate=0)
+    log.observe("/a", "MATCH (n) RETURN n", PARAMS, 0.05, 1, None)
+    log.observe("/b", "MATCH (n) RETURN n", PARAMS, 0.2, 1, None)
+    stats = log.stats()
+    assert stats["queries_seen"] == 2 and stats["slow_recorded"] == 1
+    assert [e["endpoint"] for e in log.entries()] == ["/b"]
+
+def test_parameter_values_are_redacted_by_default():
+    log = SlowQueryLog(threshold_ms=0, sample_rate=0)
+    log.observe("/a", "MATCH (n) RETURN n", PARAMS, 1.0, 1, None)
+    params = log.entries()[0]["params"]
+    assert params == {"name": "<str, 6 chars>", "ids": "<list, 3 items>", "limit": "<int>", "fuzzy": True}
+
+def test_show_params_keeps_the_values():
+    log = SlowQueryLog(threshold_ms=0, sample_rate=0, show_params=True, max_param_chars=4)
+    log.observe("/a", "MATCH (n) RETURN n", PARAMS, 1.0, 1, None)
+    params = log.entries()[0]["params"]
+    assert params["limit"] == 10 and params["name"].startswith("Lưu ")
+
+@pytest.mark.parametrize("query, ok", [
+    ("MATCH (n) RETURN n", True),
+    ("MATCH (n) SET n.x = 1", False),
+    ("CALL gds.pageRank.stream('g') YIELD nodeId", True),
+    ("CALL gds.pageRank.write('g', {})", False),
+    ("PROFILE MATCH (n) RETURN n", False),
+])
+def test_is_profilable(query, ok):
+    assert is_profilable(query) is ok
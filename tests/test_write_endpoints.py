@@ -0,0 +1,62 @@
+"""Write endpoints against a fake Neo4j: labels keep their case and new Characters reach /search."""
+import pytest
+
+from fake_neo4j_writes import WritableGraph
+
+@pytest.fixture
+def writes(app_main, monkeypatch):
+    """(TestClient, fake graph) with every write and Character read going to the fake."""
+    from fastapi.testclient import TestClient
+    from name_search import NameIndex
+
+    main = app_main
+    fake = WritableGraph()
+    monkeypatch.setattr(main, "GRAPH_BACKEND", "neo4j")
+    monkeypatch.setattr(main, "_raw_driver", fake)
+    monkeypatch.setattr(main._graph_meta, "driver", fake)
+    names = NameIndex(fake.character_names)
+    names.rebuild()
+    monkeypatch.setattr(main, "_names", names)
+    return TestClient(main.app), fake
+
+def _search(client, name):
+    r = client.get("/search", params={"name": name})
+    assert r.status_code == 200
+    return [c["name"] for c in r.json()]
+
+def test_bulk_upsert_keeps_the_character_label_and_indexes_names(writes):
+    client, fake = writes
+    r = client.post("/nodes/upsert/bulk", params={"label": "Character"},
+                    json=[{"name": "Mã Siêu", "faction": "Thục Hán"}, {"name": "Bàng Đức"}])
+    assert r.status_code == 200 and r.json()["written"] == 2
+    assert all(n.labels == {"Character"} for n in fake.nodes.values())
+    assert _search(client, "Ma Sieu") == ["Mã Siêu"]
+    assert _search(client, "Bang Duc") == ["Bàng Đức"]
+
+@pytest.mark.parametrize("label", ["Char acter", "1abc", "a-b", ""])
+def test_bulk_upsert_rejects_labels_that_are_not_identifiers(writes, label):
+    client, fake = writes
+    r = client.post("/nodes/upsert/bulk", params={"label": label}, json=[{"name": "x"}])
+    assert r.status_code in (400, 422) and not fake.nodes
+
+def test_upsert_node_indexes_a_character(writes):
+    client, fake = writes
+    r = client.post("/nodes/upsert", params={"label": "Character"}, json={"name": "Khương Duy", "faction": "Thục Hán"})
+    assert r.status_code == 200 and r.json()["labels"] == ["Character"]
+    assert _search(client, "Khuong Duy") == ["Khương Duy"]
+    # other labels stay out of the Character index
+    client.post("/nodes/upsert", params={"label": "Place"}, json={"name": "Khương Thành"})
+    assert _search(client, "Khuong") == ["Khương Duy"]
+
+def test_upsert_node_rejects_an_unsafe_key(writes):
+    client, fake = writes
+    r = client.post("/nodes/upsert", params={"label": "Character", "key": "name}) DETACH DELETE n //"},
+                    json={"name}) DETACH DELETE n //": "x"})
+    assert r.status_code == 400 and not fake.queries
+
+def test_add_relation_type_indexes_characters_it_creates(writes):
+    client, fake = writes
+    r = client.post("/query/add_relation_type", json={"from_name": "Đặng Ngải", "to_name": "Chung Hội", "rel_type": "rival"})
+    assert r.status_code == 200 and r.json()["created_relation"] == "RIVAL"
+    assert _search(client, "Dang Ngai") == ["Đặng Ngải"]
+    assert _search(client, "Chung Hoi") == ["Chung Hội"]
@@ -0,0 +1,215 @@
+"""
+Compact wire formats for the visual graph endpoints.
+
+/query/visual and /visual/neighbors return {"nodes": [...], "edges": [...]}
+with one object per node/edge. The columnar form sends parallel arrays
+instead:
+
+    {
+      "format": "tq-columnar/1",
+      "tables": {"faction": [...], "type": [...]},
+      "nodes": {"count": n, "id": [...], "label": [...], "faction": [code...],
+                "props": {key: [value or null, ...]}},
+      "edges": {"count": m, "id": [...], "source": [node index...],
+                "target": [node index...], "type": [code...],
+                "props": {key: [...]}},
+      ...any other top-level keys of the response (e.g. "page")
+    }
+
+- faction and relationship type are dictionary-encoded (-1 = missing)
+- edge endpoints are row indices into the node arrays, not ids; an
+  endpoint that is not in the node list gets an id-only row appended
+- props.name is left out when it equals the label ("name_is_label": true)
+- with layout=true the node positions come as "x"/"y" columns
+
+Formats, picked by ?format= or the Accept header:
+- json      the original document (default)
+- columnar  the columnar document as JSON
+- msgpack   the columnar document as MessagePack, with the integer
+            columns packed as little-endian typed arrays
+            ({"dtype": "<i4", "data": <bin>}) for Int32Array views, and
+            x/y as "<f4" (Float32Array)
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional: the msgpack format is simply not offered
+    msgpack = None
+
+FORMAT_VERSION = "tq-columnar/1"
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": "application/vnd.tamquoc.columnar+json",
+    "msgpack": "application/x-msgpack",
+}
+
+# Integer columns that are sent as typed arrays in msgpack
+_TYPED_COLUMNS = {"nodes": ("id", "faction"), "edges": ("id", "source", "target", "type")}
+
+def available_formats() -> List[str]:
+    return [f for f in MEDIA_TYPES if f != "msgpack" or msgpack is not None]
+
+def negotiate(accept: Optional[str], fmt: Optional[str] = None) -> Optional[str]:
+    """Format name from an explicit ?format= or the Accept header; None if nothing acceptable."""
+    formats = available_formats()
+    if fmt:
+        fmt = fmt.lower()
+        return fmt if fmt in formats else None
+    if not accept:
+        return "json"
+    ranked = []
+    for i, part in enumerate(accept.split(",")):
+        media, _, params = part.strip().partition(";")
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        ranked.append((-q, i, media.strip().lower()))
+    for neg_q, _, media in sorted(ranked):
+        if neg_q == 0:
+            break
+        for name in formats:
+            if media == MEDIA_TYPES[name]:
+                return name
+        if media in ("*/*", "application/*"):
+            return "json"
+    return None
+
+def _encode_table(values: List[Any]) -> Tuple[List[Any], List[int]]:
+    table: Dict[Any, int] = {}
+    codes = []
+    for v in values:
+        if v is None:
+            codes.append(-1)
+        else:
+            codes.append(table.setdefault(v, len(table)))
+    return list(table), codes
+
+def _columns(rows: List[Dict[str, Any]], skip: Tuple[str, ...] = ()) -> Dict[str, List[Any]]:
+    keys: Dict[str, None] = {}
+    for r in rows:
+        for k in r:
+            if k not in skip:
+                keys.setdefault(k)
+    return {k: [r.get(k) for r in rows] for k in keys}
+
+def to_columnar(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Visual graph ({nodes: [{id, label, props}], edges: [{id, type, source, target, props}]}) -> columnar dict."""
+    nodes = list(graph.get("nodes", []))
+    edges = graph.get("edges", [])
+    index = {n["id"]: i for i, n in enumerate(nodes)}
+    for e in edges:
+        for end in (e["source"], e["target"]):
+            if end not in index:
+                index[end] = len(nodes)
+                nodes.append({"id": end, "label": None, "props": {}})
+
+    props = [n.get("props") or {} for n in nodes]
+    # Stub rows (label None) carry no name either way
+    name_is_label = all(p.get("name") == n["label"] for p, n in zip(props, nodes) if n.get("label") is not None)
+    skip = ("faction", "name") if name_is_label else ("faction",)
+    factions, faction_codes = _encode_table([p.get("faction") for p in props])
+    types, type_codes = _encode_table([e.get("type") for e in edges])
+
+    out = {k: v for k, v in graph.items() if k not in ("nodes", "edges")}
+    out.update({
+        "format": FORMAT_VERSION,
+        "name_is_label": name_is_label,
+        "tables": {"faction": factions, "type": types},
+        "nodes": {
+            "count": len(nodes),
+            "id": [n["id"] for n in nodes],
+            "label": [n.get("label") for n in nodes],
+            "faction": faction_codes,
+            "props": _columns(props, skip),
+        },
+        "edges": {
+            "count": len(edges),
+            "id": [e["id"] for e in edges],
+            "source": [index[e["source"]] for e in edges],
+            "target": [index[e["target"]] for e in edges],
+            "type": type_codes,
+            "props": _columns([e.get("props") or {} for e in edges]),
+        },
+    })
+    # Server-side layout (layout=true): positions as two more columns
+    if any("x" in n for n in nodes):
+        out["nodes"]["x"] = [n.get("x") for n in nodes]
+        out["nodes"]["y"] = [n.get("y") for n in nodes]
+    return out
+
+def from_columnar(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of to_columnar (typed-array columns are accepted too); used to check round trips."""
+    doc = {k: v for k, v in doc.items()}
+    for section, cols in _TYPED_COLUMNS.items():
+        doc[section] = dict(doc[section])
+        for c in cols + (("x", "y") if section == "nodes" and "x" in doc[section] else ()):
+            v = doc[section][c]
+            if isinstance(v, dict):
+                doc[section][c] = np.frombuffer(v["data"], dtype=v["dtype"]).tolist()
+    factions, types = doc["tables"]["faction"], doc["tables"]["type"]
+    n, e = doc["nodes"], doc["edges"]
+
+    def row_props(cols, i):
+        return {k: col[i] for k, col in cols.items() if col[i] is not None}
+
+    nodes = []
+    for i in range(n["count"]):
+        p = row_props(n["props"], i)
+        if doc["name_is_label"] and n["label"][i] is not None and "name" not in p:
+            p = {"name": n["label"][i], **p}
+        if n["faction"][i] >= 0:
+            p["faction"] = factions[n["faction"][i]]
+        nodes.append({"id": n["id"][i], "label": n["label"][i], "props": p})
+    edges = [
+        {
+            "id": e["id"][i],
+            "type": types[e["type"][i]] if e["type"][i] >= 0 else None,
+            "source": n["id"][e["source"][i]],
+            "target": n["id"][e["target"][i]],
+            "props": row_props(e["props"], i),
+        }
+        for i in range(e["count"])
+    ]
+    out = {k: v for k, v in doc.items() if k not in ("format", "name_is_label", "tables", "nodes", "edges")}
+    if "x" in n:
+        for node, x, y in zip(nodes, n["x"], n["y"]):
+            if x is not None:
+                node["x"], node["y"] = x, y
+    out.update({"nodes": nodes, "edges": edges})
+    return out
+
+def _typed(values: List[int]) -> Dict[str, Any]:
+    arr = np.asarray(values, dtype=np.int64)
+    if len(arr) == 0 or (arr.min() >= -2**31 and arr.max() < 2**31):
+        arr = arr.astype("<i4")
+    else:
+        arr = arr.astype("<i8")
+    return {"dtype": arr.dtype.str, "data": arr.tobytes()}
+
+def encode(graph: Dict[str, Any], fmt: str) -> bytes:
+    if fmt == "json":
+        return json.dumps(graph, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    doc = to_columnar(graph)
+    if fmt == "columnar":
+        return json.dumps(doc, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        for section, cols in _TYPED_COLUMNS.items():
+            for c in cols:
+                doc[section][c] = _typed(doc[section][c])
+        if "x" in doc["nodes"] and None not in doc["nodes"]["x"]:
+            for c in ("x", "y"):
+                doc["nodes"][c] = {"dtype": "<f4", "data": np.asarray(doc["nodes"][c], dtype="<f4").tobytes()}
+        return msgpack.packb(doc, use_bin_type=True, default=str)
+    raise ValueError(f"Unknown format '{fmt}'")